@@ -1,15 +1,16 @@
 # main.py
 import sys
+import multiprocessing
 from PySide6.QtWidgets import QApplication, QMainWindow, QStackedWidget, QMessageBox, QWidget, QVBoxLayout, QHBoxLayout, QToolButton, QMenu
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QIcon, QAction
 from controllers.serial_handler import SerialHandler
 from views.port_selection_page   import PortSelectionPage
 from views.control_panel_page    import ControlPanelPage
-from views.monitor_page          import MonitorPage
-from views.analysis_page         import AnalysisPage
+# MonitorPage / AnalysisPage (matplotlib, pandas, openpyxl…) are imported when first needed
 from utils.setting_utils import load_settings
 from utils.setting_utils import get_path_from_settings
+from utils.setting_utils import resolve_path_value
 import webbrowser
 POLLING_MS =30
 
@@ -20,20 +21,24 @@ class MainWindow(QMainWindow):
         self.settings = load_settings()
 
         # --- Centralized serial handler ---
-        self.serial = SerialHandler(self, POLLING_MS)
+        acq = self.settings.get("acquisition", {})
+        self.serial = SerialHandler(
+            self, POLLING_MS,
+            threaded=acq.get("threaded_reader", False),
+            queue_size=acq.get("frame_queue_size", 20000),
+        )
         self.serial.error.connect(self._on_serial_error)
         self.serial.event_received.connect(self._on_arduino_event)
 
         # --- Page instantiation ---
         self.port_page    = PortSelectionPage(self.serial, self.settings)        
         self.control_page = ControlPanelPage(self.settings)
-        self.monitor_page = MonitorPage()
-        self.analysis_page= AnalysisPage(self.settings)
+        self._monitor_page  = None     # built on first use, see monitor_page / analysis_page
+        self._analysis_page = None
 
         # --- Stack the page ---
         self.stack = QStackedWidget()
-        for page in (self.port_page, self.control_page,
-                     self.monitor_page, self.analysis_page):
+        for page in (self.port_page, self.control_page):
             self.stack.addWidget(page)
          # === Main layout===
         central_widget = QWidget()
@@ -87,6 +92,7 @@ class MainWindow(QMainWindow):
         # 1) After handshake READY, PortSelectionPage emits .connected(port)
         self.port_page.connected.connect(self.on_connected)
         self.port_page.analysis_requested.connect(lambda: self.stack.setCurrentWidget(self.analysis_page))
+        #    (MonitorPage / AnalysisPage signals are connected when the page is built)
 
         # 2) In ControlPanelPage: start the test
         self.control_page.start_test.connect(self._on_start_test)
@@ -99,28 +105,65 @@ class MainWindow(QMainWindow):
             lambda: self.stack.setCurrentWidget(self.analysis_page)
         )
 
-        # 3) From MonitorPage and AnalysisPage, return to control panel
-        self.monitor_page.back_to_control.connect(
-            lambda: self.stack.setCurrentWidget(self.control_page)
-        )
-        self.analysis_page.back_to_control.connect(
-            self._back_from_analysis
-        )
-
-        # 4) Start on the port selection page
+        # 3) Start on the port selection page
         self.stack.setCurrentWidget(self.port_page)
 
+    # --- Pages built on first use (keeps their heavy imports out of the cold start) ---
+    @property
+    def monitor_page(self):
+        if self._monitor_page is None:
+            from views.monitor_page import MonitorPage
+            page = MonitorPage(settings=self.settings)
+            # From MonitorPage, return to control panel
+            page.back_to_control.connect(
+                lambda: self.stack.setCurrentWidget(self.control_page)
+            )
+            self.stack.addWidget(page)
+            self._monitor_page = page
+        return self._monitor_page
+
+    @property
+    def analysis_page(self):
+        if self._analysis_page is None:
+            from views.analysis_page import AnalysisPage
+            page = AnalysisPage(self.settings)
+            # From AnalysisPage, return to control panel (or port selection)
+            page.back_to_control.connect(self._back_from_analysis)
+            self.stack.addWidget(page)
+            self._analysis_page = page
+        return self._analysis_page
+
     def on_connected(self):
         """
         As soon as PortSelectionPage confirms the connection (handshake READY),
         wire up serial pages and show the control panel.
         """
         # Initialize pages so they listen to self.serial
+        # (MonitorPage is built here: it must receive the stream from the connection on)
         self.control_page.set_serial(self.serial)
         self.monitor_page.set_serial(self.serial)
+        self._start_serial_capture()
         # Switch to control panel
         self.stack.setCurrentWidget(self.control_page)
 
+    def _start_serial_capture(self):
+        """
+        If settings['acquisition']['capture_dir'] is set, record the raw serial
+        stream of the session there (replay with `python -m controllers.serial_capture`).
+        """
+        capture_dir = self.settings.get("acquisition", {}).get("capture_dir")
+        if not capture_dir:
+            return
+        from datetime import datetime
+        from controllers.serial_capture import CAPTURE_EXTENSION
+        folder = resolve_path_value(capture_dir, None)
+        try:
+            folder.mkdir(parents=True, exist_ok=True)
+            name = datetime.now().strftime("serial_%Y%m%d_%H%M%S") + CAPTURE_EXTENSION
+            self.serial.start_capture(folder / name)
+        except OSError as e:
+            print(f"[WARN] Serial capture disabled: {e}")
+
     def _on_start_test(self, context: dict):
         """
         ControlPanelPage emits its metadata when the signal start_test(meta) is triggered.
@@ -147,8 +190,7 @@ class MainWindow(QMainWindow):
         On serial error, close the port, notify the user, and return to the port selector.
         """
         try:
-            if self.serial.ser and self.serial.ser.is_open:
-                self.serial.ser.close()
+            self.serial.close()
         except Exception:
             pass
         QMessageBox.critical(self, "Serial Error", err)
@@ -192,6 +234,7 @@ class MainWindow(QMainWindow):
         webbrowser.open(mailto_link)
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()   # pool de calcul (utils.parallel_sweep) en exécutable figé
     app = QApplication(sys.argv)
     icon_path = get_path_from_settings("icon_path")
     app.setWindowIcon(QIcon(str(icon_path)))
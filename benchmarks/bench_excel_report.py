@@ -0,0 +1,134 @@
+"""
+Temps d'écriture du rapport Excel : ancienne écriture iterrows() cellule par
+cellule dans openpyxl contre l'ajout des feuilles de données directement dans
+le paquet enregistré (utils.xlsx_stream.splice_rows).
+
+    python -m benchmarks.bench_excel_report --rows 200000
+
+Génère deux fichiers bruts synthétiques (flexion / extension) et, sans
+--template, un modèle minimal avec les feuilles attendues (deux lignes
+d'en-tête). Vérifie que les feuilles de données produites sont identiques
+octet pour octet, puis chronomètre l'export complet (export_to_excel_report),
+classeur openpyxl puis mode streaming, avec le pic mémoire Python (tracemalloc).
+Tout est écrit dans un dossier temporaire, supprimé à la fin.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+import numpy as np
+from openpyxl import Workbook, load_workbook
+
+from utils.data_to_excel_report import (
+    compute_additional_columns, export_to_excel_report, load_and_filter_data,
+)
+from utils.xlsx_stream import sheet_parts, splice_rows
+
+SHEETS = ("Overview", "Flexion", "Extension", "Raw_data_Flexion", "Raw_data_Extension")
+
+
+def _make_template(path):
+    wb = Workbook()
+    wb.remove(wb.active)
+    for name in SHEETS:
+        ws = wb.create_sheet(name)
+        ws.append([name])
+        ws.append(["Time", "Course", "Force"])
+    wb.save(path)
+
+
+def _make_raw(path, rows, seed):
+    rng = np.random.default_rng(seed)
+    t = np.arange(rows) * 0.01
+    phase = (np.arange(rows) % 2000) / 2000.0
+    course = 10.0 * np.minimum(phase, 1.0 - phase) * 2.0 + rng.normal(0, 0.01, rows)
+    force = 50.0 * np.minimum(phase, 1.0 - phase) * 2.0 + rng.normal(0, 0.05, rows)
+    np.savetxt(path, np.column_stack((t, course, force)), fmt="%.2f", delimiter="\t")
+
+
+def _legacy_fill(wb, raw, data, prefix):
+    """Boucles d'origine (iterrows + ws.cell), pour comparaison."""
+    raw_ws, ws = wb[f"Raw_data_{prefix}"], wb[prefix]
+    for i, row in raw.iterrows():
+        raw_ws.cell(row=i+3, column=1, value=row['Time'])
+        raw_ws.cell(row=i+3, column=2, value=row['Course'])
+        raw_ws.cell(row=i+3, column=3, value=row['Force'])
+    for i, row in data.iterrows():
+        for col, val in enumerate(row, 1):
+            ws.cell(row=i+3, column=col, value=val)
+
+
+def _sheet_xml(path):
+    with zipfile.ZipFile(path) as zf:
+        parts = sheet_parts(zf)
+        return {name: zf.read(parts[name]) for name in SHEETS[1:]}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark Excel report export")
+    ap.add_argument("--rows", type=int, default=200_000, help="raw rows per file")
+    ap.add_argument("--template", default=None, help="Excel template (default: minimal generated one)")
+    ap.add_argument("--skip-legacy", action="store_true", help="only time the current export")
+    args = ap.parse_args(argv)
+
+    factor, lever = 0.025, 85.0
+    with tempfile.TemporaryDirectory() as tmp:
+        template = args.template or os.path.join(tmp, "template.xlsx")
+        if not args.template:
+            _make_template(template)
+        flex, ext = os.path.join(tmp, "flex_raw.txt"), os.path.join(tmp, "ext_raw.txt")
+        _make_raw(flex, args.rows, 1)
+        _make_raw(ext, args.rows, 2)
+
+        inputs = {}
+        for prefix, path in (("Flexion", flex), ("Extension", ext)):
+            raw, filtered = load_and_filter_data(path)
+            inputs[prefix] = (raw, compute_additional_columns(filtered, factor, lever))
+        cells = sum(r.size + d.size for r, d in inputs.values())
+        print(f"{args.rows} raw rows per file, {cells} cells to write")
+
+        legacy = os.path.join(tmp, "legacy.xlsx")
+        bulk = os.path.join(tmp, "bulk.xlsx")
+        if not args.skip_legacy:
+            t0 = time.perf_counter()
+            wb = load_workbook(template)
+            for prefix, (raw, data) in inputs.items():
+                _legacy_fill(wb, raw, data, prefix)
+            wb.save(legacy)
+            print(f"  legacy iterrows + save        {time.perf_counter() - t0:8.2f} s")
+
+        t0 = time.perf_counter()
+        wb = load_workbook(template)
+        wb.save(bulk)
+        splice_rows(bulk, {
+            name: (raw[['Time', 'Course', 'Force']].to_numpy() if name.startswith("Raw") else data.to_numpy())
+            for prefix, (raw, data) in inputs.items()
+            for name in (prefix, f"Raw_data_{prefix}")
+        })
+        print(f"  save + splice_rows            {time.perf_counter() - t0:8.2f} s")
+
+        if not args.skip_legacy:
+            same = _sheet_xml(legacy) == _sheet_xml(bulk)
+            print(f"  identical data sheets: {'ok' if same else 'DIFFERENT'}")
+
+        for streaming in (False, True):
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            export_to_excel_report(
+                flex, ext, output_folder=tmp, file_title="bench_report", test_date="20250101",
+                brace_type="RHIZ", sample_reference="bench", speed=1, force_max=50,
+                operator="bench", material="bench", torque=3.4, factor=factor,
+                lever_arm_mm=lever, conflict_strategy="overwrite", template_path=template,
+                streaming=streaming)
+            elapsed = time.perf_counter() - t0
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            label = "export (streaming)" if streaming else "export_to_excel_report"
+            print(f"  {label:<28}  {elapsed:8.2f} s   peak {peak:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Temps de chargement d'un fichier brut selon le chemin de lecture.
+
+    python -m benchmarks.bench_raw_loading --rows 1000000
+
+Génère un fichier texte "%.2f" tabulé (et sa variante à espaces, et le
+binaire .bin) puis compare les anciens chemins de lecture au chargeur
+partagé utils.raw_io.read_raw_text. Les fichiers sont écrits dans un
+dossier temporaire, supprimé à la fin.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.raw_io import RawDataWriter, memmap_raw_binary, read_raw_text
+
+
+def _best_of(fn, repeat):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark raw data loading paths")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    data = np.round(rng.random((args.rows, 3)) * [10.0, 20.0, 50.0], 2).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tab = os.path.join(tmp, "bench_raw.txt")
+        space = os.path.join(tmp, "bench_space_raw.txt")
+        binary = os.path.join(tmp, "bench_raw.bin")
+        np.savetxt(tab, data, fmt="%.2f", delimiter="\t")
+        np.savetxt(space, data, fmt="%.2f", delimiter=" ")
+        writer = RawDataWriter(binary)
+        writer.write(data)
+        writer.close()
+        print(f"{args.rows} rows, text {os.path.getsize(tab) / 1e6:.1f} MB, "
+              f"binary {os.path.getsize(binary) / 1e6:.1f} MB (best of {args.repeat})")
+
+        reference = np.loadtxt(tab, ndmin=2)
+        # (nom, lecture, valeurs attendues)
+        cases = [
+            ("AnalysisPage: read_csv python engine", lambda: pd.read_csv(
+                tab, sep=r"\s+", engine="python", header=None).to_numpy(), reference),
+            ("data_treatement: np.loadtxt", lambda: np.loadtxt(tab, ndmin=2), reference),
+            ("excel report: read_csv sep='\\t'", lambda: pd.read_csv(
+                tab, sep="\t", header=None).to_numpy(), reference),
+            ("read_raw_text (tabs, float64)", lambda: read_raw_text(tab), reference),
+            ("read_raw_text (spaces, float64)", lambda: read_raw_text(space), reference),
+            ("read_raw_text (tabs, float32)", lambda: read_raw_text(tab, dtype=np.float32),
+             reference.astype(np.float32)),
+            ("binary .bin: memmap -> float64", lambda: np.asarray(memmap_raw_binary(binary), dtype=float),
+             data.astype(float)),
+        ]
+        for name, fn, expected in cases:
+            seconds, out = _best_of(fn, args.repeat)
+            same = np.array_equal(out, expected)
+            print(f"  {name:<40} {seconds * 1000:9.1f} ms   "
+                  f"{args.rows / seconds / 1e6:6.2f} Mrows/s   {'ok' if same else 'DIFFERENT'}")
+
+
+if __name__ == "__main__":
+    main()
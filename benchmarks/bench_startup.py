@@ -0,0 +1,123 @@
+"""
+Temps de démarrage de l'application : import de app.py puis construction et
+affichage de la fenêtre principale, dans un processus neuf lancé avec
+`python -X importtime`.
+
+    python -m benchmarks.bench_startup --repeat 5 --top 15 --budget-ms 1500
+
+Affiche, pour le meilleur des `--repeat` lancements : le temps jusqu'à la
+première fenêtre, les imports directs d'app.py et les paquets les plus
+coûteux (temps propre cumulé par paquet de premier niveau), et signale les
+modules lourds (HEAVY_MODULES) déjà chargés à l'affichage. Avec
+--budget-ms, code de sortie 1 si le temps jusqu'à la fenêtre dépasse le
+budget (suivi des régressions). --offscreen : plateforme Qt "offscreen"
+(machine sans écran).
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+# Ne devraient pas être importés avant la première fenêtre (pages construites à la demande)
+HEAVY_MODULES = ("matplotlib", "pandas", "openpyxl", "scipy")
+
+_SNIPPET = r"""
+import sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+from PySide6.QtWidgets import QApplication
+qapp = QApplication(sys.argv[:1])
+window = app.MainWindow()
+window.show()
+qapp.processEvents()
+t2 = time.perf_counter()
+print("STARTUP", t1 - t0, t2 - t0)
+print("MODULES", " ".join(sorted(m for m in sys.modules if "." not in m)))
+"""
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$")
+
+
+def run_once(root, offscreen: bool) -> dict:
+    env = dict(os.environ)
+    if offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _SNIPPET], cwd=root, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0 or "STARTUP" not in proc.stdout:
+        raise RuntimeError(f"Startup run failed:\n{proc.stderr[-2000:]}")
+
+    imports = []            # (profondeur, nom, propre µs, cumulé µs)
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            imports.append((len(m.group(3)) // 2, m.group(4), int(m.group(1)), int(m.group(2))))
+    out = {"imports": imports}
+    for line in proc.stdout.splitlines():
+        key, _, rest = line.partition(" ")
+        if key == "STARTUP":
+            out["import_s"], out["window_s"] = map(float, rest.split())
+        elif key == "MODULES":
+            out["modules"] = set(rest.split())
+    return out
+
+
+def app_children(imports) -> list:
+    """Imports directs d'app.py : (nom, cumulé µs). importtime liste les enfants avant leur parent."""
+    children, pending = [], []
+    for depth, name, _, cumulative in imports:
+        if depth == 1:
+            pending.append((name, cumulative))
+        elif depth == 0:
+            if name == "app":
+                children = pending
+            pending = []
+    return sorted(children, key=lambda c: -c[1])
+
+
+def by_package(imports) -> list:
+    """Temps propre cumulé par paquet de premier niveau : [(paquet, µs)]."""
+    totals = defaultdict(int)
+    for _, name, self_us, _ in imports:
+        totals[name.split(".")[0]] += self_us
+    return sorted(totals.items(), key=lambda kv: -kv[1])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Application cold-start report (-X importtime)")
+    ap.add_argument("--repeat", type=int, default=3, help="runs, the fastest one is reported")
+    ap.add_argument("--top", type=int, default=12, help="packages listed")
+    ap.add_argument("--budget-ms", type=float, default=None, help="fail if time to window exceeds this")
+    ap.add_argument("--offscreen", action="store_true", help="use the offscreen Qt platform")
+    args = ap.parse_args(argv)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = [run_once(root, args.offscreen) for _ in range(max(1, args.repeat))]
+    best = min(runs, key=lambda r: r["window_s"])
+
+    print(f"import app          {best['import_s'] * 1000:8.1f} ms")
+    all_runs = ", ".join(f"{r['window_s'] * 1000:.0f}" for r in runs)
+    print(f"first window shown  {best['window_s'] * 1000:8.1f} ms   (runs: {all_runs} ms)")
+
+    print("\nDirect imports of app.py (cumulative):")
+    for name, us in app_children(best["imports"]):
+        print(f"  {name:<40} {us / 1000:8.1f} ms")
+
+    print(f"\nTop {args.top} packages (self time):")
+    for name, us in by_package(best["imports"])[:args.top]:
+        print(f"  {name:<40} {us / 1000:8.1f} ms")
+
+    heavy = [m for m in HEAVY_MODULES if m in best["modules"]]
+    print(f"\nHeavy modules loaded before the first window: {', '.join(heavy) if heavy else 'none'}")
+
+    if args.budget_ms is not None and best["window_s"] * 1000 > args.budget_ms:
+        print(f"Over budget: {best['window_s'] * 1000:.1f} ms > {args.budget_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,179 @@
+"""
+Interface en ligne de commande, sans Qt (serveur sans écran, scripts nocturnes).
+
+    python -m cli plasticity essai_raw.txt --threshold 0.3 --csv plast.csv
+    python -m cli calibrate essai_raw.txt --mode adaptive --json calib.json
+    python -m cli filter-export essai_raw.txt --start 2 --end 10 --fmin 1 --fmax 40
+    python -m cli report data/Test_RHIZ_20250101 --conflict overwrite
+
+Mêmes fonctions que l'onglet Analysis (utils.data_treatement,
+utils.data_to_excel_report, utils.report_builder). Aucun module PySide6
+n'est importé : les boîtes de dialogue ne sont chargées qu'à leur appel.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+
+def _settings():
+    """settings.json si disponible (budget du cache, workers, chemins), sinon {}."""
+    from utils.setting_utils import load_settings
+    try:
+        return load_settings()
+    except (FileNotFoundError, RuntimeError):
+        return {}
+
+
+def _print_progress(fraction, message=""):
+    print(f"\r[{fraction * 100:5.1f} %] {message:<40}", end="", file=sys.stderr, flush=True)
+
+
+def cmd_plasticity(args, settings):
+    from utils.data_treatement import compute_abs_plasticity
+    df = compute_abs_plasticity(args.file, time_reset_threshold=args.time_reset,
+                                force_threshold=args.threshold, min_cycle_length=args.min_cycle_length)
+    if df.empty:
+        print(f"No absolute plasticity could be computed at Fref = {args.threshold:.3f} N", file=sys.stderr)
+        return 1
+    if args.csv:
+        df.to_csv(args.csv, index=False)
+        print(f"Written: {args.csv}")
+    else:
+        print(df.to_string(index=False))
+    last = float(df["Abs_plast_mm"].iloc[-1])
+    print(f"Absolute plasticity (last cycle) = {last:.3f} mm (Fref = {args.threshold:.3f} N)")
+    return 0
+
+
+def cmd_calibrate(args, settings):
+    from utils.data_treatement import calibrate_threshold_match_target_first
+    from utils.parallel_sweep import sweep_options
+    options = sweep_options(settings)
+    if args.workers is not None:
+        options["workers"] = sweep_options({"analysis": {"workers": args.workers}})["workers"]
+
+    t0 = time.perf_counter()
+    best_t, diag = calibrate_threshold_match_target_first(
+        args.file, target_F0=args.target_f0, time_reset_threshold=args.time_reset,
+        min_cycle_length=args.min_cycle_length, search_range=tuple(args.range), step=args.step,
+        mode=args.mode, resolution=args.resolution,
+        progress=None if args.quiet else _print_progress, **options)
+    if not args.quiet:
+        print(file=sys.stderr)
+    elapsed = time.perf_counter() - t0
+
+    target = diag.get("target")
+    if best_t is None or target is None:
+        print(f"No satisfactory threshold ({diag.get('reason', 'no near-zero target')}).")
+        return 1
+    print(f"Best Fref = {best_t:.3f} N | target = {target:.3f} mm "
+          f"| {diag.get('n_evaluated', len(diag.get('candidates', {})))} thresholds in {elapsed:.2f} s")
+    if args.json:
+        best = diag["candidates"][best_t]
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"best_threshold_N": float(best_t), "target_mm": float(target),
+                       "mode": args.mode, "best": best}, f, indent=4, default=float)
+        print(f"Written: {args.json}")
+    return 0
+
+
+def cmd_filter_export(args, settings):
+    from utils.data_cache import load_cached_cycles
+    from utils.data_treatement import export_filtered_cycles, filter_cycles
+    cycles = load_cached_cycles(args.file, args.time_reset)
+    df = filter_cycles(cycles, args.start, args.end, args.fmin, args.fmax, args.rising_only)
+    if df.empty:
+        print("No data matches the filter.", file=sys.stderr)
+        return 1
+    path = export_filtered_cycles(df, args.file, args.start, args.end, args.output)
+    print(f"{len(df)} points from {len(cycles)} cycles -> {path}")
+    return 0
+
+
+def cmd_report(args, settings):
+    from utils.report_builder import discover_test_folders, format_summary, run_batch
+    from utils.parallel_sweep import sweep_options
+    from utils.setting_utils import get_path_from_settings
+
+    folders = []
+    for path in args.paths or [str(get_path_from_settings("data_path", settings))]:
+        is_test = any(os.path.isfile(os.path.join(path, f"config_{m}.json")) for m in ("flexion", "extension"))
+        folders += [path] if is_test else discover_test_folders(path)
+    folders = list(dict.fromkeys(os.path.abspath(f) for f in folders))
+    if not folders:
+        print("No test folder found.", file=sys.stderr)
+        return 1
+
+    template = args.template or str(get_path_from_settings("template_excel", settings))
+    workers = sweep_options(settings if args.workers is None else {"analysis": {"workers": args.workers}})["workers"]
+    t0 = time.perf_counter()
+    rows = run_batch(folders, template, args.conflict, workers)
+    print(format_summary(rows, time.perf_counter() - t0))
+    return 0 if all(r["status"] == "ok" for r in rows) else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="python -m cli", description="Testbench analysis without the GUI")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    def raw_command(name, help_text):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("file", help="raw data file (_raw.txt or _raw.bin)")
+        p.add_argument("--time-reset", type=float, default=0.05, help="time step back that starts a new cycle [s]")
+        return p
+
+    p = raw_command("plasticity", "absolute plasticity per cycle")
+    p.add_argument("--threshold", type=float, default=0.3, help="reference force Fref [N]")
+    p.add_argument("--min-cycle-length", type=int, default=10)
+    p.add_argument("--csv", default=None, help="write the table to this CSV file")
+    p.set_defaults(func=cmd_plasticity)
+
+    p = raw_command("calibrate", "calibrate the plasticity threshold")
+    p.add_argument("--target-f0", type=float, default=0.05, help="force of the global target [N]")
+    p.add_argument("--min-cycle-length", type=int, default=10)
+    p.add_argument("--range", type=float, nargs=2, default=(0.01, 2.0), metavar=("MIN", "MAX"),
+                   help="threshold search range [N]")
+    p.add_argument("--step", type=float, default=0.05, help="grid step (coarse pass in adaptive mode) [N]")
+    p.add_argument("--mode", choices=("adaptive", "grid"), default="adaptive")
+    p.add_argument("--resolution", type=float, default=0.001, help="finest step in adaptive mode [N]")
+    p.add_argument("--workers", type=int, default=None,
+                   help="worker processes (default: settings analysis.workers, 0 = one per core)")
+    p.add_argument("--json", default=None, help="write the result to this JSON file")
+    p.add_argument("--quiet", action="store_true", help="no progress output")
+    p.set_defaults(func=cmd_calibrate)
+
+    p = raw_command("filter-export", "export cycles filtered by index and force range")
+    p.add_argument("--start", type=int, required=True, help="first cycle (0-based)")
+    p.add_argument("--end", type=int, required=True, help="last cycle (inclusive)")
+    p.add_argument("--fmin", type=float, default=None, help="minimum force [N]")
+    p.add_argument("--fmax", type=float, default=None, help="maximum force [N]")
+    p.add_argument("--rising-only", action="store_true", help="keep only the ascent phase of each cycle")
+    p.add_argument("--output", default=None, help="output file (default: <name>_filtered-cycle<start>-<end>.txt)")
+    p.set_defaults(func=cmd_filter_export)
+
+    p = sub.add_parser("report", help="Excel reports of test folders")
+    p.add_argument("paths", nargs="*",
+                   help="test folders, or folders containing them (default: settings data_path)")
+    p.add_argument("--template", default=None, help="Excel template (default: settings template_excel)")
+    p.add_argument("--conflict", choices=("auto_rename", "overwrite"), default="auto_rename",
+                   help="what to do when a report already exists")
+    p.add_argument("--workers", type=int, default=None,
+                   help="worker processes (default: settings analysis.workers, 0 = one per core)")
+    p.set_defaults(func=cmd_report)
+    return ap
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    settings = _settings()
+    from utils.data_cache import configure_cache
+    configure_cache(settings)
+    return args.func(args, settings)
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    raise SystemExit(main())
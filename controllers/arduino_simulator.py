@@ -0,0 +1,373 @@
+# controllers/arduino_simulator.py
+"""
+Simulateur de banc (Arduino Uno) sur pseudo-terminal, pour tester sans matériel.
+
+    python -m controllers.arduino_simulator --rate 1000 --corrupt 0.01
+
+affiche le port à ouvrir (ex. /dev/pts/7) ; SerialHandler.open(port) et la page
+de sélection de port fonctionnent sans modification. POSIX uniquement (pty).
+
+Protocole reproduit :
+- "READY" au démarrage (répété tant qu'aucune commande n'a été reçue, le pty
+  ne signalant pas l'ouverture du port comme le reset DTR de l'Uno) ;
+- commandes JSON : start, homing, read, calibrate, up, down, stop ;
+- octet 0xFF : arrêt d'urgence ;
+- trames binaires 0xAA + (t, d, f) float32 LE + checksum XOR, "Cycle finished: N",
+  événements {"event": "START" | "END" | "IDLE" | "EMERGENCY_STOP" | "READ"}.
+Défauts injectables : checksums corrompus, trames tronquées, rafales.
+
+    python -m controllers.arduino_simulator --check-parser
+
+vérifie la resynchronisation du parseur série sur ces défauts, sans pty.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import select
+import struct
+import threading
+import time
+
+from controllers.serial_handler import START_BYTE
+
+STOP_BYTE = 0xFF
+
+
+def encode_frame(t: float, d: float, f: float, corrupt: bool = False) -> bytes:
+    payload = struct.pack('<fff', t, d, f)
+    chk = START_BYTE[0]
+    for b in payload:
+        chk ^= b
+    if corrupt:
+        chk ^= 0x5A
+    return START_BYTE + payload + bytes([chk])
+
+
+class HysteresisModel:
+    """
+    Courbe force / déplacement d'une orthèse : contact à d_contact, charge en
+    loi puissance, décharge plus basse (boucle d'hystérésis) et déformation
+    plastique qui s'accumule puis sature au fil des cycles.
+    """
+
+    def __init__(self, stiffness=2.5, exponent=1.4, contact_mm=0.5,
+                 plastic_max_mm=0.8, plastic_tau=30.0, recovery_gap=0.15,
+                 noise_n=0.02, seed=None):
+        self.k = stiffness
+        self.n = exponent
+        self.contact = contact_mm
+        self.recovery_gap = recovery_gap
+        self.plastic_max = plastic_max_mm
+        self.plastic_tau = plastic_tau
+        self.noise = noise_n
+        self.rng = random.Random(seed)
+
+    def contact_at(self, cycle: int) -> float:
+        return self.contact + self.plastic_max * (1.0 - math.exp(-cycle / self.plastic_tau))
+
+    def loading(self, d: float, cycle: int) -> float:
+        x = max(0.0, d - self.contact_at(cycle))
+        return self.k * x ** self.n + self.rng.gauss(0.0, self.noise)
+
+    def unloading(self, d: float, d_peak: float, f_peak: float, cycle: int) -> float:
+        # retour sur une courbe plus basse, qui rejoint 0 après le point de contact du cycle suivant
+        d_ret = self.contact_at(cycle + 1) + self.recovery_gap * (d_peak - self.contact_at(cycle))
+        if d_peak <= d_ret:
+            return self.rng.gauss(0.0, self.noise)
+        x = max(0.0, (d - d_ret) / (d_peak - d_ret))
+        return f_peak * x ** 2.2 + self.rng.gauss(0.0, self.noise)
+
+
+class ArduinoSimulator:
+    """
+    Simulateur threadé : lit les commandes sur le maître du pty et y écrit
+    les lignes texte / trames binaires. `port` est le chemin à ouvrir.
+    """
+
+    def __init__(self, rate_hz: float = 200.0, time_scale: float = 1.0,
+                 corrupt_rate: float = 0.0, truncate_rate: float = 0.0,
+                 burst_every_s: float = 0.0, burst_hold_s: float = 0.2,
+                 model: HysteresisModel | None = None, seed=None):
+        self.rate_hz = rate_hz
+        self.time_scale = time_scale           # >1 : plus rapide que le temps réel
+        self.corrupt_rate = corrupt_rate
+        self.truncate_rate = truncate_rate
+        self.burst_every_s = burst_every_s
+        self.burst_hold_s = burst_hold_s
+        self.model = model or HysteresisModel(seed=seed)
+        self.rng = random.Random(seed)
+
+        self.port = None
+        self.frames_sent = 0
+        self.frames_corrupted = 0
+        self.frames_truncated = 0
+        self._master = self._slave = None
+        self._thread = None
+        self._stop_evt = threading.Event()
+        self._abort = threading.Event()       # arrêt d'urgence / commande stop
+        self._rx = bytearray()
+        self._handshake_done = False
+        self._test = None                      # paramètres du test en cours
+        self._out = bytearray()                # sortie en attente (rafales)
+        self._burst_until = 0.0
+        self._next_burst = 0.0
+
+    # ---------- cycle de vie ----------
+    def start(self) -> str:
+        import pty
+        import tty
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)                # pas d'écho ni de traitement de ligne
+        self.port = os.ttyname(self._slave)
+        self._stop_evt.clear()
+        self._thread = threading.Thread(target=self._run, name="ArduinoSimulator", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        self._stop_evt.set()
+        self._abort.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master = self._slave = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---------- E/S ----------
+    def _write(self, data: bytes, flush: bool = False):
+        self._out += data
+        now = time.perf_counter()
+        if self.burst_every_s > 0:
+            if now >= self._next_burst:
+                self._burst_until = now + self.burst_hold_s
+                self._next_burst = now + self.burst_every_s
+            if now < self._burst_until and not flush:
+                return                          # retenu : partira d'un bloc
+        while self._out and not self._stop_evt.is_set():
+            try:
+                n = os.write(self._master, self._out)
+            except BlockingIOError:
+                time.sleep(0.001)
+                continue
+            except OSError:
+                return
+            del self._out[:n]
+
+    def _line(self, text: str):
+        self._write(text.encode("utf-8") + b"\n", flush=True)
+
+    def _event(self, name: str, **extra):
+        self._line(json.dumps({"event": name, **extra}))
+
+    def _frame(self, t: float, d: float, f: float):
+        corrupt = self.rng.random() < self.corrupt_rate
+        data = encode_frame(t, d, f, corrupt=corrupt)
+        self.frames_corrupted += corrupt
+        if self.rng.random() < self.truncate_rate:
+            data = data[:self.rng.randint(1, len(data) - 1)]
+            self.frames_truncated += 1
+        self.frames_sent += 1
+        self._write(data)
+
+    def _poll_commands(self, timeout: float = 0.0):
+        """Lit ce qui arrive du PC ; traite 0xFF et les lignes JSON complètes."""
+        try:
+            ready, _, _ = select.select([self._master], [], [], timeout)
+            if not ready:
+                return
+            chunk = os.read(self._master, 4096)
+        except OSError:
+            return
+        if STOP_BYTE in chunk:
+            chunk = chunk.replace(bytes([STOP_BYTE]), b"")
+            if self._test is not None:
+                self._abort.set()
+                self._event("EMERGENCY_STOP")
+        self._rx += chunk
+        while b"\n" in self._rx:
+            raw, _, rest = self._rx.partition(b"\n")
+            self._rx = bytearray(rest)
+            line = raw.decode("utf-8", errors="ignore").strip()
+            if line:
+                self._handle_command(line)
+
+    def _handle_command(self, line: str):
+        try:
+            msg = json.loads(line)
+        except json.JSONDecodeError:
+            self._line(f"Unknown command: {line}")
+            return
+        self._handshake_done = True
+        cmd = msg.get("cmd")
+        if cmd == "start":
+            p = msg.get("p", {})
+            self._test = {
+                "speed": float(p.get("sp", 0.5)),
+                "cycles": int(p.get("cy", 1)),
+                "force_max": float(p.get("ft", 50.0)),
+                "dist_max": float(p.get("dm", 10.0)),
+            }
+            self._abort.clear()
+        elif cmd == "homing":
+            self._line("Homing...")
+            self._event("IDLE")
+        elif cmd == "read":
+            f = self.model.loading(0.0, 0)
+            self._event("READ", f=round(f, 3))
+            self._write(encode_frame(0.0, 0.0, f), flush=True)
+        elif cmd == "calibrate":
+            weight = float(msg.get("weight", 0.0))
+            self._line(f"Calibration with {weight:.1f} g ...")
+            self._event("CALIBRATED", factor=round(420.0 + self.rng.uniform(-5, 5), 3))
+        elif cmd in ("up", "down"):
+            self._line(f"Manual move {cmd}")
+        elif cmd == "stop":
+            self._abort.set()
+            self._event("IDLE")
+        else:
+            self._line(f"Unknown command: {line}")
+
+    # ---------- boucle principale ----------
+    def _run(self):
+        last_ready = 0.0
+        while not self._stop_evt.is_set():
+            if not self._handshake_done and time.perf_counter() - last_ready > 1.0:
+                self._line("READY")
+                last_ready = time.perf_counter()
+            if self._test is not None:
+                self._run_test(self._test)
+                self._test = None
+            else:
+                self._poll_commands(timeout=0.05)
+
+    def _run_test(self, test: dict):
+        self._event("START")
+        dt = 1.0 / self.rate_hz
+        step_mm = test["speed"] * dt
+        t_next = time.perf_counter()
+        for cycle in range(test["cycles"]):
+            t, d, f = 0.0, 0.0, 0.0
+            d_peak = f_peak = None
+            going_down = True
+            while True:
+                if self._abort.is_set() or self._stop_evt.is_set():
+                    self._flush_out()
+                    return
+                if going_down:
+                    d += step_mm
+                    f = self.model.loading(d, cycle)
+                    if f >= test["force_max"] or d >= test["dist_max"]:
+                        going_down, d_peak, f_peak = False, d, f
+                else:
+                    d -= step_mm
+                    f = self.model.unloading(d, d_peak, f_peak, cycle)
+                    if d <= 0.0:
+                        break
+                self._frame(t, d, f)
+                t += dt
+                # cadence : rate_hz trames / s (accéléré par time_scale)
+                t_next += dt / self.time_scale
+                delay = t_next - time.perf_counter()
+                if delay > 0:
+                    self._poll_commands(timeout=delay)
+                elif int(t / dt) % 64 == 0:
+                    self._poll_commands()
+            self._flush_out()
+            self._line(f"Cycle finished: {cycle + 1}")
+        self._event("END")
+
+    def _flush_out(self):
+        self._write(b"", flush=True)
+
+
+def check_parser() -> list:
+    """
+    Vérifie la resynchronisation de parse_buffer après une trame corrompue ou
+    tronquée, suivie de trames ou d'une ligne de texte, le flux étant lu d'un
+    bloc puis octet par octet. Retourne la liste des écarts (vide si OK).
+    """
+    from controllers.serial_handler import parse_buffer
+
+    def run(stream: bytes, step: int) -> tuple:
+        buf, frames, lines, dropped = b"", 0, [], 0
+        for pos in range(0, len(stream), step):
+            buf += stream[pos:pos + step]
+            items, consumed, d = parse_buffer(buf)
+            buf, dropped = buf[consumed:], dropped + d
+            for kind, value in items:
+                if kind == "block":
+                    frames += len(value)
+                else:
+                    lines.append(value.decode("utf-8", errors="replace").strip())
+        return frames, lines, dropped
+
+    good = [encode_frame(0.01 * i, 0.1 * i, 0.5 * i) for i in range(1, 5)]
+    bad = encode_frame(1.0, 2.0, 3.0, corrupt=True)
+    line = b"Cycle finished: 1\n"
+    cases = {
+        "frame, truncated frame, two frames": (good[0] + good[1][:7] + good[2] + good[3], (3, [], 1)),
+        "frame, truncated frame, text line": (good[0] + good[1][:7] + line, (1, ["Cycle finished: 1"], 1)),
+        "corrupted frame, text line": (bad + line, (0, ["Cycle finished: 1"], 1)),
+        "corrupted frame, truncated frame, frame": (bad + good[0][:5] + good[1], (1, [], 2)),
+        "two corrupted frames, text line": (bad + bad + line, (0, ["Cycle finished: 1"], 2)),
+    }
+    errors = []
+    for name, (stream, expected) in cases.items():
+        for step in (len(stream), 1):
+            got = run(stream, step)
+            if got != expected:
+                errors.append(f"{name} (reads of {step} B): expected {expected}, got {got}")
+    return errors
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Pseudo-terminal Arduino test bench simulator")
+    ap.add_argument("--rate", type=float, default=200.0, help="frames per second")
+    ap.add_argument("--time-scale", type=float, default=1.0, help="speed-up factor vs real time")
+    ap.add_argument("--corrupt", type=float, default=0.0, help="probability of a bad checksum")
+    ap.add_argument("--truncate", type=float, default=0.0, help="probability of a truncated frame")
+    ap.add_argument("--burst-every", type=float, default=0.0, help="seconds between output bursts (0 = off)")
+    ap.add_argument("--burst-hold", type=float, default=0.2, help="seconds of output held per burst")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--check-parser", action="store_true",
+                    help="check frame resynchronisation of the serial parser and exit")
+    args = ap.parse_args(argv)
+
+    if args.check_parser:
+        errors = check_parser()
+        print("\n".join(errors) if errors else "parse_buffer: resynchronisation OK")
+        raise SystemExit(1 if errors else 0)
+
+    sim = ArduinoSimulator(rate_hz=args.rate, time_scale=args.time_scale,
+                           corrupt_rate=args.corrupt, truncate_rate=args.truncate,
+                           burst_every_s=args.burst_every, burst_hold_s=args.burst_hold,
+                           seed=args.seed)
+    port = sim.start()
+    print(f"Simulated Arduino on {port} (Ctrl+C to quit)", flush=True)
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"frames sent={sim.frames_sent} corrupted={sim.frames_corrupted} "
+              f"truncated={sim.frames_truncated}")
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# controllers/serial_capture.py
+"""
+Enregistrement et relecture du flux série brut.
+
+Fichier de capture (.tbcap) :
+    CAPTURE_MAGIC (8 octets)
+    | enregistrements : t (float64 LE, s depuis le début) | n (uint32 LE) | n octets
+Chaque enregistrement est un morceau tel que lu sur le port, avant découpage :
+la relecture repasse donc exactement par parse_buffer / _dispatch_all.
+
+    python -m controllers.serial_capture session.tbcap --speed 10 --monitor --raw out_raw.bin
+
+relit une capture (1×, 10×, … ; --speed 0 = vitesse max) et affiche le débit
+en trames/s ainsi que les trames perdues.
+"""
+import argparse
+import os
+import struct
+import threading
+import time
+
+CAPTURE_MAGIC = b"TBCAP\x00\x01\n"
+CAPTURE_EXTENSION = ".tbcap"
+_RECORD = struct.Struct("<dI")
+
+
+class CaptureWriter:
+    """Ajoute les morceaux lus sur le port à un fichier de capture horodaté."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._file = open(self.path, "wb", buffering=1 << 20)
+        self._file.write(CAPTURE_MAGIC)
+        self._lock = threading.Lock()   # lecteur threadé ou timer GUI selon le mode
+        self._t0 = time.perf_counter()
+        self.bytes_written = 0
+        self.chunks = 0
+
+    def write(self, chunk: bytes):
+        if not chunk:
+            return
+        t = time.perf_counter() - self._t0
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(_RECORD.pack(t, len(chunk)))
+            self._file.write(chunk)
+        self.bytes_written += len(chunk)
+        self.chunks += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_capture(path):
+    """Itère sur les (t, octets) d'un fichier de capture. Un enregistrement tronqué en fin est ignoré."""
+    with open(path, "rb") as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"Not a serial capture file: {path}")
+        while True:
+            head = f.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                return
+            t, n = _RECORD.unpack(head)
+            chunk = f.read(n)
+            if len(chunk) < n:
+                return
+            yield t, chunk
+
+
+class ReplaySerial:
+    """
+    Port série factice (sous-ensemble de serial.Serial) qui rend les octets
+    d'une capture au rythme enregistré, accéléré `speed` fois (0 = tout
+    disponible immédiatement). À brancher avec SerialHandler.attach().
+    """
+
+    def __init__(self, path, speed: float = 1.0, timeout: float = 0.1):
+        self.records = list(read_capture(path))
+        self.speed = speed
+        self.timeout = timeout
+        self.is_open = True
+        self.total_bytes = sum(len(c) for _, c in self.records)
+        self._next = 0                  # prochain enregistrement à libérer
+        self._pending = bytearray()     # libéré mais pas encore lu
+        self._lock = threading.Lock()
+        self._t0 = None
+
+    @property
+    def finished(self) -> bool:
+        return self._next >= len(self.records) and not self._pending
+
+    def _release(self):
+        if self._t0 is None:
+            self._t0 = time.perf_counter()
+        if self.speed > 0:
+            now = (time.perf_counter() - self._t0) * self.speed
+        else:
+            now = float("inf")
+        recs = self.records
+        while self._next < len(recs) and recs[self._next][0] <= now:
+            self._pending += recs[self._next][1]
+            self._next += 1
+
+    @property
+    def in_waiting(self) -> int:
+        with self._lock:
+            self._release()
+            return len(self._pending)
+
+    def read(self, size: int = 1) -> bytes:
+        deadline = time.perf_counter() + (self.timeout or 0.0)
+        while True:
+            with self._lock:
+                self._release()
+                if self._pending or self._next >= len(self.records):
+                    data = bytes(self._pending[:size])
+                    del self._pending[:size]
+                    return data
+            if time.perf_counter() >= deadline:
+                return b""
+            time.sleep(0.001)
+
+    def write(self, data: bytes) -> int:
+        return len(data)                # les commandes du PC sont ignorées
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+def replay(path, handler, speed: float = 1.0, app=None, timeout_s: float | None = None) -> dict:
+    """
+    Relit une capture dans `handler` (SerialHandler) et retourne les statistiques.
+    - speed == 0 : chaque morceau est passé directement à _ingest / _dispatch_all,
+      sans boucle d'évènements (mesure du débit max du pipeline) ;
+    - speed > 0 : un ReplaySerial est branché sur le handler et la boucle Qt
+      (`app`) tourne jusqu'à épuisement, en mode polling ou threadé.
+    """
+    frames = [0]
+
+    def _count(block):
+        frames[0] += len(block)
+
+    handler.data_block_received.connect(_count)
+    handler.reset_counters()
+    t0 = time.perf_counter()
+    try:
+        if speed <= 0:
+            nbytes = 0
+            for _, chunk in read_capture(path):
+                nbytes += len(chunk)
+                handler._dispatch_all(handler._ingest(chunk))
+        else:
+            port = ReplaySerial(path, speed=speed)
+            nbytes = port.total_bytes
+            handler.attach(port)
+            while not port.finished or handler._queue:
+                if timeout_s is not None and time.perf_counter() - t0 > timeout_s:
+                    break
+                app.processEvents()
+                time.sleep(0.001)
+            app.processEvents()
+            handler.close()
+            # le thread de lecture (joint par close) a pu pousser le dernier
+            # morceau après que la file a été vue vide
+            handler._drain_queue()
+    finally:
+        handler.data_block_received.disconnect(_count)
+    elapsed = time.perf_counter() - t0
+    return {
+        "frames": frames[0],
+        "bytes": nbytes,
+        "elapsed_s": elapsed,
+        "frames_per_s": frames[0] / elapsed if elapsed > 0 else 0.0,
+        "dropped_frames": handler.dropped_frames,
+        "overflowed_frames": handler.overflowed_frames,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay a serial capture through the acquisition pipeline")
+    ap.add_argument("capture", help="capture file (" + CAPTURE_EXTENSION + ")")
+    ap.add_argument("--speed", type=float, default=1.0, help="replay speed factor (0 = as fast as possible)")
+    ap.add_argument("--threaded", action="store_true", help="use the threaded serial reader")
+    ap.add_argument("--poll-ms", type=int, default=30, help="GUI polling interval")
+    ap.add_argument("--monitor", action="store_true", help="feed a MonitorPage (live plot) as well")
+    ap.add_argument("--raw", default=None, help="also write the raw data file (.txt or .bin)")
+    args = ap.parse_args(argv)
+
+    from PySide6.QtWidgets import QApplication
+    from controllers.serial_handler import SerialHandler
+
+    app = QApplication.instance() or QApplication([])
+    handler = SerialHandler(None, args.poll_ms, threaded=args.threaded)
+
+    tmp_raw = None
+    if args.monitor:
+        import tempfile
+        from utils.setting_utils import load_settings
+        from views.monitor_page import MonitorPage
+        page = MonitorPage(settings=load_settings())
+        page.resize(1000, 700)
+        page.show()
+        page.set_serial(handler)
+        raw_path = args.raw
+        if raw_path is None:
+            fd, raw_path = tempfile.mkstemp(suffix="_raw.txt")
+            os.close(fd)
+            tmp_raw = raw_path
+        page.set_metadata({
+            "metadata": {"name": os.path.basename(args.capture), "date": "", "operator": "replay"},
+            "folder": os.path.dirname(os.path.abspath(raw_path)),
+            "file_path": raw_path,
+            "config": {"cycles": 0, "prep_cycle": False},
+        })
+    elif args.raw:
+        from utils.raw_io import RawDataWriter
+        writer = RawDataWriter(args.raw)
+        handler.data_block_received.connect(writer.write)
+
+    stats = replay(args.capture, handler, speed=args.speed, app=app)
+
+    if args.monitor:
+        page._on_event("END")
+        if tmp_raw:
+            os.remove(tmp_raw)
+    elif args.raw:
+        writer.close()
+    print(f"{stats['frames']} frames, {stats['bytes']} bytes in {stats['elapsed_s']:.3f} s "
+          f"-> {stats['frames_per_s']:.0f} frames/s "
+          f"(dropped={stats['dropped_frames']}, overflowed={stats['overflowed_frames']})")
+
+
+if __name__ == "__main__":
+    main()
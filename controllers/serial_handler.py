@@ -1,44 +1,257 @@
 
 # controllers/serial_handler.py
 import json
-import struct
+import threading
+from collections import deque
+import numpy as np
 import serial
 from PySide6.QtCore import QObject, QTimer, Signal
 
+START_BYTE  = b'\xAA'
+PAYLOAD_LEN = 12
+FRAME_LEN   = PAYLOAD_LEN + 1          # checksum en plus
+FRAME_TOTAL = FRAME_LEN + 1            # octet de start compris
+MAX_LINE_LEN = 4096                    # au-delà, une ligne sans '\n' est émise telle quelle
+_FRAME_OFFSETS = np.arange(FRAME_TOTAL)
+
+
+def _is_text(byte) -> bool:
+    return 0x20 <= byte <= 0x7E or byte in (0x09, 0x0D)
+
+
+def _is_line_end(arr, nl: int, stop: int) -> bool:
+    """
+    0x0A précédé de texte et suivi, jusqu'à `stop`, de texte puis
+    éventuellement d'un 0xAA : sinon c'est un octet de la trame.
+    """
+    if not _is_text(arr[nl - 1]):
+        return False
+    for b in arr[nl + 1:stop]:
+        if not _is_text(b):
+            return b == START_BYTE[0]
+    return True
+
+
+def _resync(arr, data: bytes, pos: int, valid_starts):
+    """
+    Position de reprise après une trame invalide commençant en `pos` : la
+    trame valide suivante si elle précède la fin de ligne (même règle que
+    pour le texte), sinon le début de la ligne de texte, c.-à-d. après le
+    dernier octet non imprimable avant le '\n'. None si la suite n'est pas
+    encore arrivée.
+    """
+    n = arr.size
+    j = np.searchsorted(valid_starts, pos + 1)
+    nxt = int(valid_starts[j]) if j < valid_starts.size else -1
+    full = pos + FRAME_TOTAL
+    if nxt < 0 and full >= n:
+        return None  # trame complète ou tronquée : pas encore décidable
+    if (nxt < 0 or nxt >= full) and arr[full] == START_BYTE[0]:
+        return full  # trame complète au checksum faux, suivie d'une autre trame
+    nl = data.find(b'\n', pos + 1)
+    # un 0x0A entouré d'octets binaires fait partie de la trame, pas du texte
+    while nl >= 0 and (nxt < 0 or nl < nxt) and not _is_line_end(arr, nl, max(full, nl + 2)):
+        nl = data.find(b'\n', nl + 1)
+    if nxt >= 0 and (nl < 0 or nxt < nl):
+        return nxt
+    if nl < 0:
+        return None if n - pos < MAX_LINE_LEN else n
+    # 0xAA dont la trame n'est pas complète avant la fin de ligne : on attend
+    if data.find(START_BYTE, max(pos + 1, n - FRAME_TOTAL + 1), nl) >= 0:
+        return None
+    seg = arr[pos + 1:nl]
+    binary = np.flatnonzero(((seg < 0x20) & (seg != 0x09) & (seg != 0x0D)) | (seg > 0x7E))
+    start = pos + 1 + (int(binary[-1]) + 1 if binary.size else 0)
+    if start < full <= nl and full - start <= 2:
+        start = full  # checksum ou octet de poids fort imprimable : fin d'une trame complète
+    return start
+
+
+def parse_buffer(data: bytes):
+    """
+    Découpe un flux mixte texte / binaire.
+    Retourne (items, consumed, dropped) où items est une liste ordonnée de
+    ("block", ndarray (N, 3) float32) | ("line", bytes), `consumed` le nombre
+    d'octets traités (le reste est une trame ou une ligne incomplète à garder
+    pour la lecture suivante) et `dropped` le nombre de trames corrompues.
+
+    Checksums et décodage sont vectorisés : toutes les positions 0xAA sont
+    validées d'un coup, puis chaque série de trames consécutives valides est
+    décodée en un seul np.frombuffer('<f4').
+    """
+    arr = np.frombuffer(data, dtype=np.uint8)
+    n = arr.size
+    items, dropped = [], 0
+
+    # Validité de chaque trame candidate (XOR start + payload == checksum)
+    valid_at = np.zeros(n, dtype=bool)
+    if n >= FRAME_TOTAL:
+        starts = np.flatnonzero(arr[:n - FRAME_TOTAL + 1] == START_BYTE[0])
+        if starts.size:
+            win = arr[starts[:, None] + _FRAME_OFFSETS]
+            ok = np.bitwise_xor.reduce(win[:, :FRAME_LEN], axis=1) == win[:, FRAME_LEN]
+            valid_at[starts[ok]] = True
+    valid_starts = np.flatnonzero(valid_at)
+
+    pos = 0
+    while pos < n:
+        if arr[pos] == START_BYTE[0]:
+            if pos + FRAME_TOTAL > n:
+                break  # trame incomplète : conservée pour la prochaine lecture
+            run = valid_at[pos:n - FRAME_TOTAL + 1:FRAME_TOTAL]
+            k = int(run.argmin()) if not run.all() else run.size
+            if k == 0:
+                # trame corrompue ou tronquée : reprise à la trame valide
+                # suivante ou au début de la ligne de texte qui suit
+                nxt = _resync(arr, data, pos, valid_starts)
+                if nxt is None:
+                    break  # suite pas encore reçue : trame conservée
+                dropped += 1
+                pos = nxt
+                continue
+            frames = arr[pos:pos + k * FRAME_TOTAL].reshape(k, FRAME_TOTAL)
+            payload = np.ascontiguousarray(frames[:, 1:FRAME_LEN])
+            block = np.frombuffer(payload.tobytes(), dtype='<f4').reshape(k, 3)
+            # trames sentinelles (-1, -1, -1) : pas des mesures
+            block = block[~np.all(block == -1.0, axis=1)]
+            if block.size:
+                items.append(("block", block))
+            pos += k * FRAME_TOTAL
+        else:
+            nl = data.find(b'\n', pos)
+            # une trame valide avant la fin de ligne : les octets qui précèdent
+            # sont les restes d'une trame tronquée, pas du texte → resynchronisation
+            j = np.searchsorted(valid_starts, pos)
+            nxt = int(valid_starts[j]) if j < valid_starts.size else -1
+            if nxt >= 0 and (nl < 0 or nxt < nl):
+                dropped += 1
+                pos = nxt
+                continue
+            if nl < 0:
+                if n - pos < MAX_LINE_LEN:
+                    break  # ligne incomplète : conservée
+                nl = n - 1
+            items.append(("line", data[pos:nl + 1]))
+            pos = nl + 1
+    return items, pos, dropped
+
+
+class _SerialReader(threading.Thread):
+    """
+    Thread d'acquisition : possède le port, fait des lectures bloquantes
+    et pousse les éléments décodés dans la file du SerialHandler.
+    """
+
+    def __init__(self, handler, ser):
+        super().__init__(name="SerialReader", daemon=True)
+        self.handler = handler
+        self.ser = ser
+        self._stop_evt = threading.Event()
+
+    def stop(self):
+        self._stop_evt.set()
+
+    def run(self):
+        h = self.handler
+        while not self._stop_evt.is_set():
+            try:
+                # bloquant jusqu'au timeout du port, puis tout ce qui est dispo
+                chunk = self.ser.read(max(1, self.ser.in_waiting))
+                if not chunk:
+                    continue
+                for item in h._ingest(chunk):
+                    h._enqueue(item)
+            except (OSError, serial.SerialException, TypeError, AttributeError) as e:
+                # port fermé par ailleurs : arrêt silencieux, pas une erreur
+                if not self._stop_evt.is_set() and getattr(self.ser, "is_open", False):
+                    h._enqueue(("error", f"Port invalide : {e}"))
+                return
+            except Exception as e:
+                if not self._stop_evt.is_set():
+                    h._enqueue(("error", f"Erreur pendant la lecture série : {e}"))
+                return
+
 
 class SerialHandler(QObject):
     """
-    Gestion série monothread via QTimer.
-    Lit en polling et émet des signaux pour JSON et données binaires.
+    Gestion série via QTimer.
+    - mode polling (défaut) : lecture directe dans le thread GUI ;
+    - mode threadé : un _SerialReader lit le port et remplit une file bornée
+      que le QTimer vide côté GUI.
+    Émet des signaux pour JSON et données binaires dans les deux cas.
     """
     json_received    = Signal(dict)
     data_received    = Signal(float, float, float)
+    data_block_received = Signal(object)  # np.ndarray (N, 3) float32 : t, d, f
     error            = Signal(str)
     line_received    = Signal(str)      # toute ligne brute reçue
     command_sent     = Signal(object)   # dict JSON envoyé
     event_received   = Signal(str)      # champ "event" d’un JSON reçu
 
-    def __init__(self, parent=None, poll_interval_ms=50):
+    def __init__(self, parent=None, poll_interval_ms=50,
+                 threaded=False, queue_size=20000):
         super().__init__(parent)
         self.ser   = None
-        self._buffer     = bytearray()  # un seul buffer mixte
-        self._text_tail  = ""           # reste de la dernière ligne textuelle
+        self._buffer     = bytearray()  # un seul buffer mixte, garde les fins incomplètes
         self.timer = QTimer(self)
         self.timer.setInterval(poll_interval_ms)
-        self.timer.timeout.connect(self._read_serial)
+        self.timer.timeout.connect(self._on_timer)
+        mo = self.metaObject()
+        self._data_received_meta = mo.method(
+            mo.indexOfSignal("data_received(double,double,double)"))
 
-  
+        # Acquisition threadée (optionnelle)
+        self.threaded   = threaded
+        self.queue_size = queue_size    # nb max de trames en attente côté GUI
+        self._queue     = deque()       # append/popleft atomiques : pas de verrou
+        self._reader    = None
+        self._frames_in  = 0            # écrit par le thread de lecture
+        self._frames_out = 0            # écrit par le thread GUI
+        # Compteurs (écrits uniquement par le thread qui lit)
+        self.dropped_frames    = 0      # trames corrompues
+        self.overflowed_frames = 0      # trames perdues car file pleine
+        self._capture   = None          # CaptureWriter du flux brut (optionnel)
 
-    def open(self, port: str, baud: int = 115200):
+    def open(self, port: str, baud: int = 115200, threaded: bool | None = None):
         try:
-            if self.ser and self.ser.is_open:
-                self.ser.close()
-            self.ser = serial.Serial(port, baudrate=baud, timeout=0.1)
-            self.timer.start()
+            self.attach(serial.Serial(port, baudrate=baud, timeout=0.1), threaded)
         except Exception as e:
             self.ser = None  # Empêche toute lecture ensuite
             raise e
-            
+
+    def attach(self, ser, threaded: bool | None = None):
+        """Utilise un port déjà ouvert (serial.Serial ou équivalent, ex. ReplaySerial)."""
+        if threaded is not None:
+            self.threaded = threaded
+        self._stop_reader()
+        if self.ser and self.ser.is_open and self.ser is not ser:
+            self.ser.close()
+        self.ser = ser
+        self.reset_counters()
+        if self.threaded:
+            self._reader = _SerialReader(self, self.ser)
+            self._reader.start()
+        self.timer.start()
+
+    def start_capture(self, path):
+        """Enregistre tout le flux brut reçu dans `path` (voir controllers.serial_capture)."""
+        from controllers.serial_capture import CaptureWriter
+        self.stop_capture()
+        self._capture = CaptureWriter(path)
+        return self._capture
+
+    def stop_capture(self):
+        capture, self._capture = self._capture, None
+        if capture is not None:
+            capture.close()
+
+    def reset_counters(self):
+        self.dropped_frames = 0
+        self.overflowed_frames = 0
+        self._frames_in = self._frames_out = 0
+        self._queue.clear()
+        self._buffer.clear()
+
     def send_raw(self, data: bytes):
         """Envoie des octets bruts sur le port série."""
         if self.ser and self.ser.is_open:
@@ -52,18 +265,20 @@ class SerialHandler(QObject):
         try:
             payload = json.dumps(msg) + "\n"
             self.ser.write(payload.encode("utf-8"))
-            self.ser.flush()           
+            self.ser.flush()
             self.command_sent.emit(payload)
         except Exception as e:
             self.error.emit(f"Échec envoi : {e}")
 
 
-  
+
+    def _on_timer(self):
+        if self.threaded:
+            self._drain_queue()
+        else:
+            self._read_serial()
 
     def _read_serial(self):
-        START_BYTE = b'\xAA'
-        PAYLOAD_LEN = 12
-        FRAME_LEN   = PAYLOAD_LEN + 1  # checksum en plus
         # 1) lit tout ce qui est dispo
         try:
             if not self.ser or not hasattr(self.ser, 'is_open') or not self.ser.is_open:
@@ -76,43 +291,102 @@ class SerialHandler(QObject):
         if avail == 0:
             return
 
+        # 2) une seule lecture en bloc, puis découpage texte / binaire
         try:
-            # 2) traite chaque frame texte OU binaire
-            # tant que l'Arduino a envoyé au moins 1 octet
-            while self.ser.in_waiting:
-                head = self.ser.read(1)
-                if head == START_BYTE:
-                    # lecture stricte du payload + checksum
-                    chunk = self.ser.read(PAYLOAD_LEN + 1)
-                    if len(chunk) < PAYLOAD_LEN + 1:
-                        # trame incomplète, on arrête et on remet head dans le buffer
-                        #self.ser.unread(chunk)  # si supported, sinon stockez en buffer local
-                        self.error.emit("Trame incomplète, ignorée.")
-                        return
-
-                    payload, recv_chk = chunk[:PAYLOAD_LEN], chunk[-1]
-                    # vérification checksum
-                    calc = START_BYTE[0]
-                    for b in payload:
-                        calc ^= b
-                    if calc != recv_chk:
-                        # trame corrompue : on l'ignore et on continue la boucle
-                        continue
-
-                    # unpack et émission
-                    t, d, f = struct.unpack('<fff', payload)
-                    if t == -1.0 and d == -1.0 and f == -1.0:
-                        return
-                    self.data_received.emit(t, d, f)
-                else:
-                    # on a lu un octet non binaire => texte
-                    # on peut accumuler dans un buffer str si besoin
-                    # ou
-                    line = head + self.ser.readline()
-                    self._handle_text_line(line)
+            items = self._ingest(self.ser.read(avail))
         except Exception as e:
-            self.error.emit(f"Erreur pendant la lecture série : {e}")
+            self.error.emit(f"Erreur pendant la lecture série : {e}")
             return
+        self._dispatch_all(items)
+
+    def _ingest(self, chunk: bytes):
+        """Ajoute `chunk` au buffer persistant et retourne les éléments complets."""
+        if self._capture is not None:
+            self._capture.write(chunk)
+        self._buffer += chunk
+        items, consumed, dropped = parse_buffer(bytes(self._buffer))
+        del self._buffer[:consumed]
+        self.dropped_frames += dropped
+        return items
+
+    def _dispatch_all(self, items):
+        """
+        Émet les éléments d'un poll dans l'ordre d'arrivée. Les blocs de
+        trames consécutifs sont regroupés et émis avant chaque ligne texte,
+        pour que "Cycle finished" / événements restent ordonnés par rapport
+        aux données.
+        Retourne False si une erreur a été émise.
+        """
+        blocks = []
+        for kind, value in items:
+            if kind == "block":
+                blocks.append(value)
+                continue
+            self._emit_blocks(blocks)
+            blocks = []
+            if kind == "line":
+                self._handle_text_line(value)
+            elif kind == "error":
+                self.error.emit(value)
+                return False
+        self._emit_blocks(blocks)
+        return True
+
+    def _emit_blocks(self, blocks):
+        if not blocks:
+            return
+        block = blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+        # signal par échantillon conservé pour compatibilité
+        if self.isSignalConnected(self._data_received_meta):
+            for t, d, f in block.tolist():
+                self.data_received.emit(t, d, f)
+        self.data_block_received.emit(block)
+
+    def _enqueue(self, item):
+        """Appelé par le thread de lecture. Seules les trames de données sont
+        abandonnées quand la file est pleine : les lignes texte (événements)
+        passent toujours."""
+        if item[0] == "block":
+            block = item[1]
+            free = self.queue_size - (self._frames_in - self._frames_out)
+            if free < len(block):
+                self.overflowed_frames += len(block) - max(free, 0)
+                if free <= 0:
+                    return
+                block = block[:free]
+                item = ("block", block)
+            self._frames_in += len(block)
+        self._queue.append(item)
+
+    def _drain_queue(self):
+        """Vide (côté GUI) ce que le thread de lecture a accumulé."""
+        q = self._queue
+        items = []
+        for _ in range(len(q)):
+            try:
+                item = q.popleft()
+            except IndexError:
+                break
+            if item[0] == "block":
+                self._frames_out += len(item[1])
+            items.append(item)
+        if not self._dispatch_all(items):
+            # port défaillant : plus de lecture du tout (pas de repli sur le polling)
+            self.timer.stop()
+            self._stop_reader()
+            try:
+                if self.ser and self.ser.is_open:
+                    self.ser.close()
+            except (OSError, serial.SerialException):
+                pass
+            self.ser = None
+
+    def _stop_reader(self):
+        reader, self._reader = self._reader, None
+        if reader is not None:
+            reader.stop()
+            if reader is not threading.current_thread():
+                reader.join(timeout=1.0)
 
     def _handle_text_line(self, raw: bytes):
         line = raw.decode('utf-8', errors='ignore').strip()
@@ -127,9 +401,13 @@ class SerialHandler(QObject):
                 pass
     def close(self):
         if self.timer.isActive(): self.timer.stop()
-        if self.ser and self.ser.is_open: self.ser.close()    
-    
+        self._stop_reader()
+        self.stop_capture()
+        if self.ser and self.ser.is_open: self.ser.close()
+
     def stop(self):
         self._reading = False
+        self._stop_reader()
+        self.stop_capture()
         if self.ser and self.ser.is_open:
-            self.ser.close()
\ No newline at end of file
+            self.ser.close()
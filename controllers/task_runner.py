@@ -0,0 +1,113 @@
+# controllers/task_runner.py
+import threading
+import traceback
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class TaskCancelled(Exception):
+    """Levée dans la tâche quand l'annulation a été demandée."""
+
+
+class TaskContext:
+    """
+    Passé à la fonction exécutée en fond : report(fraction, message) remonte
+    la progression vers le GUI et lève TaskCancelled si l'utilisateur a annulé
+    (annulation coopérative, vérifiée à chaque report()).
+    """
+
+    def __init__(self, signals):
+        self._signals = signals
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise TaskCancelled()
+
+    def report(self, fraction: float, message: str = ""):
+        self.check_cancelled()
+        self._signals.progress.emit(float(fraction), str(message))
+
+
+class TaskSignals(QObject):
+    progress  = Signal(float, str)   # fraction 0..1, étape en cours
+    finished  = Signal(object)       # résultat de la fonction
+    failed    = Signal(str)          # message d'erreur
+    cancelled = Signal()
+
+
+class Task(QRunnable):
+    """Exécute fn(ctx, *args, **kwargs) dans le pool ; résultat / erreur par signaux."""
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.setAutoDelete(False)           # la référence est gardée par TaskRunner
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        self.signals = TaskSignals()        # créé dans le thread GUI : émissions en file
+        self.ctx = TaskContext(self.signals)
+        self.done = False
+
+    def cancel(self):
+        self.ctx.cancel()
+
+    def run(self):
+        try:
+            self.ctx.check_cancelled()
+            result = self.fn(self.ctx, *self.args, **self.kwargs)
+            self.ctx.check_cancelled()
+        except TaskCancelled:
+            self.done = True
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            traceback.print_exc()
+            self.done = True
+            self.signals.failed.emit(f"{type(e).__name__}: {e}")
+            return
+        self.done = True
+        self.signals.finished.emit(result)
+
+
+class TaskRunner(QObject):
+    """
+    Pool de threads pour les calculs de l'analyse : garde le GUI (et le banc)
+    réactif pendant une calibration ou un export.
+    """
+
+    def __init__(self, parent=None, max_threads: int = 2):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, int(max_threads)))
+        self._tasks = set()
+
+    def submit(self, fn, *args, on_finished=None, on_failed=None,
+               on_progress=None, on_cancelled=None, **kwargs) -> Task:
+        task = Task(fn, *args, **kwargs)
+        s = task.signals
+        if on_progress:
+            s.progress.connect(on_progress)
+        if on_finished:
+            s.finished.connect(on_finished)
+        if on_failed:
+            s.failed.connect(on_failed)
+        if on_cancelled:
+            s.cancelled.connect(on_cancelled)
+        for sig in (s.finished, s.failed, s.cancelled):
+            sig.connect(lambda *_, t=task: self._tasks.discard(t))
+        self._tasks.add(task)
+        self.pool.start(task)
+        return task
+
+    def cancel_all(self):
+        for task in list(self._tasks):
+            task.cancel()
+
+    def wait(self, msecs: int = -1) -> bool:
+        return self.pool.waitForDone(msecs)
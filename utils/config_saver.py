@@ -1,7 +1,6 @@
 import os
 import json
 from datetime import datetime
-from PySide6.QtWidgets import QMessageBox, QFileDialog
 
 
 def save_test_config(metadata: dict, config: dict, json_path: str):
@@ -50,6 +49,7 @@ def get_default_folder(base_dir: str, metadata: dict) -> str:
 
 def ask_user_for_folder(parent, base_dir: str, default_folder: str) -> str:
     """Propose à l'utilisateur de choisir un dossier personnalisé"""
+    from PySide6.QtWidgets import QMessageBox, QFileDialog
 
     ret = QMessageBox.question(
         parent,
@@ -70,6 +70,7 @@ def check_or_create_test_folder(test_name: str):
     Retourne le chemin du dossier si accepté, sinon None.
     """
     from utils.setting_utils import get_path_from_settings
+    from PySide6.QtWidgets import QMessageBox
 
     base_dir = get_path_from_settings("data_dir")
     test_dir = os.path.join(base_dir, test_name)
@@ -0,0 +1,70 @@
+import numpy as np
+
+CYCLE_COLUMNS = ("time", "distance", "force")
+
+
+def cycle_offsets(t, time_reset_threshold: float = 0.05) -> np.ndarray:
+    """
+    Bornes des cycles d'un essai : 0, chaque i où le temps revient en arrière
+    (t[i] < t[i-1] - seuil), puis len(t). Le cycle k est [offsets[k], offsets[k+1]).
+    """
+    t = np.asarray(t)
+    resets = np.flatnonzero(t[1:] < t[:-1] - time_reset_threshold) + 1
+    return np.concatenate(([0], resets, [len(t)])).astype(np.int64)
+
+
+class CycleIndex:
+    """
+    Index compact des cycles d'un tableau brut (N, 3) [time, distance, force] :
+    un tableau d'offsets, et des vues sans copie sur `data` pour chaque cycle.
+    Remplace les listes de DataFrames par cycle.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    @classmethod
+    def from_data(cls, data, time_reset_threshold: float = 0.05) -> "CycleIndex":
+        data = np.asarray(data)
+        return cls(data, cycle_offsets(data[:, 0], time_reset_threshold))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        """Vue (n, 3) du cycle i (indices négatifs acceptés)."""
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(f"cycle index out of range: {i}")
+        return self.data[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        for s, e in zip(self.offsets[:-1], self.offsets[1:]):
+            yield self.data[s:e]
+
+    @property
+    def starts(self) -> np.ndarray:
+        return self.offsets[:-1]
+
+    @property
+    def ends(self) -> np.ndarray:
+        return self.offsets[1:]
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def bounds(self, min_length: int = 1):
+        """(débuts, fins) des cycles d'au moins `min_length` points."""
+        starts, ends = self.starts, self.ends
+        keep = ends - starts >= min_length
+        return starts[keep], ends[keep]
+
+    def durations(self, min_length: int = 1) -> np.ndarray:
+        """t[fin - 1] - t[début] des cycles d'au moins `min_length` points."""
+        starts, ends = self.bounds(max(1, min_length))
+        t = self.data[:, 0]
+        return t[ends - 1] - t[starts]
@@ -0,0 +1,141 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.cycle_index import CycleIndex
+
+DEFAULT_BUDGET_BYTES = 512 * 1024 * 1024
+
+
+class _Entry:
+    __slots__ = ("stamp", "data", "cycles")
+
+    def __init__(self, stamp, data):
+        self.stamp = stamp          # (mtime_ns, size) du fichier lu
+        self.data = data            # (N, 3) float64, lecture seule
+        self.cycles = {}            # seuil de reset -> CycleIndex
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + sum(c.offsets.nbytes for c in self.cycles.values())
+
+
+class ParsedDataCache:
+    """
+    Cache des fichiers bruts déjà parsés, partagé par tout le processus.
+    Clé : chemin absolu, validée par (mtime, taille) à chaque accès ; un
+    fichier modifié est relu. Éviction LRU dès que la mémoire occupée
+    dépasse `max_bytes`. Les tableaux rendus sont en lecture seule.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_BUDGET_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _stamp(path):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def _entry(self, path, loader=None) -> _Entry:
+        key = os.path.abspath(path)
+        stamp = self._stamp(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.stamp == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self._entries.pop(key, None)
+        self.misses += 1
+
+        if loader is None:
+            from utils.data_treatement import load_raw_data
+            loader = load_raw_data
+        data = np.asarray(loader(key), dtype=float)
+        data.flags.writeable = False
+        entry = _Entry(stamp, data)
+        with self._lock:
+            self._entries[key] = entry
+            self._evict()
+        return entry
+
+    def _evict(self):
+        total = sum(e.nbytes for e in self._entries.values())
+        while total > self.max_bytes and self._entries:
+            _, old = self._entries.popitem(last=False)
+            total -= old.nbytes
+
+    def get_data(self, path, loader=None) -> np.ndarray:
+        """Tableau (N, 3) [time, distance, force] du fichier, lu au plus une fois."""
+        return self._entry(path, loader).data
+
+    def get_cycles(self, path, time_reset_threshold: float = 0.05, loader=None) -> CycleIndex:
+        """CycleIndex du fichier pour ce seuil de reset (données et découpage en cache)."""
+        entry = self._entry(path, loader)
+        with self._lock:
+            cycles = entry.cycles.get(time_reset_threshold)
+            if cycles is None:
+                cycles = CycleIndex.from_data(entry.data, time_reset_threshold)
+                entry.cycles[time_reset_threshold] = cycles
+                self._evict()
+            return cycles
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(e.nbytes for e in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_cache = ParsedDataCache()
+
+
+def get_cache() -> ParsedDataCache:
+    return _cache
+
+
+def configure_cache(settings: dict | None):
+    """Budget mémoire depuis settings['analysis']['cache_mb']."""
+    mb = ((settings or {}).get("analysis", {}) or {}).get("cache_mb")
+    if mb is not None:
+        with _cache._lock:
+            _cache.max_bytes = int(float(mb) * 1024 * 1024)
+            _cache._evict()
+
+
+def fits_in_cache(path) -> bool:
+    """
+    False si le fichier, une fois parsé en float64, dépasserait le budget du
+    cache : les calculs le lisent alors par blocs au lieu de le charger.
+    Estimation : ~2× la taille sur disque (texte "%.2f" ou binaire float32).
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return True
+    return 2 * size <= _cache.max_bytes
+
+
+def load_cached(path) -> np.ndarray:
+    return _cache.get_data(path)
+
+
+def load_cached_cycles(path, time_reset_threshold: float = 0.05) -> CycleIndex:
+    return _cache.get_cycles(path, time_reset_threshold)
@@ -2,17 +2,21 @@ import os
 import shutil
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 from utils.setting_utils import get_path_from_settings
-from PySide6.QtWidgets import QMessageBox, QInputDialog
+from utils.xlsx_stream import fill_package, splice_rows
+from utils.data_treatement import load_raw_data
+from utils.data_cache import fits_in_cache
+from utils.raw_io import STREAM_BLOCK_ROWS, iter_raw_blocks
 
 def _gui_ask_conflict(excel_path, plot_path, title, output_folder):
     """
     Affiche une boîte de dialogue pour résoudre le conflit.
     Renvoie (excel_path, plot_path, final_title) ou lève KeyboardInterrupt si Annuler.
     """
+    from PySide6.QtWidgets import QMessageBox, QInputDialog
+
     def paths_for(t):
         return (os.path.join(output_folder, f"{t}.xlsx"),
                 os.path.join(output_folder, f"{t}.png"))
@@ -98,12 +102,43 @@ def _resolve_output_paths(output_folder, file_title, conflict_strategy="ask"):
         return _gui_ask_conflict(excel_path, plot_path, file_title, output_folder)
         # autre saisie → on redemande
 
+def _write_table(ws, values, first_row=3):
+    """
+    Écrit le tableau 2-D `values` dans `ws` à partir de la ligne `first_row`,
+    colonne A. Les lignes passent en listes Python d'un bloc (tolist) au lieu
+    d'un iterrows() ; ws.append quand la feuille n'a que ses lignes d'en-tête,
+    sinon écriture cellule par cellule aux mêmes adresses.
+    """
+    rows = np.asarray(values).tolist()
+    if not rows:
+        return
+    if ws.max_row == first_row - 1:
+        for row in rows:
+            ws.append(row)
+        return
+    for r, row in enumerate(rows, first_row):
+        for c, val in enumerate(row, 1):
+            ws.cell(row=r, column=c, value=val)
+
+def _queue_table(bulk, ws, values, first_row=3):
+    """
+    Tableau destiné à `ws` : mis de côté dans `bulk` pour utils.xlsx_stream.splice_rows
+    si la feuille n'a rien à partir de `first_row` (cas du modèle : en-têtes seuls),
+    sinon écrit tout de suite par _write_table.
+    """
+    if ws.max_row < first_row and all(r < first_row for r in ws.row_dimensions):
+        bulk[ws.title] = values
+    else:
+        _write_table(ws, values)
+
 def load_and_filter_data(file_path):
     # Accept None or non-existing path → return empty DataFrames
     if not file_path or not os.path.isfile(file_path):
         empty = pd.DataFrame(columns=['Time', 'Course', 'Force'])
         return empty.copy(), empty.copy()
-    data = pd.read_csv(file_path, sep='\t', header=None, names=['Time', 'Course', 'Force'])
+    # binaire ou texte (tabulations / espaces), même chargeur que l'analyse
+    data = pd.DataFrame(np.asarray(load_raw_data(file_path), dtype=float),
+                        columns=['Time', 'Course', 'Force'])
     filtered_data = data[data['Force'] >= 1].reset_index(drop=True)
     return data, filtered_data
 
@@ -133,6 +168,169 @@ def find_intersection(data, torque):
         return np.nan
     return hit['\u00b0'].iloc[0]
 
+def _derived_block(block, offsets, factor, lever_arm_mm):
+    """
+    Colonnes de compute_additional_columns pour un bloc (N, 3) déjà filtré,
+    `offsets` = (Couple, °) de la première ligne filtrée du fichier.
+    Retour: (N, 8) Time, Course, Force, Couple, h2, h3, rad, °.
+    """
+    course, force = block[:, 1], block[:, 2]
+    couple = force * (lever_arm_mm * 1e-3) - offsets[0]
+    h2 = factor * course
+    h3 = course - h2
+    rad = np.arctan(h3 / lever_arm_mm)
+    deg = np.degrees(rad) - offsets[1]
+    return np.column_stack((block, couple, h2, h3, rad, deg))
+
+# Points de courbe gardés par bloc en mode streaming (tracé décimé)
+_PLOT_POINTS_PER_BLOCK = 4096
+
+def _scan_side(file_path, factor, lever_arm_mm, torque, block_rows=STREAM_BLOCK_ROWS):
+    """
+    Premier passage par blocs sur un fichier brut (mode streaming) : décalages
+    de normalisation, intersection avec `torque` (find_intersection), maximum
+    exact de ° et points décimés pour la courbe. None si aucune ligne filtrée.
+    """
+    offsets, intersection, max_deg = None, np.nan, -np.inf
+    xs, ys = [], []
+    for block in iter_raw_blocks(file_path, block_rows):
+        block = block[block[:, 2] >= 1]
+        if not len(block):
+            continue
+        if offsets is None:
+            first = _derived_block(block[:1], (0.0, 0.0), factor, lever_arm_mm)[0]
+            offsets = (first[3], first[7])
+        data = _derived_block(block, offsets, factor, lever_arm_mm)
+        couple, deg = data[:, 3], data[:, 7]
+        if np.isnan(intersection):
+            hit = np.flatnonzero(couple >= torque)
+            if len(hit):
+                intersection = deg[hit[0]]
+        max_deg = max(max_deg, float(np.nanmax(deg)))
+        step = max(1, len(data) // _PLOT_POINTS_PER_BLOCK)
+        xs.append(deg[::step]); ys.append(couple[::step])
+    if offsets is None:
+        return None
+    return {"offsets": offsets, "intersection": intersection, "max_deg": max_deg,
+            "deg": np.concatenate(xs), "couple": np.concatenate(ys)}
+
+def _raw_blocks(file_path, report, block_rows=STREAM_BLOCK_ROWS):
+    for block in iter_raw_blocks(file_path, block_rows):
+        report(0.85, "Writing data sheets")
+        yield block
+
+def _data_blocks(file_path, offsets, factor, lever_arm_mm, report, block_rows=STREAM_BLOCK_ROWS):
+    for block in iter_raw_blocks(file_path, block_rows):
+        report(0.85, "Writing data sheets")
+        block = block[block[:, 2] >= 1]
+        if len(block):
+            yield _derived_block(block, offsets, factor, lever_arm_mm)
+
+def _result_cells(flexion_intersection, extension_intersection, torque):
+    """Cellules de résultats de l'onglet Overview (angles et rigidités)."""
+    cells = {
+        "I9":  None if np.isnan(flexion_intersection)   else float(flexion_intersection),
+        "I10": None if np.isnan(extension_intersection) else float(extension_intersection),
+        "I13": None,
+        "I14": None,
+    }
+    if not np.isnan(flexion_intersection) and flexion_intersection != 0:
+        cells["I13"] = float(torque) / float(flexion_intersection)
+    if not np.isnan(extension_intersection) and extension_intersection != 0:
+        cells["I14"] = float(torque) / float(extension_intersection)
+    return cells
+
+def _save_report_plot(plot_path, title, torque, curves, flexion_intersection, extension_intersection):
+    """
+    Trace Couple = f(°) et l'enregistre en PNG.
+    curves: [(label, °, Couple, max de °)] pour les côtés qui ont des données.
+    """
+    # Figure sans pyplot : aucun gestionnaire de fenêtre, utilisable hors du thread GUI
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(8, 5))
+    ax = fig.add_subplot(111)
+    max_x = 0.0
+    for label, x, y, x_max in curves:
+        ax.plot(x, y, label=label)
+        max_x = max(max_x, float(x_max))
+    ax.axhline(y=torque, linestyle="--", linewidth=2, label=f"{torque} Nm")
+    if max_x > 0:
+        ax.annotate(f"{torque} Nm", xy=(max_x, torque),
+                    xytext=(max_x + 0.15, torque), color="red", fontsize=10, ha="left", va="center")
+    if not np.isnan(flexion_intersection):
+        ax.axvline(x=float(flexion_intersection), linestyle="--", linewidth=1)
+    if not np.isnan(extension_intersection):
+        ax.axvline(x=float(extension_intersection), linestyle="--", linewidth=1)
+    if not curves:
+        ax.text(0.5, 0.5, "No valid data after filtering", ha="center", va="center",
+                transform=ax.transAxes)
+        ax.set_xlim(0, 1); ax.set_ylim(0, 1)
+    ax.set_xlim(left=0); ax.set_ylim(bottom=0)
+    ax.set_title(title); ax.set_xlabel("Angular deflection [\u00b0]"); ax.set_ylabel("Torque [Nm]")
+    ax.legend(); ax.grid(True)
+    fig.savefig(plot_path, dpi=150, bbox_inches="tight")
+
+def _mechanical_results(torque, flexion_intersection, extension_intersection):
+    mechanical_results = {
+        "torque_threshold_Nm": torque,
+        "angular_deflection_deg": {},
+        "rigidity_Nm_per_deg": {}
+    }
+    if not np.isnan(flexion_intersection) and flexion_intersection != 0:
+        mechanical_results["angular_deflection_deg"]["flexion"] = round(float(flexion_intersection), 3)
+        mechanical_results["rigidity_Nm_per_deg"]["flexion"]    = round(float(torque) / float(flexion_intersection), 3)
+    if not np.isnan(extension_intersection) and extension_intersection != 0:
+        mechanical_results["angular_deflection_deg"]["extension"] = round(float(extension_intersection), 3)
+        mechanical_results["rigidity_Nm_per_deg"]["extension"]    = round(float(torque) / float(extension_intersection), 3)
+    return mechanical_results
+
+def _export_streaming(template_path, excel_path, plot_path, title, paths, info_cells,
+                      torque, factor, lever_arm_mm, report):
+    """
+    Export sans classeur openpyxl en mémoire : deux passages par blocs sur
+    chaque fichier brut (résultats et courbe, puis écriture des lignes), les
+    feuilles de données, les cellules de l'Overview et l'image étant ajoutées
+    au paquet du modèle par utils.xlsx_stream.fill_package. La mise en forme
+    et les formules du modèle ne sont pas touchées ; mémoire bornée par un
+    bloc de STREAM_BLOCK_ROWS lignes. La courbe est tracée sur des points
+    décimés (maximum de ° et intersections exacts).
+    """
+    scans = {}
+    for prefix, path, fraction in (("Flexion", paths[0], 0.05), ("Extension", paths[1], 0.35)):
+        report(fraction, f"{prefix} data")
+        have_file = bool(path) and os.path.isfile(path)
+        scans[prefix] = (path if have_file else None,
+                         _scan_side(path, factor, lever_arm_mm, torque) if have_file else None)
+
+    flexion_intersection = scans["Flexion"][1]["intersection"] if scans["Flexion"][1] else np.nan
+    extension_intersection = scans["Extension"][1]["intersection"] if scans["Extension"][1] else np.nan
+
+    report(0.65, "Plot")
+    curves = [(prefix, scan["deg"], scan["couple"], scan["max_deg"])
+              for prefix, (_, scan) in scans.items() if scan]
+    _save_report_plot(plot_path, title, torque, curves, flexion_intersection, extension_intersection)
+
+    rows = {}
+    for prefix, (path, scan) in scans.items():
+        if path is None:
+            continue
+        rows[f"Raw_data_{prefix}"] = _raw_blocks(path, report)
+        if scan:
+            rows[prefix] = _data_blocks(path, scan["offsets"], factor, lever_arm_mm, report)
+    cells = {"Overview": {**_result_cells(flexion_intersection, extension_intersection, torque),
+                          **info_cells}}
+    picture = ("Overview", plot_path, "B7", 500, 300) if os.path.isfile(plot_path) else None
+
+    report(0.8, "Writing workbook")
+    try:
+        fill_package(template_path, excel_path, rows=rows, cells=cells, picture=picture, first_row=3)
+    except BaseException:
+        if os.path.exists(excel_path):
+            os.remove(excel_path)
+        raise
+    report(1.0, "Done")
+    return _mechanical_results(torque, flexion_intersection, extension_intersection)
+
 def export_to_excel_report(
     flexion_path,
     extension_path,
@@ -149,115 +347,92 @@ def export_to_excel_report(
     factor,
     lever_arm_mm,
     note=None,  # <— add this
+    conflict_strategy="ask",
+    progress=None,
+    template_path=None,
+    streaming=None,
 ):
-
-    template_path = get_path_from_settings("template_excel")
+    """
+    conflict_strategy: "ask" (dialog, GUI thread only) | "overwrite" | "auto_rename".
+    progress: optional callable(fraction, message) called between steps; it
+    may raise to abort (background tasks, see controllers.task_runner).
+    template_path: Excel template (default: settings "template_excel").
+    streaming: True → _export_streaming (bounded memory, template package kept
+    as is); None → automatic when an input file is too big for the data cache.
+    """
+    report = progress or (lambda fraction, message="": None)
+    template_path = template_path or get_path_from_settings("template_excel")
 
     new_excel_path, plot_path, final_title = _resolve_output_paths(
-        output_folder, file_title, conflict_strategy="ask"
+        output_folder, file_title, conflict_strategy=conflict_strategy
     )
 
+    info_cells = {
+        "C5": material,        # Material
+        "D5": brace_type,      # Brace/Brand type
+        "F5": sample_reference,# Sample reference
+        "I5": test_date,       # Date
+        "J5": operator,        # Operator
+        "I17": speed,          # Speed
+        "I18": force_max,      # Force max
+        # Optionally store computed/config values here too if you have fixed cells for them:
+        # "I16": torque,       # Torque threshold (if your template reserves it)
+        # "I15": lever_arm_mm, # Lever arm (mm) (if reserved)
+        # "I19": factor,       # Factor (if reserved)
+        # "C6": note,          # Note (if you want a note line)
+        # "B3": file_title,    # Title, if you have a title cell
+    }
+    if streaming is None:
+        streaming = any(p and os.path.isfile(p) and not fits_in_cache(p)
+                        for p in (flexion_path, extension_path))
+    if streaming:
+        return _export_streaming(template_path, new_excel_path, plot_path, final_title,
+                                 (flexion_path, extension_path), info_cells,
+                                 torque, factor, lever_arm_mm, report)
+
     shutil.copy(template_path, new_excel_path)
 
     wb = load_workbook(new_excel_path)
     flexion_ws = wb['Flexion']; extension_ws = wb['Extension']; overview_ws = wb['Overview']
     flexion_raw_ws = wb['Raw_data_Flexion']; extension_raw_ws = wb['Raw_data_Extension']
+    bulk = {}   # feuilles de données ajoutées après wb.save, directement dans le zip
 
     # --- FLEXION
+    report(0.05, "Flexion data")
     flexion_raw_data, flexion_filtered = load_and_filter_data(flexion_path)
     flexion_data = compute_additional_columns(flexion_filtered, factor, lever_arm_mm)
     flexion_intersection = find_intersection(flexion_data, torque)
 
     if not flexion_raw_data.empty:
-        for i, row in flexion_raw_data.iterrows():
-            flexion_raw_ws.cell(row=i+3, column=1, value=row['Time'])
-            flexion_raw_ws.cell(row=i+3, column=2, value=row['Course'])
-            flexion_raw_ws.cell(row=i+3, column=3, value=row['Force'])
+        _queue_table(bulk, flexion_raw_ws, flexion_raw_data[['Time', 'Course', 'Force']].to_numpy())
 
     if flexion_data is not None and not flexion_data.empty:
-        for i, row in flexion_data.iterrows():
-            for col, val in enumerate(row, 1):
-                flexion_ws.cell(row=i+3, column=col, value=val)
+        _queue_table(bulk, flexion_ws, flexion_data.to_numpy())
 
     # --- EXTENSION
+    report(0.35, "Extension data")
     extension_raw_data, extension_filtered = load_and_filter_data(extension_path)
     extension_data = compute_additional_columns(extension_filtered, factor, lever_arm_mm)
     extension_intersection = find_intersection(extension_data, torque)
 
     if not extension_raw_data.empty:
-        for i, row in extension_raw_data.iterrows():
-            extension_raw_ws.cell(row=i+3, column=1, value=row['Time'])
-            extension_raw_ws.cell(row=i+3, column=2, value=row['Course'])
-            extension_raw_ws.cell(row=i+3, column=3, value=row['Force'])
+        _queue_table(bulk, extension_raw_ws, extension_raw_data[['Time', 'Course', 'Force']].to_numpy())
 
     if extension_data is not None and not extension_data.empty:
-        for i, row in extension_data.iterrows():
-            for col, val in enumerate(row, 1):
-                extension_ws.cell(row=i+3, column=col, value=val)
+        _queue_table(bulk, extension_ws, extension_data.to_numpy())
 
     # --- Overview
-    overview_ws['I9']  = None if np.isnan(flexion_intersection)   else float(flexion_intersection)
-    overview_ws['I10'] = None if np.isnan(extension_intersection) else float(extension_intersection)
-    if not np.isnan(flexion_intersection) and flexion_intersection != 0:
-        overview_ws['I13'] = float(torque) / float(flexion_intersection)
-    else:
-        overview_ws['I13'] = None
-    if not np.isnan(extension_intersection) and extension_intersection != 0:
-        overview_ws['I14'] = float(torque) / float(extension_intersection)
-    else:
-        overview_ws['I14'] = None
+    for addr, val in _result_cells(flexion_intersection, extension_intersection, torque).items():
+        overview_ws[addr] = val
     # (Optional) write note somewhere:
     # overview_ws['C6'] = note
-    _set_overview_direct(overview_ws, {
-        "C5": material,        # Material
-        "D5": brace_type,      # Brace/Brand type
-        "F5": sample_reference,# Sample reference
-        "I5": test_date,       # Date
-        "J5": operator,        # Operator
-        "I17": speed,          # Speed
-        "I18": force_max,      # Force max
-        # Optionally store computed/config values here too if you have fixed cells for them:
-        # "I16": torque,       # Torque threshold (if your template reserves it)
-        # "I15": lever_arm_mm, # Lever arm (mm) (if reserved)
-        # "I19": factor,       # Factor (if reserved)
-        # "C6": note,          # Note (if you want a note line)
-        # "B3": file_title,    # Title, if you have a title cell
-    })
+    _set_overview_direct(overview_ws, info_cells)
     # --- Plot (always create one so image is present)
-    have_flex = flexion_data is not None and not flexion_data.empty
-    have_ext  = extension_data is not None and not extension_data.empty
-
-    import matplotlib
-    # force non-GUI backend if needed
-    try: matplotlib.get_backend()
-    except Exception: matplotlib.use("Agg")
-
-    plt.figure(figsize=(8, 5))
-    max_x = 0.0
-    if have_flex:
-        plt.plot(flexion_data['\u00b0'], flexion_data['Couple'], label="Flexion")
-        max_x = max(max_x, float(flexion_data['\u00b0'].max()))
-    if have_ext:
-        plt.plot(extension_data['\u00b0'], extension_data['Couple'], label="Extension")
-        max_x = max(max_x, float(extension_data['\u00b0'].max()))
-    plt.axhline(y=torque, linestyle="--", linewidth=2, label=f"{torque} Nm")
-    if max_x > 0:
-        plt.annotate(f"{torque} Nm", xy=(max_x, torque),
-                     xytext=(max_x + 0.15, torque), color="red", fontsize=10, ha="left", va="center")
-    if not np.isnan(flexion_intersection):
-        plt.axvline(x=float(flexion_intersection), linestyle="--", linewidth=1)
-    if not np.isnan(extension_intersection):
-        plt.axvline(x=float(extension_intersection), linestyle="--", linewidth=1)
-    if not (have_flex or have_ext):
-        ax = plt.gca()
-        ax.text(0.5, 0.5, "No valid data after filtering", ha="center", va="center",
-                transform=ax.transAxes)
-        ax.set_xlim(0, 1); ax.set_ylim(0, 1)
-    plt.xlim(left=0); plt.ylim(bottom=0)
-    plt.title(final_title); plt.xlabel("Angular deflection [\u00b0]"); plt.ylabel("Torque [Nm]")
-    plt.legend(); plt.grid(True)
-    plt.savefig(plot_path, dpi=150, bbox_inches="tight")
-    plt.close()
+    report(0.65, "Plot")
+    curves = [(label, data['\u00b0'], data['Couple'], data['\u00b0'].max())
+              for label, data in (("Flexion", flexion_data), ("Extension", extension_data))
+              if data is not None and not data.empty]
+    _save_report_plot(plot_path, final_title, torque, curves, flexion_intersection, extension_intersection)
 
     if os.path.isfile(plot_path):
         try:
@@ -267,22 +442,15 @@ def export_to_excel_report(
         except Exception as ex:
             print(f"[CORE] Could not insert image: {ex}")
 
+    report(0.8, "Saving workbook")
     wb.save(new_excel_path)
     wb.close()
+    if bulk:
+        report(0.85, "Writing data sheets")
+        splice_rows(new_excel_path, bulk, first_row=3)
+    report(1.0, "Done")
 
-    mechanical_results = {
-        "torque_threshold_Nm": torque,
-        "angular_deflection_deg": {},
-        "rigidity_Nm_per_deg": {}
-    }
-    if not np.isnan(flexion_intersection) and flexion_intersection != 0:
-        mechanical_results["angular_deflection_deg"]["flexion"] = round(float(flexion_intersection), 3)
-        mechanical_results["rigidity_Nm_per_deg"]["flexion"]    = round(float(torque) / float(flexion_intersection), 3)
-    if not np.isnan(extension_intersection) and extension_intersection != 0:
-        mechanical_results["angular_deflection_deg"]["extension"] = round(float(extension_intersection), 3)
-        mechanical_results["rigidity_Nm_per_deg"]["extension"]    = round(float(torque) / float(extension_intersection), 3)
-
-    return mechanical_results
+    return _mechanical_results(torque, flexion_intersection, extension_intersection)
 
 def _set_overview_direct(ws, mapping: dict):
     """
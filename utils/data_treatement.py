@@ -1,5 +1,185 @@
+import os
 import numpy as np
 import pandas as pd
+from utils.raw_io import STREAM_BLOCK_ROWS, is_raw_binary, iter_raw_blocks, memmap_raw_binary, read_raw_text
+from utils.data_cache import fits_in_cache, load_cached, load_cached_cycles
+from utils.cycle_index import CYCLE_COLUMNS, cycle_offsets
+
+
+def load_raw_data(file_path) -> np.ndarray:
+    """
+    Charge un fichier brut [time, distance, force] quel que soit son format :
+    - binaire (utils.raw_io) : projeté en mémoire via np.memmap, sans copie ;
+    - texte (tabulations ou espaces) : parseur C (utils.raw_io.read_raw_text).
+    Retour: tableau (N, 3).
+    """
+    if is_raw_binary(file_path):
+        return memmap_raw_binary(file_path)
+    return read_raw_text(file_path)
+
+
+_ABS_PLAST_COLUMNS = ["Cycle", "Abs_plast_mm", "Cycle_time_s", "Cumulative_time_min"]
+
+
+# Taille max d'un paquet de cycles traité d'un coup (points, et seuils × cycles)
+_BATCH_POINTS = 1 << 18
+_BATCH_QUERIES = 1 << 20
+
+
+def _first_crossings(f, starts, ends, thresholds):
+    """
+    Pour chaque seuil (lignes) et chaque segment [start, end) de `f` (colonnes),
+    en quelques passes NumPy :
+      i1 = premier indice du segment avec f >= seuil          (montée)
+      j1 = premier indice >= i1 du segment avec f <= seuil    (descente)
+    Indices absolus ; `end` quand il n'y a pas de franchissement.
+
+    - montée : maximum cumulé par segment, rendu globalement croissant en
+      codant (n° de segment, rang de la valeur) sur un entier, puis un seul
+      searchsorted pour toutes les requêtes ;
+    - descente : table creuse de minima (min sur [i, i + 2^k)) et descente
+      binaire depuis i1, bornée par la fin du segment.
+    Les comparaisons se font sur les valeurs exactes (les NaN ne franchissent
+    jamais, comme avec np.where).
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    n_thr, n_seg = thresholds.size, len(starts)
+    i1 = np.empty((n_thr, n_seg), dtype=np.int64)
+    j1 = np.empty((n_thr, n_seg), dtype=np.int64)
+    if n_seg == 0:
+        return i1, j1
+
+    # paquets de segments consécutifs pour borner la mémoire
+    lengths = ends - starts
+    a = 0
+    while a < n_seg:
+        b = a + 1
+        pts = lengths[a]
+        max_seg = max(1, _BATCH_QUERIES // max(n_thr, 1))
+        while b < n_seg and b - a < max_seg and pts + lengths[b] <= _BATCH_POINTS:
+            pts += lengths[b]
+            b += 1
+        i1[:, a:b], j1[:, a:b] = _first_crossings_chunk(f, starts[a:b], ends[a:b], thresholds)
+        a = b
+    return i1, j1
+
+
+def _first_crossings_chunk(f, starts, ends, thresholds):
+    lo, hi = int(starts[0]), int(ends[-1])
+    chunk = f[lo:hi]
+    loc_s = (starts - lo)[None, :]
+    loc_e = (ends - lo)[None, :]
+    n = chunk.size
+
+    # ---- montée : maximum cumulé segmenté + searchsorted ----
+    up = np.where(np.isnan(chunk), -np.inf, chunk)
+    uniq = np.unique(np.concatenate((up, thresholds)))
+    r_f = np.searchsorted(uniq, up)
+    r_t = np.searchsorted(uniq, thresholds)
+    K = np.int64(uniq.size)
+    # n° de segment de chaque point (les trous entre segments restent au précédent)
+    seg = np.searchsorted(loc_s[0], np.arange(n), side="right") - 1
+    key = np.maximum.accumulate(seg.astype(np.int64) * K + r_f)
+    seg_ids = np.arange(loc_s.shape[1], dtype=np.int64)
+    i1 = np.searchsorted(key, seg_ids[None, :] * K + r_t[:, None], side="left")
+    i1 = np.minimum(i1, loc_e)
+
+    # ---- descente : minima par blocs de 2^k + descente binaire ----
+    dn = np.where(np.isnan(chunk), np.inf, chunk)
+    levels = [dn]
+    span = 1
+    max_len = int((loc_e - loc_s).max())
+    while span * 2 <= max_len:
+        prev = levels[-1]
+        levels.append(np.minimum(prev[:-span], prev[span:]))
+        span *= 2
+    pos = i1.copy()
+    thr = thresholds[:, None]
+    for k in range(len(levels) - 1, -1, -1):
+        step = 1 << k
+        table = levels[k]
+        ok = pos + step <= loc_e
+        idx = np.minimum(pos, table.size - 1)
+        adv = ok & (table[idx] > thr)
+        pos += adv * step
+    return i1 + lo, pos + lo
+
+
+def _abs_reference(d, f, s0, e0, thresholds):
+    """
+    d0(Fref) par seuil : franchissement montant interpolé sur le cycle [s0, e0).
+    Retour: (d0, ok0), colonnes (n_seuils, 1). len(f) >= 2.
+    """
+    thr = thresholds[:, None]
+    a1, _ = _first_crossings(f, s0, e0, thresholds)
+    ok0 = (a1 > s0) & (a1 < e0)
+    a1 = np.where(ok0, a1, 1)
+    f0, f1 = f[a1 - 1], f[a1]
+    ok0 &= f1 != f0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alpha0 = (thr - f0) / (f1 - f0)
+        d0 = d[a1 - 1] + alpha0 * (d[a1] - d[a1 - 1])  # référence absolue
+    return d0, ok0
+
+
+def _abs_plasticity_cycles(d, f, starts, ends, thresholds, d0, ok0):
+    """Plasticité des cycles [starts, ends) par rapport à d0 (voir _abs_reference). len(f) >= 2."""
+    thr = thresholds[:, None]
+    # 1) franchissement montant (i1), 2) franchissement descendant (j1)
+    i1, j1 = _first_crossings(f, starts, ends, thresholds)
+    ok = ok0 & (i1 > starts) & (i1 < ends) & (j1 < ends)
+    i1 = np.where(ok, i1, 1)
+    j1 = np.where(ok, j1, 1)
+    ok &= f[i1] != f[i1 - 1]
+    f0b, f1b = f[j1 - 1], f[j1]
+    ok &= f1b != f0b
+    out = np.full(ok.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beta = (thr - f0b) / (f1b - f0b)
+        d_return = d[j1 - 1] + beta * (d[j1] - d[j1 - 1])
+        # Plasticité ABSOLUE: décalage par rapport à d0(Fref)
+        plast = d_return - d0
+    out[ok] = plast[ok]
+    return out, ok
+
+
+def _abs_plasticity_batch(d, f, cuts, starts, ends, thresholds):
+    """
+    Plasticité absolue pour tous les seuils × cycles retenus.
+    Retour: (valeurs (n_seuils, n_cycles), masque des cycles valides). Mêmes
+    formules élément par élément que le calcul cycle par cycle.
+    """
+    thresholds = np.asarray(thresholds, dtype=float).ravel()
+    out = np.full((thresholds.size, len(starts)), np.nan)
+    valid = np.zeros(out.shape, dtype=bool)
+    if thresholds.size == 0 or len(f) < 2:
+        return out, valid
+
+    # Interpolation d0(Fref) sur le cycle 1 (passage montant)
+    d0, ok0 = _abs_reference(d, f, cuts[:1], cuts[1:2], thresholds)
+    if not ok0.any() or len(starts) == 0:
+        return out, valid
+    return _abs_plasticity_cycles(d, f, starts, ends, thresholds, d0, ok0)
+
+
+def compute_abs_plasticity_batch(
+    file_path,
+    thresholds,
+    time_reset_threshold=0.05,
+    min_cycle_length=10
+) -> np.ndarray:
+    """
+    Plasticité ABSOLUE pour plusieurs seuils de force à la fois.
+    Retour: matrice (n_seuils, n_cycles) sur les cycles d'au moins
+    `min_cycle_length` points ; NaN là où le cycle n'a pas de franchissement
+    exploitable (cycle ignoré par compute_abs_plasticity pour ce seuil).
+    """
+    cycles = load_cached_cycles(file_path, time_reset_threshold)
+    data = cycles.data
+    starts, ends = cycles.bounds(min_cycle_length)
+    values, _ = _abs_plasticity_batch(data[:,1], data[:,2], cycles.offsets, starts, ends, thresholds)
+    return values
+
 
 def compute_abs_plasticity(
     file_path,
@@ -11,72 +191,31 @@ def compute_abs_plasticity(
     Calcule UNIQUEMENT la plasticité ABSOLUE par cycle:
       Abs_plast_mm = d_return(Fref) - d0(Fref)
     où d0(Fref) est pris sur le 1er cycle (franchissement montant interpolé).
+    Un fichier trop gros pour le cache est lu par blocs (même résultat).
     Retour: DataFrame [Cycle, Abs_plast_mm, Cycle_time_s, Cumulative_time_min]
     """
+    if not fits_in_cache(file_path):
+        return compute_abs_plasticity_streaming(
+            file_path, time_reset_threshold, force_threshold, min_cycle_length)
 
-
-    data = np.loadtxt(file_path)
+    # Découpe en cycles via reset du temps (fichier parsé une seule fois, cf. utils.data_cache)
+    cycles = load_cached_cycles(file_path, time_reset_threshold)
+    data = cycles.data
     t, d, f = data[:,0], data[:,1], data[:,2]
+    starts, ends = cycles.bounds(min_cycle_length)
+    values, valid = _abs_plasticity_batch(d, f, cycles.offsets, starts, ends, [force_threshold])
+    return _abs_plasticity_frame(values[0], valid[0], t[ends - 1] - t[starts])
 
-    # Découpe en cycles via reset du temps
-    cuts = [0] + [i for i in range(1, len(t)) if t[i] < t[i-1] - time_reset_threshold] + [len(t)]
-    if len(cuts) < 2:
-        return pd.DataFrame(columns=["Cycle","Abs_plast_mm","Cycle_time_s","Cumulative_time_min"])
-
-    # Interpolation d0(Fref) sur le cycle 1 (passage montant)
-    seg0_f, seg0_d = f[cuts[0]:cuts[1]], d[cuts[0]:cuts[1]]
-    above0 = np.where(seg0_f >= force_threshold)[0]
-    if above0.size == 0 or above0[0] - 1 < 0:
-        # pas de franchissement → pas de calcul possible
-        return pd.DataFrame(columns=["Cycle","Abs_plast_mm","Cycle_time_s","Cumulative_time_min"])
-    i1, i0 = above0[0], above0[0] - 1
-    f0, f1 = seg0_f[i0], seg0_f[i1]
-    d0_0, d0_1 = seg0_d[i0], seg0_d[i1]
-    if f1 == f0:
-        return pd.DataFrame(columns=["Cycle","Abs_plast_mm","Cycle_time_s","Cumulative_time_min"])
-    alpha0 = (force_threshold - f0) / (f1 - f0)
-    d0 = d0_0 + alpha0 * (d0_1 - d0_0)  # référence absolue
-
-    abs_plast, cycle_times = [], []
-    for idx in range(len(cuts)-1):
-        s, e = cuts[idx], cuts[idx+1]
-        seg_f, seg_d, seg_t = f[s:e], d[s:e], t[s:e]
-        if len(seg_f) < min_cycle_length:
-            continue
-
-        # 1) franchissement montant (trouve i1)
-        above = np.where(seg_f >= force_threshold)[0]
-        if above.size == 0 or above[0] - 1 < 0:
-            continue
-        i1 = above[0]; i0 = i1 - 1
-        f0, f1 = seg_f[i0], seg_f[i1]
-        d0a, d1a = seg_d[i0], seg_d[i1]
-        if f1 == f0:
-            continue
-        alpha = (force_threshold - f0) / (f1 - f0)
-        d_start = d0a + alpha * (d1a - d0a)
-
-        # 2) franchissement descendant (trouve j1)
-        below = np.where(seg_f[i1:] <= force_threshold)[0]
-        if below.size == 0:
-            continue
-        j1 = i1 + below[0]
-        if j1 - 1 < 0 or j1 >= len(seg_f):
-            continue
-        j0 = j1 - 1
-        f0b, f1b = seg_f[j0], seg_f[j1]
-        d0b, d1b = seg_d[j0], seg_d[j1]
-        if f1b == f0b:
-            continue
-        beta = (force_threshold - f0b) / (f1b - f0b)
-        d_return = d0b + beta * (d1b - d0b)
 
-        # Plasticité ABSOLUE: décalage par rapport à d0(Fref)
-        abs_plast.append(d_return - d0)
-        cycle_times.append(seg_t[-1] - seg_t[0])
+def _abs_plasticity_frame(values, valid, cycle_times) -> pd.DataFrame:
+    """DataFrame de compute_abs_plasticity à partir des cycles retenus (valeurs, masque, durées)."""
+    if not valid.any():
+        return pd.DataFrame(columns=_ABS_PLAST_COLUMNS)
+    abs_plast = values[valid]
+    cycle_times = cycle_times[valid]
 
     cycles = np.arange(1, len(abs_plast) + 1)
-    cum_time_min = (np.cumsum(cycle_times)/60.0) if cycle_times else []
+    cum_time_min = np.cumsum(cycle_times)/60.0
 
     return pd.DataFrame({
         "Cycle": cycles,
@@ -87,10 +226,11 @@ def compute_abs_plasticity(
 
 def plot_cycles_on_axes(ax, cycles, title="Force vs Déplacement par cycle"):
     """
-    Trace une liste de DataFrames [time, distance, force] sur l'axe `ax`.
+    Trace une liste de cycles [time, distance, force] sur l'axe `ax`
+    (DataFrames, tableaux (n, 3) ou CycleIndex).
     Ne fait AUCUN plt.show(); idéal pour un embed Qt.
     """
-    import matplotlib.pyplot as plt
+    from matplotlib import colormaps
 
     ax.clear()
     ax.set_title(title)
@@ -103,105 +243,351 @@ def plot_cycles_on_axes(ax, cycles, title="Force vs Déplacement par cycle"):
         return
 
     # Palette stable selon le nombre de cycles
-    cmap = plt.cm.get_cmap("tab10", len(cycles))
+    cmap = colormaps["tab10"].resampled(len(cycles))
 
     for i, df in enumerate(cycles):
-        if df is None or df.empty or not {"distance","force"} <= set(df.columns):
+        if isinstance(df, pd.DataFrame):
+            if df.empty or not {"distance","force"} <= set(df.columns):
+                continue
+            dist, force = df["distance"], df["force"]
+        elif df is None or len(df) == 0:
             continue
-        ax.plot(df["distance"], df["force"], label=f"Cycle {i}", color=cmap(i))
+        else:
+            dist, force = df[:, 1], df[:, 2]
+        ax.plot(dist, force, label=f"Cycle {i}", color=cmap(i))
         # Points (optionnel)
-        ax.scatter(df["distance"], df["force"], s=6, alpha=0.8, color=cmap(i))
+        ax.scatter(dist, force, s=6, alpha=0.8, color=cmap(i))
 
     # Légende seulement si raisonnable
     if len(cycles) <= 12:
         ax.legend(loc="best")
 
 
+def filter_cycle(cycle: np.ndarray, fmin=None, fmax=None, rising_only: bool = False) -> np.ndarray:
+    """
+    Filtre un cycle (n, 3) par plage de force.
+    rising_only: ne garde que la phase montante (jusqu'au pic de force).
+    """
+    force = cycle[:, 2]
+    keep = np.ones(len(cycle), dtype=bool)
+    if fmin is not None:
+        keep &= force >= fmin
+    if fmax is not None:
+        keep &= force <= fmax
+    seg = cycle[keep]
+
+    if rising_only and len(seg) and not np.isnan(seg[:, 2]).all():
+        seg = seg[:int(np.nanargmax(seg[:, 2])) + 1]
+    return seg
+
+
+def filtered_segments(cycles, start: int, end: int, fmin=None, fmax=None, rising_only: bool = False) -> list:
+    """[(indice de cycle, tableau (n, 3) filtré)] des cycles non vides de [start, end]."""
+    segments = []
+    for idx in range(max(start, 0), min(end, len(cycles) - 1) + 1):
+        seg = filter_cycle(cycles[idx], fmin, fmax, rising_only)
+        if len(seg):
+            segments.append((idx, seg))
+    return segments
+
+
+def filter_cycles(cycles, start: int, end: int, fmin=None, fmax=None, rising_only: bool = False) -> pd.DataFrame:
+    """Cycles [start, end] filtrés (filter_cycle) mis bout à bout : DataFrame time, distance, force."""
+    segments = filtered_segments(cycles, start, end, fmin, fmax, rising_only)
+    if not segments:
+        return pd.DataFrame(columns=list(CYCLE_COLUMNS))
+    return pd.DataFrame(np.concatenate([seg for _, seg in segments]), columns=list(CYCLE_COLUMNS))
+
+
+def filtered_export_path(base_path: str, start: int, end: int) -> str:
+    """
+    Chemin d'export des cycles filtrés, à côté de `base_path` : '_raw' devient
+    '_filtered' dans le nom (ou '_filtered' est ajouté), suivi de -cycle<start>-<end>.txt.
+    """
+    name, _ = os.path.splitext(os.path.basename(base_path))
+    if "_raw" in name:
+        name = name.replace("_raw", "_filtered")
+    elif "_filtré" not in name:
+        name += "_filtered"
+    return os.path.join(os.path.dirname(base_path), f"{name}-cycle{start}-{end}.txt")
+
+
+def export_filtered_cycles(df: pd.DataFrame, base_path: str, start: int, end: int,
+                           output_path: str | None = None) -> str:
+    """Écrit `df` (tabulé, sans en-tête) dans output_path ou filtered_export_path ; retourne le chemin."""
+    output_path = output_path or filtered_export_path(base_path, start, end)
+    df.to_csv(output_path, sep="\t", index=False, header=False)
+    return output_path
+
+
 def compute_global_target_plasticity_interp(file_path: str, F0: float = 0.05) -> float | None:
     """
     Target = d(last crossing at F0) - d(first crossing at F0), using linear interpolation
     on the whole file (not per-cycle). Returns None if we cannot bracket F0 twice.
+    Files too large for the data cache are read in blocks (same result).
     """
-    data = np.loadtxt(file_path)
-    t, d, f = data[:,0], data[:,1], data[:,2]
-
+    if not fits_in_cache(file_path):
+        return compute_global_target_streaming(file_path, F0)
+    data = load_cached(file_path)
+    return _global_target_from_arrays(data[:,1], data[:,2], F0)
+
+def _interp_crossing(d: np.ndarray, f: np.ndarray, i: int, F0: float) -> float | None:
+    """d interpolé au passage de F0 dans [i, i+1] ; None si f est plat."""
+    f0, f1 = f[i], f[i+1]
+    if f1 == f0: return None
+    lam = (F0 - f0) / (f1 - f0)
+    return float(d[i] + lam * (d[i+1] - d[i]))
+
+def _global_target_from_arrays(d: np.ndarray, f: np.ndarray, F0: float) -> float | None:
     s = f - F0
     crossings = np.nonzero(s[:-1] * s[1:] <= 0)[0]  # indices i where [i,i+1] brackets F0
     if crossings.size < 1:
         return None
 
-    def interp_d(i: int) -> float | None:
-        f0, f1 = f[i], f[i+1]
-        if f1 == f0: return None
-        lam = (F0 - f0) / (f1 - f0)
-        return float(d[i] + lam * (d[i+1] - d[i]))
-
     # first crossing
-    d_first = interp_d(int(crossings[0]))
+    d_first = _interp_crossing(d, f, int(crossings[0]), F0)
     # last crossing (use the last bracket in the series)
-    d_last  = interp_d(int(crossings[-1]))
+    d_last  = _interp_crossing(d, f, int(crossings[-1]), F0)
     if d_first is None or d_last is None:
         return None
     return float(d_last - d_first)
 
-def _pava(y: np.ndarray) -> np.ndarray:
-    """Isotonic (non-decreasing) regression."""
-    y = np.asarray(y, float); n = len(y)
-    g = y.copy(); w = np.ones(n)
-    i = 0
-    while i < n-1:
-        if g[i] <= g[i+1] + 1e-12:
-            i += 1
+
+# ---------- Lecture par blocs (fichiers plus gros que la mémoire) ----------
+
+def iter_cycle_buffers(file_path, time_reset_threshold: float = 0.05,
+                       block_rows: int = STREAM_BLOCK_ROWS):
+    """
+    Parcourt le fichier par blocs (utils.raw_io.iter_raw_blocks) et rend des
+    (buffer (n, 3), offsets) où buffer[offsets[k]:offsets[k+1]] sont des cycles
+    complets, dans l'ordre. Le cycle en cours en fin de bloc est reporté sur
+    le bloc suivant : chaque ligne du fichier apparaît dans un seul buffer, et
+    la mémoire reste bornée par un bloc + le plus long cycle.
+    """
+    carry = None
+    for block in iter_raw_blocks(file_path, block_rows):
+        buf = block if carry is None else np.concatenate((carry, block))
+        off = cycle_offsets(buf[:,0], time_reset_threshold)
+        if len(off) > 2:
+            yield buf, off[:-1]
+            carry = buf[off[-2]:]
+        else:
+            carry = buf
+    if carry is not None and len(carry):
+        yield carry, np.array([0, len(carry)], dtype=np.int64)
+
+
+class _F0Crossings:
+    """Premier et dernier passage de F0 sur tout le fichier, mis à jour bloc par bloc."""
+
+    def __init__(self, F0: float):
+        self.F0 = F0
+        self.prev = None        # dernière ligne (d, f) du bloc précédent
+        self.first = None       # (d[i:i+2], f[i:i+2]) des passages retenus
+        self.last = None
+
+    def update(self, d: np.ndarray, f: np.ndarray):
+        if not len(f):
+            return
+        if self.prev is not None:
+            d = np.concatenate((self.prev[0], d))
+            f = np.concatenate((self.prev[1], f))
+        s = f - self.F0
+        crossings = np.nonzero(s[:-1] * s[1:] <= 0)[0]
+        if crossings.size:
+            i, j = int(crossings[0]), int(crossings[-1])
+            if self.first is None:
+                self.first = (d[i:i+2].copy(), f[i:i+2].copy())
+            self.last = (d[j:j+2].copy(), f[j:j+2].copy())
+        self.prev = (d[-1:].copy(), f[-1:].copy())
+
+    def target(self) -> float | None:
+        if self.first is None:
+            return None
+        d_first = _interp_crossing(*self.first, 0, self.F0)
+        d_last  = _interp_crossing(*self.last, 0, self.F0)
+        if d_first is None or d_last is None:
+            return None
+        return float(d_last - d_first)
+
+
+def stream_abs_plasticity(
+    file_path,
+    thresholds,
+    time_reset_threshold=0.05,
+    min_cycle_length=10,
+    F0: float | None = None,
+    block_rows: int = STREAM_BLOCK_ROWS,
+):
+    """
+    Équivalent par blocs de _abs_plasticity_batch (+ target global si F0),
+    en une seule lecture du fichier. d0(Fref) est pris sur le 1er cycle du
+    fichier, puis chaque cycle complet est traité dès qu'il est lu.
+    Retour: (valeurs (n_seuils, n_cycles), masque valide, durées des cycles,
+    target ou None) sur les cycles d'au moins `min_cycle_length` points.
+    """
+    thresholds = np.asarray(thresholds, dtype=float).ravel()
+    tracker = _F0Crossings(F0) if F0 is not None else None
+    values, valid, times = [], [], []
+    d0 = ok0 = None
+
+    for buf, off in iter_cycle_buffers(file_path, time_reset_threshold, block_rows):
+        t, d, f = buf[:,0], buf[:,1], buf[:,2]
+        if tracker is not None:
+            tracker.update(d, f)
+        if d0 is None:
+            # Interpolation d0(Fref) sur le cycle 1 (passage montant) ;
+            # premier buffer de moins de 2 points = fichier inexploitable
+            if thresholds.size and len(f) >= 2:
+                d0, ok0 = _abs_reference(d, f, off[:1], off[1:2], thresholds)
+            else:
+                d0, ok0 = 0.0, np.zeros((thresholds.size, 1), dtype=bool)
+        starts, ends = off[:-1], off[1:]
+        keep = ends - starts >= min_cycle_length
+        starts, ends = starts[keep], ends[keep]
+        if not len(starts):
+            continue
+        if len(f) < 2 or not ok0.any():
+            out = np.full((thresholds.size, len(starts)), np.nan)
+            ok = np.zeros(out.shape, dtype=bool)
         else:
-            new = (w[i]*g[i] + w[i+1]*g[i+1])/(w[i]+w[i+1])
-            g[i]=g[i+1]=new; w[i]=w[i+1]=w[i]+w[i+1]
-            j=i
-            while j>0 and g[j-1] > g[j] + 1e-12:
-                new=(w[j-1]*g[j-1]+w[j]*g[j])/(w[j-1]+w[j])
-                g[j-1]=g[j]=new; w[j-1]=w[j]=w[j-1]+w[j]
-                j -= 1
-            i = max(j, 0)
-    return g
+            out, ok = _abs_plasticity_cycles(d, f, starts, ends, thresholds, d0, ok0)
+        values.append(out)
+        valid.append(ok)
+        times.append(t[ends - 1] - t[starts])
 
-def calibrate_threshold_match_target_first(
-    file_path: str,
-    target_F0: float = 0.05,          # “a little above 0”
-    time_reset_threshold: float = 0.05,
-    min_cycle_length: int = 10,
-    search_range=(0.01, 1.5),         # allow near-zero if needed to hit target
-    step: float = 0.005,
+    n = thresholds.size
+    values = np.concatenate(values, axis=1) if values else np.full((n, 0), np.nan)
+    valid = np.concatenate(valid, axis=1) if valid else np.zeros((n, 0), dtype=bool)
+    times = np.concatenate(times) if times else np.empty(0)
+    return values, valid, times, (tracker.target() if tracker is not None else None)
+
+
+def compute_abs_plasticity_streaming(
+    file_path,
+    time_reset_threshold=0.05,
+    force_threshold=0.3,
+    min_cycle_length=10,
+    block_rows: int = STREAM_BLOCK_ROWS,
 ):
+    """compute_abs_plasticity en lisant le fichier par blocs (même DataFrame, mémoire bornée)."""
+    values, valid, times, _ = stream_abs_plasticity(
+        file_path, [force_threshold], time_reset_threshold, min_cycle_length,
+        block_rows=block_rows)
+    return _abs_plasticity_frame(values[0], valid[0], times)
+
+
+def compute_global_target_streaming(file_path, F0: float = 0.05,
+                                    block_rows: int = STREAM_BLOCK_ROWS) -> float | None:
+    """compute_global_target_plasticity_interp en lisant le fichier par blocs."""
+    tracker = _F0Crossings(F0)
+    for block in iter_raw_blocks(file_path, block_rows):
+        tracker.update(block[:,1], block[:,2])
+    return tracker.target()
+
+_PAVA_TOL = 1e-12
+
+
+def _pava(y: np.ndarray, w: np.ndarray | None = None) -> np.ndarray:
     """
-    Primary:  |last(isotone(abs_plast)) - TARGET(F0)|   (smaller is better)
-    Secondary: total downward drops of the raw curve  (sum of negative diffs)
-    Tertiary:  RMSE raw vs isotone (smoother is better)
-    Returns: (best_thresh, diagnostics_dict)
+    Isotonic (non-decreasing) regression, optionally weighted.
+    Pool-adjacent-violators on a stack of blocks (value, weight, size): O(n).
+    Two blocks merge when the left value exceeds the right one by more than
+    1e-12, into their weighted mean (w1*v1 + w2*v2) / (w1 + w2).
     """
-    target = compute_global_target_plasticity_interp(file_path, F0=target_F0)
-    if target is None:
-        return None, {"reason": "no valid near-zero crossings", "target": None}
+    y = np.asarray(y, float); n = len(y)
+    w = np.ones(n) if w is None else np.asarray(w, float)
+    vals, wts, sizes = [], [], []
+    for yi, wi in zip(y.tolist(), w.tolist()):
+        v, wt, size = yi, wi, 1
+        while vals and vals[-1] > v + _PAVA_TOL:
+            pv, pw = vals.pop(), wts.pop()
+            v = (pw*pv + wt*v)/(pw + wt)
+            wt = pw + wt
+            size += sizes.pop()
+        vals.append(v); wts.append(wt); sizes.append(size)
+    return np.repeat(np.asarray(vals, float), sizes)
+
+
+def _pava_batch(Y: np.ndarray, W: np.ndarray | None = None, lengths=None) -> np.ndarray:
+    """
+    _pava on many series at once (one per row, e.g. one per threshold).
+    Rows are left-aligned; `lengths[r]` is the number of points of row r
+    (default: all columns). The block stacks of all rows advance together,
+    one column at a time; same merges and arithmetic as _pava, row by row.
+    Returns an array shaped like Y, NaN past each row's length.
+    """
+    Y = np.asarray(Y, float)
+    if Y.ndim == 1:
+        Y = Y[None, :]
+    S, n = Y.shape
+    W = np.ones_like(Y) if W is None else np.broadcast_to(np.asarray(W, float), Y.shape)
+    lengths = np.full(S, n) if lengths is None else np.asarray(lengths, dtype=np.int64)
+
+    vals = np.empty((S, n)); wts = np.empty((S, n))
+    sizes = np.zeros((S, n), dtype=np.int64)
+    top = np.zeros(S, dtype=np.int64)           # nombre de blocs par ligne
+    for j in range(n):
+        rows = np.flatnonzero(j < lengths)
+        if rows.size == 0:
+            break
+        t = top[rows]
+        vals[rows, t] = Y[rows, j]; wts[rows, t] = W[rows, j]; sizes[rows, t] = 1
+        top[rows] += 1
+        # fusions en cascade, seulement sur les lignes en violation
+        while rows.size:
+            t = top[rows]
+            cand = t >= 2
+            rows, t = rows[cand], t[cand]
+            viol = vals[rows, t - 2] > vals[rows, t - 1] + _PAVA_TOL
+            rows, t = rows[viol], t[viol]
+            if not rows.size:
+                break
+            a, b = t - 2, t - 1
+            pv, pw, v, wt = vals[rows, a], wts[rows, a], vals[rows, b], wts[rows, b]
+            vals[rows, a] = (pw*pv + wt*v)/(pw + wt)
+            wts[rows, a] = pw + wt
+            sizes[rows, a] += sizes[rows, b]
+            top[rows] -= 1
+
+    # expansion des blocs : chaque ligne fait exactement lengths[r] points
+    out = np.full((S, n), np.nan)
+    blocks = np.arange(n)[None, :] < top[:, None]
+    out[np.arange(n)[None, :] < lengths[:, None]] = np.repeat(vals[blocks], sizes[blocks])
+    return out
+
+
+# Seuils évalués entre deux appels de progress() pendant la calibration
+_CALIB_THRESHOLDS_PER_STEP = 32
+
+
+def _sweep_chunk(d, f, cuts, starts, ends, thresholds, target):
+    """
+    Plasticité + score d'un paquet de seuils (voir calibrate_threshold_match_target_first).
+    Appelé tel quel dans le processus courant ou dans un worker (utils.parallel_sweep).
+    Retour: (candidates {seuil: diag}, meilleur seuil du paquet, sa clé de tri).
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    values, valid = _abs_plasticity_batch(d, f, cuts, starts, ends, thresholds)
 
     best = None
     best_key = (np.inf, np.inf, np.inf)
-    diag = {"target": float(target), "candidates": {}}
-
-    thresholds = np.arange(search_range[0], search_range[1] + step, step)
-    for ft in thresholds:
-        df = compute_abs_plasticity(
-            file_path,
-            time_reset_threshold=time_reset_threshold,
-            force_threshold=float(ft),
-            min_cycle_length=min_cycle_length
-        )
-        if df.empty or "Abs_plast_mm" not in df:
-            continue
+    candidates = {}
 
-        y = pd.to_numeric(df["Abs_plast_mm"], errors="coerce").dropna().values
-        if y.size < 4:
-            continue
+    # Séries valides alignées à gauche, une ligne par seuil
+    usable = valid & ~np.isnan(values)
+    lengths = usable.sum(axis=1)
+    Y = np.full(values.shape, np.nan)
+    Y[np.arange(values.shape[1])[None, :] < lengths[:, None]] = values[usable]
+
+    # Monotone projection (all thresholds at once)
+    Yhat = _pava_batch(Y, lengths=lengths)
 
-        # Monotone projection
-        yhat = _pava(y)
+    for k, ft in enumerate(thresholds):
+        n = int(lengths[k])
+        if n < 4:
+            continue
+        y, yhat = Y[k, :n], Yhat[k, :n]
 
         # PRIMARY: closeness to target (use monotone final value)
         abs_err_hat = float(abs(yhat[-1] - target))
@@ -214,7 +600,7 @@ def calibrate_threshold_match_target_first(
         rmse = float(np.sqrt(np.mean((y - yhat)**2)))
 
         key = (abs_err_hat, sum_neg, rmse)
-        diag["candidates"][float(ft)] = {
+        candidates[float(ft)] = {
             "abs_err_hat": abs_err_hat,
             "sum_neg": sum_neg,
             "rmse": rmse,
@@ -227,4 +613,135 @@ def calibrate_threshold_match_target_first(
             best_key = key
             best = float(ft)
 
-    return best, diag
\ No newline at end of file
+    return candidates, best, best_key
+
+
+# Recherche adaptative : facteur d'affinage du pas, centres raffinés par passe
+_REFINE_FACTOR = 5
+_REFINE_KEEP = 3
+
+
+def _refine_points(intervals, new_step, lo, hi, seen):
+    """Points a + k·new_step des intervalles [a, b] ∩ [lo, hi], pas encore évalués."""
+    pts = []
+    for a, b in intervals:
+        k = int(round((b - a) / new_step))
+        for x in a + new_step * np.arange(k + 1):
+            x = float(np.round(x, 9))
+            if lo - 1e-12 <= x <= hi + 1e-12 and x not in seen:
+                seen.add(x)
+                pts.append(x)
+    return np.array(sorted(pts))
+
+
+def _refine_intervals(evaluated, keys, step):
+    """
+    Zones à raffiner : ± step autour des _REFINE_KEEP meilleures clés, et les
+    intervalles où la validité change (seuil trop bas : < 4 cycles exploitables),
+    là où le score saute d'un coup et où un pas grossier peut manquer l'optimum.
+    """
+    centers = sorted(keys, key=lambda t: (keys[t], t))[:_REFINE_KEEP]
+    intervals = [(c - step, c + step) for c in centers]
+    ts = sorted(evaluated)
+    for a, b in zip(ts[:-1], ts[1:]):
+        if (a in keys) != (b in keys):
+            intervals.append((a, b))
+    return intervals
+
+
+def calibrate_threshold_match_target_first(
+    file_path: str,
+    target_F0: float = 0.05,          # “a little above 0”
+    time_reset_threshold: float = 0.05,
+    min_cycle_length: int = 10,
+    search_range=(0.01, 1.5),         # allow near-zero if needed to hit target
+    step: float = 0.005,
+    progress=None,
+    workers: int = 1,
+    chunk_size: int | None = None,
+    mode: str = "grid",
+    resolution: float = 0.001,
+):
+    """
+    Primary:  |last(isotone(abs_plast)) - TARGET(F0)|   (smaller is better)
+    Secondary: total downward drops of the raw curve  (sum of negative diffs)
+    Tertiary:  RMSE raw vs isotone (smoother is better)
+    mode="grid": every threshold of np.arange(search_range..., step).
+    mode="adaptive": that grid is only the coarse pass; the step is then
+    divided by _REFINE_FACTOR until `resolution`, each pass evaluating the
+    neighbourhood (± previous step) of the _REFINE_KEEP best keys so far and
+    the intervals where thresholds stop giving 4 usable cycles.
+    diag["passes"] lists the thresholds evaluated by each pass.
+    The file is loaded and split into cycles once; the candidate thresholds
+    are evaluated in chunks (_sweep_chunk). With workers > 1 and a large
+    enough sweep, the chunks are spread over a process pool sharing the data
+    through shared memory (utils.parallel_sweep.Sweeper, started once and
+    reused by every pass); the result is identical.
+    progress: optional callable(fraction, message), called between steps
+    (it may raise to abort, e.g. controllers.task_runner.TaskCancelled).
+    Returns: (best_thresh, diagnostics_dict)
+    """
+    if mode not in ("grid", "adaptive"):
+        raise ValueError(f"Unknown calibration mode: {mode}")
+    report = progress or (lambda fraction, message="": None)
+    report(0.0, "Loading data")
+    cycles = load_cached_cycles(file_path, time_reset_threshold)
+    data = cycles.data
+    d, f = data[:,1], data[:,2]
+
+    target = _global_target_from_arrays(d, f, target_F0)
+    if target is None:
+        return None, {"reason": "no valid near-zero crossings", "target": None}
+
+    starts, ends = cycles.bounds(min_cycle_length)
+    chunk = max(1, int(chunk_size or _CALIB_THRESHOLDS_PER_STEP))
+
+    from utils.parallel_sweep import Sweeper
+
+    best = None
+    best_key = (np.inf, np.inf, np.inf)
+    diag = {"target": float(target), "candidates": {}, "passes": []}
+    keys = {}
+
+    # Étapes de pas : [step] en grille, step, step/5, ... jusqu'à resolution en adaptatif
+    steps = [step]
+    if mode == "adaptive":
+        while steps[-1] > resolution * (1 + 1e-9):
+            steps.append(max(steps[-1] / _REFINE_FACTOR, resolution))
+    lo, hi = search_range
+    seen, evaluated = set(), []
+
+    # Un seul pool / bloc de mémoire partagée pour toutes les passes
+    with Sweeper(d, f, cycles.offsets, starts, ends, float(target), workers) as sweeper:
+        for p, s in enumerate(steps):
+            if p == 0:
+                thresholds = np.arange(lo, hi + step, step)
+                seen.update(float(np.round(x, 9)) for x in thresholds)
+            else:
+                thresholds = _refine_points(_refine_intervals(evaluated, keys, steps[p - 1]),
+                                            s, lo, hi, seen)
+            evaluated.extend(float(t) for t in thresholds)
+            diag["passes"].append({"step": float(s), "thresholds": [float(t) for t in thresholds]})
+            if thresholds.size == 0:
+                continue
+
+            chunks = [thresholds[a:a + chunk] for a in range(0, thresholds.size, chunk)]
+            span = 0.9 / len(steps)
+            results = sweeper.run(
+                chunks, progress=lambda done: report(0.05 + span * (p + done / len(chunks)),
+                                                     "Computing plasticity"))
+
+            # Fusion dans l'ordre des seuils : même résultat que le balayage séquentiel
+            for candidates, chunk_best, key in results:
+                diag["candidates"].update(candidates)
+                for t, c in candidates.items():
+                    keys[t] = (c["abs_err_hat"], c["sum_neg"], c["rmse"])
+                if chunk_best is not None and key < best_key:
+                    best_key = key
+                    best = chunk_best
+
+    if mode == "adaptive":
+        diag["candidates"] = dict(sorted(diag["candidates"].items()))
+    diag["n_evaluated"] = sum(len(ps["thresholds"]) for ps in diag["passes"])
+    report(1.0, "Done")
+    return best, diag
@@ -0,0 +1,126 @@
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# En dessous (points × seuils), le démarrage des processus coûte plus qu'il ne rapporte
+PARALLEL_MIN_WORK = 1 << 28
+
+_worker_arrays = None   # dans un worker : (SharedMemory, {nom: vue})
+
+
+def sweep_options(settings: dict | None) -> dict:
+    """
+    workers / chunk_size depuis settings['analysis'] :
+    workers 0 ou null → un par cœur ; 1 → séquentiel.
+    """
+    cfg = ((settings or {}).get("analysis", {}) or {})
+    workers = cfg.get("workers", 1)
+    workers = int(workers) if workers else (os.cpu_count() or 1)
+    return {"workers": max(1, workers), "chunk_size": cfg.get("chunk_size")}
+
+
+def _share(arrays: dict):
+    """Copie les tableaux dans un seul bloc de mémoire partagée ; retour (shm, spec)."""
+    spec, offset = [], 0
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a)
+        spec.append((name, a.dtype.str, a.shape, offset))
+        offset += -(-a.nbytes // 64) * 64    # alignement 64 octets
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (name, dtype, shape, off) in spec:
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=off)[...] = arrays[name]
+    return shm, spec
+
+
+def _views(shm, spec) -> dict:
+    return {name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=off)
+            for (name, dtype, shape, off) in spec}
+
+
+def _worker_init(shm_name, spec):
+    global _worker_arrays
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_arrays = (shm, _views(shm, spec))
+
+
+def _worker_sweep(thresholds, target):
+    from utils.data_treatement import _sweep_chunk
+    a = _worker_arrays[1]
+    return _sweep_chunk(a["d"], a["f"], a["cuts"], a["starts"], a["ends"], thresholds, target)
+
+
+class Sweeper:
+    """
+    Évalue _sweep_chunk sur des paquets de seuils pour un même jeu de données,
+    en une ou plusieurs passes (calibration adaptative). Séquentiel si
+    workers <= 1 ou tant que les passes sont petites ; sinon, à la première
+    passe assez grosse, les données sont placées une fois en mémoire partagée
+    et un ProcessPoolExecutor (spawn) est démarré, puis réutilisé par toutes
+    les passes suivantes jusqu'à close() / sortie du bloc with.
+    """
+
+    def __init__(self, d, f, cuts, starts, ends, target, workers: int = 1):
+        self.arrays = {"d": d, "f": f, "cuts": cuts, "starts": starts, "ends": ends}
+        self.target = target
+        self.workers = max(1, int(workers or 1))
+        self._shm = None
+        self._ex = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def run(self, chunks, progress=None) -> list:
+        """
+        Résultats de _sweep_chunk pour chaque paquet de `chunks`, dans l'ordre.
+        progress: callable(nb de paquets terminés), peut lever pour annuler.
+        """
+        from utils.data_treatement import _sweep_chunk
+        report = progress or (lambda done: None)
+        n_thresholds = sum(len(c) for c in chunks)
+
+        if self._ex is None and (self.workers <= 1 or len(chunks) <= 1
+                                 or len(self.arrays["d"]) * n_thresholds < PARALLEL_MIN_WORK):
+            a = self.arrays
+            results = []
+            for c in chunks:
+                report(len(results))
+                results.append(_sweep_chunk(a["d"], a["f"], a["cuts"], a["starts"], a["ends"], c, self.target))
+            return results
+
+        if self._ex is None:
+            self._shm, spec = _share(self.arrays)
+            self._ex = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp.get_context("spawn"),
+                                           initializer=_worker_init, initargs=(self._shm.name, spec))
+        futures = {self._ex.submit(_worker_sweep, c, self.target): i for i, c in enumerate(chunks)}
+        try:
+            results = [None] * len(chunks)
+            report(0)
+            for done, fut in enumerate(as_completed(futures), start=1):
+                results[futures[fut]] = fut.result()
+                report(done)
+            return results
+        except BaseException:
+            for fut in futures:
+                fut.cancel()
+            raise
+
+    def close(self):
+        ex, self._ex = self._ex, None
+        shm, self._shm = self._shm, None
+        if ex is not None:
+            ex.shutdown(wait=True, cancel_futures=True)
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+
+def run_sweep(d, f, cuts, starts, ends, chunks, target, workers: int = 1, progress=None) -> list:
+    """Une seule passe de Sweeper (pool et mémoire partagée libérés au retour)."""
+    with Sweeper(d, f, cuts, starts, ends, target, min(int(workers or 1), len(chunks))) as sweeper:
+        return sweeper.run(chunks, progress)
@@ -0,0 +1,127 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Tampon circulaire de capacité fixe pour des échantillons (N, width).
+    extend() écrase les plus anciens une fois plein ; view() les rend
+    dans l'ordre chronologique.
+    """
+
+    def __init__(self, capacity: int, width: int = 2, dtype=np.float32):
+        self.capacity = int(capacity)
+        self._data = np.empty((self.capacity, width), dtype=dtype)
+        self._head = 0      # prochaine position d'écriture
+        self._size = 0
+        self.total = 0      # nombre d'échantillons reçus depuis clear()
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        self._head = self._size = self.total = 0
+
+    def extend(self, block):
+        block = np.asarray(block).reshape(-1, self._data.shape[1])
+        n = len(block)
+        self.total += n
+        if n >= self.capacity:
+            self._data[:] = block[-self.capacity:]
+            self._head, self._size = 0, self.capacity
+            return
+        end = self._head + n
+        if end <= self.capacity:
+            self._data[self._head:end] = block
+        else:
+            k = self.capacity - self._head
+            self._data[self._head:] = block[:k]
+            self._data[:n - k] = block[k:]
+        self._head = end % self.capacity
+        self._size = min(self.capacity, self._size + n)
+
+    def view(self) -> np.ndarray:
+        """Échantillons dans l'ordre d'arrivée (copie seulement si le tampon a bouclé)."""
+        if self._size < self.capacity:
+            return self._data[:self._size]
+        if self._head == 0:
+            return self._data
+        return np.concatenate((self._data[self._head:], self._data[:self._head]))
+
+
+def minmax_decimate(x, y, n_bins: int):
+    """
+    Réduction min/max « pixel » : découpe la série en `n_bins` paquets
+    d'échantillons consécutifs et garde, pour chacun, les points de y min
+    et y max dans leur ordre d'origine. Le tracé garde ses pics pour un coût
+    borné par ~2·n_bins points, quelle que soit la longueur de la série.
+    """
+    x = np.asarray(x); y = np.asarray(y)
+    n = y.size
+    n_bins = max(1, int(n_bins))
+    if n <= 2 * n_bins:
+        return x, y
+    size = -(-n // n_bins)                     # taille d'un paquet (arrondi haut)
+    m = (n // size) * size
+    starts = np.arange(0, m, size)
+    blocks = y[:m].reshape(-1, size)
+    imin = blocks.argmin(axis=1) + starts
+    imax = blocks.argmax(axis=1) + starts
+    idx = np.column_stack((np.minimum(imin, imax), np.maximum(imin, imax))).ravel()
+    if m < n:                                  # dernier paquet incomplet
+        tail = y[m:]
+        a, b = m + int(tail.argmin()), m + int(tail.argmax())
+        idx = np.concatenate((idx, [min(a, b), max(a, b)]))
+    if idx[-1] != n - 1:
+        idx = np.append(idx, n - 1)            # toujours finir sur le dernier point
+    return x[idx], y[idx]
+
+
+class HistoryOverview:
+    """
+    Vue d'ensemble sous-échantillonnée de tout l'essai, bornée à `capacity`
+    points. Les échantillons entrants sont regroupés par paquets de
+    2·factor (→ leurs points min/max) ; quand la vue est pleine, elle est
+    elle-même réduite de moitié et `factor` double.
+    """
+
+    def __init__(self, capacity: int = 20000, dtype=np.float32):
+        self.capacity = max(8, int(capacity))
+        self._dtype = dtype
+        self.clear()
+
+    def clear(self):
+        self.factor = 1
+        self._pts = np.empty((0, 2), dtype=self._dtype)
+        self._carry = np.empty((0, 2), dtype=self._dtype)
+
+    def __len__(self):
+        return len(self._pts)
+
+    def extend(self, block):
+        block = np.asarray(block, dtype=self._dtype).reshape(-1, 2)
+        if self.factor == 1:
+            new = block
+        else:
+            pending = np.concatenate((self._carry, block)) if len(self._carry) else block
+            new, self._carry = self._pool(pending, 2 * self.factor)
+        self._pts = np.concatenate((self._pts, new))
+        while len(self._pts) > self.capacity:
+            pts, rest = self._pool(self._pts, 4)
+            self._pts = np.concatenate((pts, rest))
+            self.factor *= 2
+
+    def view(self) -> np.ndarray:
+        return np.concatenate((self._pts, self._carry)) if len(self._carry) else self._pts
+
+    @staticmethod
+    def _pool(pts, group: int):
+        """Garde les points min/max de y de chaque groupe complet ; retourne (pool, reste)."""
+        m = (len(pts) // group) * group
+        if m == 0:
+            return pts[:0], pts
+        starts = np.arange(0, m, group)
+        ys = pts[:m, 1].reshape(-1, group)
+        imin = ys.argmin(axis=1) + starts
+        imax = ys.argmax(axis=1) + starts
+        idx = np.column_stack((np.minimum(imin, imax), np.maximum(imin, imax))).ravel()
+        return pts[idx], pts[m:]
@@ -0,0 +1,260 @@
+import io
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Fichier brut binaire :
+#   RAW_MAGIC (8 octets) | longueur de l'en-tête JSON (uint32 LE) | JSON utf-8
+#   | bourrage jusqu'à un multiple de 16 | enregistrements float32 LE (t, d, f)
+# Les enregistrements sont exactement les payloads des trames série 0xAA.
+RAW_MAGIC = b"TBRAW\x00\x01\n"
+RAW_EXTENSION = ".bin"
+RAW_COLUMNS = ("time", "distance", "force")
+RAW_DTYPE = np.dtype("<f4")
+RAW_RECORD_SIZE = RAW_DTYPE.itemsize * len(RAW_COLUMNS)
+_ALIGN = 16
+
+
+def raw_suffix(settings: dict | None) -> str:
+    """Suffixe du fichier brut selon settings['acquisition']['raw_format'] ('txt' | 'bin')."""
+    fmt = ((settings or {}).get("acquisition", {}) or {}).get("raw_format", "txt")
+    return "_raw" + (RAW_EXTENSION if str(fmt).lower() == "bin" else ".txt")
+
+
+def is_raw_binary(path) -> bool:
+    """True si `path` commence par l'en-tête binaire."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(RAW_MAGIC)) == RAW_MAGIC
+    except OSError:
+        return False
+
+
+def write_raw_header(f, metadata: dict | None = None) -> int:
+    """
+    Écrit l'en-tête dans le fichier binaire `f` (ouvert en 'wb').
+    Retourne la taille de l'en-tête (= offset des données).
+    """
+    header = {
+        "version": 1,
+        "columns": list(RAW_COLUMNS),
+        "dtype": RAW_DTYPE.str,
+        "metadata": metadata or {},
+    }
+    blob = json.dumps(header, ensure_ascii=False, default=str).encode("utf-8")
+    size = len(RAW_MAGIC) + 4 + len(blob)
+    pad = (-size) % _ALIGN
+    f.write(RAW_MAGIC)
+    f.write(struct.pack("<I", len(blob) + pad))
+    f.write(blob + b" " * pad)
+    return size + pad
+
+
+def read_raw_header(path) -> tuple[dict, int]:
+    """Retourne (en-tête JSON, offset des données). Lève ValueError si le format est inconnu."""
+    with open(path, "rb") as f:
+        if f.read(len(RAW_MAGIC)) != RAW_MAGIC:
+            raise ValueError(f"Not a binary raw file: {path}")
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length).decode("utf-8"))
+    return header, len(RAW_MAGIC) + 4 + length
+
+
+def memmap_raw_binary(path) -> np.memmap | np.ndarray:
+    """
+    Projette les enregistrements d'un fichier binaire en mémoire : tableau (N, 3)
+    float32 en lecture seule, sans copie. Un enregistrement tronqué en fin de
+    fichier (arrêt brutal pendant l'écriture) est ignoré.
+    """
+    header, offset = read_raw_header(path)
+    dtype = np.dtype(header.get("dtype", RAW_DTYPE.str))
+    ncols = len(header.get("columns", RAW_COLUMNS))
+    n = (os.path.getsize(path) - offset) // (dtype.itemsize * ncols)
+    if n <= 0:
+        return np.empty((0, ncols), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(n, ncols))
+
+
+def _text_separator(path) -> str:
+    """'\t' si les premières lignes sont strictement tabulées (chemin C le plus rapide), sinon tout blanc."""
+    with open(path, "rb") as f:
+        head = f.read(1 << 16).splitlines()[:-1] or [b""]
+    strict_tabs = all(
+        line.count(b"\t") == len(RAW_COLUMNS) - 1 and b" " not in line
+        for line in head if line.strip()
+    )
+    return "\t" if strict_tabs and any(line.strip() for line in head) else r"\s+"
+
+
+def read_raw_text(path, dtype=np.float64) -> np.ndarray:
+    """
+    Lit un fichier brut texte (3 colonnes séparées par tabulations ou espaces)
+    avec le parseur C de pandas. Retour: tableau (N, 3) `dtype` (float64 ou
+    float32) ; (0, 3) pour un fichier vide. Lève ValueError si une ligne
+    n'est pas numérique.
+    """
+    import pandas as pd
+    try:
+        df = pd.read_csv(path, sep=_text_separator(path), header=None, names=RAW_COLUMNS,
+                         dtype=np.float64, engine="c")
+    except pd.errors.EmptyDataError:
+        return np.empty((0, len(RAW_COLUMNS)), dtype=dtype)
+    return df.to_numpy(dtype=dtype)
+
+
+STREAM_BLOCK_ROWS = 1 << 20
+
+
+def iter_raw_blocks(path, block_rows: int = STREAM_BLOCK_ROWS):
+    """
+    Lecture par blocs d'au plus `block_rows` lignes, en float64 : mêmes valeurs
+    que load_raw_data / read_raw_text, mémoire bornée par la taille d'un bloc.
+    Binaire : tranches du memmap ; texte : parseur C de pandas par morceaux.
+    """
+    block_rows = max(1, int(block_rows))
+    if is_raw_binary(path):
+        data = memmap_raw_binary(path)
+        for a in range(0, len(data), block_rows):
+            yield np.asarray(data[a:a + block_rows], dtype=np.float64)
+        return
+
+    import pandas as pd
+    try:
+        reader = pd.read_csv(path, sep=_text_separator(path), header=None, names=RAW_COLUMNS,
+                             dtype=np.float64, engine="c", chunksize=block_rows)
+    except pd.errors.EmptyDataError:
+        return
+    with reader:
+        for chunk in reader:
+            yield chunk.to_numpy(dtype=np.float64)
+
+
+class RawDataWriter:
+    """
+    Écriture du fichier brut depuis un thread de fond.
+    Le thread GUI ne fait qu'empiler des blocs (N, 3) ; le thread les regroupe
+    en gros morceaux et les écrit toutes les `flush_interval_s` secondes ou dès
+    que `flush_bytes` octets sont en attente. sync() force une écriture suivie
+    d'un fsync (appelé à chaque fin de cycle).
+    Format texte (.txt, "%.2f" tabulé) ou binaire (RAW_EXTENSION + en-tête).
+    """
+
+    def __init__(self, path, metadata: dict | None = None, binary: bool | None = None,
+                 flush_interval_s: float = 1.0, flush_bytes: int = 1 << 20):
+        self.path = str(path)
+        self.binary = self.path.lower().endswith(RAW_EXTENSION) if binary is None else binary
+        self.flush_interval_s = flush_interval_s
+        self.flush_bytes = flush_bytes
+        self.error = None              # exception levée par le thread d'écriture
+
+        self._file = open(self.path, "wb")
+        if self.binary:
+            write_raw_header(self._file, metadata)
+
+        self._pending = deque()        # blocs en attente (append/popleft atomiques)
+        self._in = 0                   # échantillons empilés (thread GUI)
+        self._out = 0                  # échantillons écrits (thread d'écriture)
+        self._sync_requested = False
+        self._closing = False
+        self._wake = threading.Event()
+
+        # statistiques
+        self.fsync_count = 0
+        self.last_write_ms = 0.0
+        self.max_write_ms = 0.0
+        self._write_ms_total = 0.0
+        self._write_count = 0
+
+        self._thread = threading.Thread(target=self._run, name="RawDataWriter", daemon=True)
+        self._thread.start()
+
+    # ---------- côté GUI ----------
+    def write(self, block):
+        """Empile un bloc (N, 3) [t, d, f] ; ne bloque jamais. Après une erreur
+        d'écriture (self.error), les blocs sont abandonnés."""
+        block = np.asarray(block, dtype=RAW_DTYPE).reshape(-1, 3)
+        if not block.size or self._closing or self.error is not None:
+            return
+        self._pending.append(block)
+        self._in += len(block)
+        if self.backlog_samples * RAW_RECORD_SIZE >= self.flush_bytes:
+            self._wake.set()
+
+    def sync(self):
+        """Demande l'écriture de tout ce qui est en attente puis un fsync."""
+        self._sync_requested = True
+        self._wake.set()
+
+    def close(self):
+        """Écrit le reste, fsync, ferme le fichier. Bloque jusqu'à la fin.
+        Relève l'erreur d'écriture éventuelle : le fichier est alors tronqué."""
+        if self._closing:
+            return
+        self._closing = True
+        self._sync_requested = True
+        self._wake.set()
+        self._thread.join()
+        self._file.close()
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def backlog_samples(self) -> int:
+        return self._in - self._out
+
+    def stats(self) -> dict:
+        return {
+            "backlog_samples": self.backlog_samples,
+            "backlog_bytes": self.backlog_samples * RAW_RECORD_SIZE,
+            "written_samples": self._out,
+            "last_write_ms": self.last_write_ms,
+            "max_write_ms": self.max_write_ms,
+            "mean_write_ms": self._write_ms_total / self._write_count if self._write_count else 0.0,
+            "fsync_count": self.fsync_count,
+        }
+
+    # ---------- thread d'écriture ----------
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            closing = self._closing
+            sync, self._sync_requested = self._sync_requested, False
+            try:
+                self._flush(sync)
+            except Exception as e:
+                self.error = e
+                return
+            if closing:
+                return
+
+    def _flush(self, sync: bool):
+        blocks = []
+        for _ in range(len(self._pending)):
+            blocks.append(self._pending.popleft())
+        if not blocks and not sync:
+            return
+        t0 = time.perf_counter()
+        if blocks:
+            data = blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+            if self.binary:
+                self._file.write(data.tobytes())
+            else:
+                buf = io.StringIO()
+                np.savetxt(buf, data, fmt="%.2f", delimiter="\t")
+                self._file.write(buf.getvalue().encode("ascii"))
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+            self.fsync_count += 1
+        ms = (time.perf_counter() - t0) * 1000.0
+        self.last_write_ms = ms
+        self.max_write_ms = max(self.max_write_ms, ms)
+        self._write_ms_total += ms
+        self._write_count += 1
+        self._out += sum(len(b) for b in blocks)
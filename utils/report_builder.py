@@ -0,0 +1,324 @@
+"""
+Préparation et génération des rapports Excel à partir des dossiers de test.
+
+Un dossier de test (`<name>_<splint>_<date>`, voir utils.config_saver) contient
+config_flexion.json et/ou config_extension.json et les fichiers bruts
+`<name>_<splint>_<date>_<motion>_raw.txt|.bin`.
+
+    python -m utils.report_builder [data_path] --workers 4 --conflict overwrite
+
+génère le rapport de chaque dossier de `data_path` (défaut :
+settings default_paths.data_path) dans un pool de processus, sans aucune
+boîte de dialogue, puis affiche un tableau récapitulatif avec les durées.
+"""
+import argparse
+import json
+import os
+import time
+
+MOTIONS = ("flexion", "extension")
+RAW_SUFFIXES = ("_raw.txt", "_raw.bin")
+
+
+# ---------- Fusion des configs flexion / extension ----------
+
+def get_fused_value(value, key=""):
+    if isinstance(value, dict):
+        v_flex = value.get("flexion", "")
+        v_ext  = value.get("extension", "")
+        if v_flex == v_ext:
+            return v_flex
+        return f"{v_flex} (flexion), {v_ext} (extension)"
+    return value
+
+
+def merge_data(meta1, meta2):
+    merged = {}
+    for key in set(meta1.keys()).union(meta2.keys()):
+        v1 = meta1.get(key)
+        v2 = meta2.get(key)
+
+        if isinstance(v1, dict) and isinstance(v2, dict):
+            merged[key] = merge_data(v1, v2)
+
+        if v1 == v2 or v2 is None:
+            merged[key] = v1
+        elif v1 is None:
+            merged[key] = v2
+        else:
+            merged[key] = {"flexion": v1, "extension": v2}
+    return merged
+
+
+def check_compatibility(config1, config2):
+    keys_to_match = ["speed", "force_max"]
+    for key in keys_to_match:
+        if config1["config"].get(key) != config2["config"].get(key):
+            raise ValueError(f"Parameter '{key}' differs between the two tests.")
+
+
+def _safe_load_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _merged_meta_config(flex_cfg: dict, ext_cfg: dict, has_flex: bool, has_ext: bool):
+    """(metadata, config) : fusion si les deux côtés existent, sinon ceux du seul côté présent."""
+    if has_flex and has_ext:
+        return (merge_data(flex_cfg.get("metadata", {}), ext_cfg.get("metadata", {})),
+                merge_data(flex_cfg.get("config",   {}), ext_cfg.get("config",   {})))
+    cfg = flex_cfg if has_flex else ext_cfg
+    return cfg.get("metadata", {}) or {}, cfg.get("config", {}) or {}
+
+
+def report_fields(config_flex: dict, config_ext: dict, has_flex: bool, has_ext: bool) -> dict:
+    """
+    Champs du rapport (titre, métadonnées, banc) tirés des configs de test,
+    les valeurs qui diffèrent entre flexion et extension étant fusionnées
+    par get_fused_value. Ne vérifie pas la compatibilité (check_compatibility).
+    """
+    meta, config = _merged_meta_config(config_flex, config_ext, has_flex, has_ext)
+    bench = config.get("bench", {}) or {}
+    return {
+        "title":     get_fused_value(meta.get("name", ""), "Name"),
+        "date":      get_fused_value(meta.get("date", ""), "Date"),
+        "brace":     get_fused_value(meta.get("splint", ""), "Brace type"),
+        "reference": get_fused_value(meta.get("reference", ""), "Reference"),
+        "operator":  get_fused_value(meta.get("operator", ""), "Operator"),
+        "material":  get_fused_value(meta.get("material", ""), "Material"),
+        "note":      get_fused_value(meta.get("note", ""), "Note"),
+        "speed":     get_fused_value(config.get("speed", ""), "Speed"),
+        "force_max": get_fused_value(config.get("force_max", ""), "Force Max"),
+        "factor":    bench.get("factor", 0.025),
+        "lever_arm_mm":     bench.get("lever_arm_mm", 85.0),
+        "torque_threshold": bench.get("torque_threshold", 3.4),
+    }
+
+
+def is_missing(val) -> bool:
+    """Valeur de métadonnée absente ou de remplissage ("", "none", "n/a", …)."""
+    if val is None:
+        return True
+    if isinstance(val, str):
+        s = val.strip()
+        return s == "" or s.lower() in {"none", "n/a", "na", "nan", "null"}
+    return False
+
+
+def merge_configs_and_results(folder_path: str, results: dict) -> str:
+    """
+    Écrit config_final.json en utilisant:
+      - les 2 configs si présentes (fusion tolérante),
+      - sinon la seule dispo (flexion OU extension).
+    Lève une erreur seulement si AUCUNE des deux n'existe.
+    Retourne le chemin du fichier final.
+    """
+    flex_path = os.path.join(folder_path, "config_flexion.json")
+    ext_path  = os.path.join(folder_path, "config_extension.json")
+
+    has_flex = os.path.isfile(flex_path)
+    has_ext  = os.path.isfile(ext_path)
+
+    # ❗ Ancienne condition probablement 'or' → trop stricte.
+    if not has_flex and not has_ext:
+        raise FileNotFoundError("No config_flexion.json nor config_extension.json found.")
+
+    flex_cfg = _safe_load_json(flex_path) if has_flex else {}
+    ext_cfg  = _safe_load_json(ext_path)  if has_ext  else {}
+
+    merged_metadata, merged_config = _merged_meta_config(flex_cfg, ext_cfg, has_flex, has_ext)
+
+    final = {
+        "metadata": merged_metadata,
+        "config": merged_config,
+        "mechanical_results": results,
+    }
+
+    final_path = os.path.join(folder_path, "config_final.json")
+    with open(final_path, "w", encoding="utf-8") as f:
+        json.dump(final, f, indent=4)
+
+    return final_path
+
+
+# ---------- Découverte des dossiers de test ----------
+
+def find_raw_file(folder: str, motion: str) -> str | None:
+    """Fichier brut `…_<motion>_raw.txt|.bin` du dossier (le plus récent s'il y en a plusieurs)."""
+    suffixes = tuple(f"_{motion}{s}" for s in RAW_SUFFIXES)
+    found = [e.path for e in os.scandir(folder)
+             if e.is_file() and e.name.lower().endswith(suffixes)]
+    return max(found, key=os.path.getmtime) if found else None
+
+
+def discover_test_folders(data_path) -> list:
+    """
+    Dossiers `<name>_<splint>_<date>` directement sous `data_path` contenant
+    config_flexion.json et/ou config_extension.json, triés par nom.
+    """
+    folders = []
+    for entry in sorted(os.scandir(data_path), key=lambda e: e.name):
+        if not entry.is_dir() or entry.name.count("_") < 2:
+            continue
+        if any(os.path.isfile(os.path.join(entry.path, f"config_{m}.json")) for m in MOTIONS):
+            folders.append(entry.path)
+    return folders
+
+
+def prepare_report(folder: str) -> dict:
+    """
+    Arguments d'export_to_excel_report pour un dossier de test, sans dialogue :
+    un côté compte s'il a sa config et son fichier brut ; un titre absent est
+    remplacé par le nom du dossier. Lève ValueError si aucun côté n'est
+    utilisable ou si les deux configs sont incompatibles.
+    """
+    configs, paths = {}, {}
+    for motion in MOTIONS:
+        cfg_path = os.path.join(folder, f"config_{motion}.json")
+        raw_path = find_raw_file(folder, motion) if os.path.isfile(cfg_path) else None
+        if raw_path:
+            configs[motion], paths[motion] = _safe_load_json(cfg_path), raw_path
+    has_flex, has_ext = "flexion" in paths, "extension" in paths
+    if not (has_flex or has_ext):
+        raise ValueError("No raw data file next to config_flexion.json / config_extension.json")
+    if has_flex and has_ext:
+        check_compatibility(configs["flexion"], configs["extension"])
+
+    fields = report_fields(configs.get("flexion", {}), configs.get("extension", {}), has_flex, has_ext)
+    title = fields["title"]
+    return {
+        "flexion_path": paths.get("flexion"),
+        "extension_path": paths.get("extension"),
+        "output_folder": folder,
+        "file_title": os.path.basename(os.path.normpath(folder)) if is_missing(title) else str(title),
+        "test_date": fields["date"],
+        "brace_type": fields["brace"],
+        "sample_reference": fields["reference"],
+        "speed": fields["speed"],
+        "force_max": fields["force_max"],
+        "operator": fields["operator"],
+        "material": fields["material"],
+        "torque": fields["torque_threshold"],
+        "factor": fields["factor"],
+        "lever_arm_mm": fields["lever_arm_mm"],
+        "note": fields["note"],
+    }
+
+
+# ---------- Génération (dans un processus du pool) ----------
+
+def build_report(folder: str, template_path=None, conflict_strategy: str = "auto_rename") -> dict:
+    """
+    Génère le rapport Excel et config_final.json d'un dossier de test.
+    Ne lève pas : retour {folder, sides, status ("ok" | "error"), seconds,
+    excel, error} pour le tableau récapitulatif.
+    """
+    from utils.data_to_excel_report import export_to_excel_report, _resolve_output_paths
+
+    t0 = time.perf_counter()
+    row = {"folder": folder, "sides": "", "status": "error", "seconds": 0.0, "excel": None, "error": None}
+    try:
+        kwargs = prepare_report(folder)
+        row["sides"] = "+".join(m[:3] for m in MOTIONS if kwargs[f"{m}_path"])
+        # titre final résolu une fois (auto_rename) puis export en "overwrite" sur ce titre
+        excel_path, _, final_title = _resolve_output_paths(
+            folder, kwargs["file_title"], conflict_strategy=conflict_strategy)
+        kwargs.update(file_title=final_title, conflict_strategy="overwrite",
+                      template_path=template_path)
+        results = export_to_excel_report(**kwargs)
+        merge_configs_and_results(folder, results)
+        row.update(status="ok", excel=excel_path)
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["seconds"] = time.perf_counter() - t0
+    return row
+
+
+def run_batch(folders, template_path=None, conflict_strategy: str = "auto_rename",
+              workers: int = 1, progress=None) -> list:
+    """
+    build_report sur chaque dossier, dans l'ordre de `folders` pour le retour.
+    workers > 1 : ProcessPoolExecutor (spawn) ; chaque rapport est indépendant.
+    progress: callable(ligne terminée) appelé au fil de l'eau.
+    """
+    if conflict_strategy not in ("overwrite", "auto_rename"):
+        raise ValueError(f"Non-interactive conflict strategy expected, got {conflict_strategy!r}")
+    report = progress or (lambda row: None)
+    workers = max(1, min(int(workers or 1), len(folders)))
+
+    if workers <= 1:
+        rows = []
+        for folder in folders:
+            rows.append(build_report(folder, template_path, conflict_strategy))
+            report(rows[-1])
+        return rows
+
+    import multiprocessing as mp
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    rows = [None] * len(folders)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as ex:
+        futures = {ex.submit(build_report, folder, template_path, conflict_strategy): i
+                   for i, folder in enumerate(folders)}
+        for fut in as_completed(futures):
+            rows[futures[fut]] = fut.result()
+            report(rows[futures[fut]])
+    return rows
+
+
+def format_summary(rows, elapsed: float | None = None) -> str:
+    """Tableau texte : dossier, côtés, statut, durée, rapport ou erreur."""
+    names = [os.path.basename(os.path.normpath(r["folder"])) for r in rows]
+    width = max([len("Folder")] + [len(n) for n in names])
+    lines = [f"{'Folder':<{width}}  {'Sides':<7}  {'Status':<6}  {'Time [s]':>8}  Report",
+             "-" * (width + 45)]
+    for name, r in zip(names, rows):
+        detail = os.path.basename(r["excel"]) if r["status"] == "ok" else r["error"]
+        lines.append(f"{name:<{width}}  {r['sides']:<7}  {r['status']:<6}  {r['seconds']:8.2f}  {detail}")
+    ok = sum(r["status"] == "ok" for r in rows)
+    total = f"{ok}/{len(rows)} reports, {sum(r['seconds'] for r in rows):.2f} s of work"
+    if elapsed is not None:
+        total += f", {elapsed:.2f} s wall time"
+    lines += ["-" * (width + 45), total]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    from utils.parallel_sweep import sweep_options
+    from utils.setting_utils import get_path_from_settings, load_settings
+
+    ap = argparse.ArgumentParser(description="Generate the Excel report of every test folder")
+    ap.add_argument("data_path", nargs="?", default=None,
+                    help="folder containing the test folders (default: settings data_path)")
+    ap.add_argument("--template", default=None, help="Excel template (default: settings template_excel)")
+    ap.add_argument("--conflict", choices=("auto_rename", "overwrite"), default="auto_rename",
+                    help="what to do when a report already exists")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="worker processes (default: settings analysis.workers, 0 = one per core)")
+    args = ap.parse_args(argv)
+
+    settings = load_settings()
+    data_path = args.data_path or str(get_path_from_settings("data_path", settings))
+    template = args.template or str(get_path_from_settings("template_excel", settings))
+    workers = sweep_options(settings)["workers"] if args.workers is None \
+        else sweep_options({"analysis": {"workers": args.workers}})["workers"]
+
+    folders = discover_test_folders(data_path)
+    if not folders:
+        print(f"No test folder found in {data_path}")
+        return 1
+    print(f"{len(folders)} test folder(s) in {data_path}, {min(workers, len(folders))} worker(s)")
+    t0 = time.perf_counter()
+    rows = run_batch(folders, template, args.conflict, workers,
+                     progress=lambda r: print(f"  {r['status']:<5} {os.path.basename(r['folder'])}"))
+    print()
+    print(format_summary(rows, time.perf_counter() - t0))
+    return 0 if all(r["status"] == "ok" for r in rows) else 1
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    raise SystemExit(main())
@@ -0,0 +1,469 @@
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import zipfile
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape as xml_escape
+
+import numpy as np
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+# Lignes générées par paquet (un seul str en mémoire à la fois)
+ROWS_PER_CHUNK = 4096
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def _row_template(ncols: int) -> str:
+    """'<row r="{0}"><c r="A{0}" t="n"><v>{1:.16g}</v></c>…' : même XML qu'openpyxl."""
+    cells = "".join(f'<c r="{get_column_letter(c + 1)}{{0}}" t="n"><v>{{{c + 1}:.16g}}</v></c>'
+                    for c in range(ncols))
+    return f'<row r="{{0}}">{cells}</row>'
+
+
+def _row_xml_slow(r: int, row) -> str:
+    """Ligne avec NaN/inf : valeur vide, comme openpyxl."""
+    cells = []
+    for c, v in enumerate(row, 1):
+        ref = f"{get_column_letter(c)}{r}"
+        if np.isfinite(v):
+            cells.append(f'<c r="{ref}" t="n"><v>{v:.16g}</v></c>')
+        else:
+            cells.append(f'<c r="{ref}" t="n"><v /></c>')
+    return f'<row r="{r}">{"".join(cells)}</row>'
+
+
+class NumericRows:
+    """
+    XML <row> de tableaux numériques 2-D (un tableau ou des blocs successifs)
+    à partir de la ligne `first_row`, rendu par paquets de ROWS_PER_CHUNK
+    lignes. last_row / ncols sont à jour une fois l'itération terminée.
+    """
+
+    def __init__(self, blocks, first_row):
+        if isinstance(blocks, np.ndarray):
+            blocks = [blocks]
+        self.blocks = blocks
+        self.last_row = first_row - 1
+        self.ncols = 0
+
+    def __iter__(self):
+        templates = {}
+        r = self.last_row + 1
+        for block in self.blocks:
+            block = np.asarray(block, dtype=float)
+            if block.ndim != 2 or not len(block):
+                continue
+            ncols = block.shape[1]
+            self.ncols = max(self.ncols, ncols)
+            tpl = templates.get(ncols)
+            if tpl is None:
+                tpl = templates[ncols] = _row_template(ncols).format
+            finite = np.isfinite(block).all(axis=1)
+            for a in range(0, len(block), ROWS_PER_CHUNK):
+                rows = block[a:a + ROWS_PER_CHUNK].tolist()
+                ok = finite[a:a + ROWS_PER_CHUNK].tolist()
+                parts = [tpl(r + i, *row) if good else _row_xml_slow(r + i, row)
+                         for i, (row, good) in enumerate(zip(rows, ok))]
+                r += len(rows)
+                self.last_row = r - 1
+                yield "".join(parts)
+
+
+def sheet_parts(zf: zipfile.ZipFile) -> dict:
+    """{nom de feuille: chemin de la partie XML} d'un classeur .xlsx."""
+    wb = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+    rels = ElementTree.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{{{_NS_PKG_REL}}}Relationship")}
+    parts = {}
+    for sheet in wb.iter(f"{{{_NS_MAIN}}}sheet"):
+        target = targets.get(sheet.get(f"{{{_NS_REL}}}id"), "")
+        if target.startswith("/"):
+            path = target[1:]
+        else:
+            path = posixpath.normpath(posixpath.join("xl", target))
+        parts[sheet.get("name")] = path
+    return parts
+
+
+_SHEETDATA_EMPTY = re.compile(r"<sheetData\s*/>")
+_DIMENSION = re.compile(r'<dimension ref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"(\s*/>)')
+
+
+def _extend_dimension(xml: str, last_row: int, ncols: int) -> str:
+    """<dimension ref> élargi pour couvrir jusqu'à la ligne last_row / colonne ncols."""
+    def dimension(m):
+        c1, r1, c2, r2 = m.group(1), m.group(2), m.group(3) or m.group(1), m.group(4) or m.group(2)
+        c2 = get_column_letter(max(column_index_from_string(c2), ncols))
+        return f'<dimension ref="{c1}{r1}:{c2}{max(int(r2), last_row)}"{m.group(5)}'
+
+    return _DIMENSION.sub(dimension, xml, count=1)
+
+
+def _write_spliced_sheet(out, xml: str, rows_file, last_row: int, ncols: int):
+    """Écrit `xml` en insérant le contenu de rows_file à la fin de <sheetData>."""
+    m = _SHEETDATA_EMPTY.search(xml)
+    if m:
+        head, tail = xml[:m.start()] + "<sheetData>", "</sheetData>" + xml[m.end():]
+    else:
+        end = xml.index("</sheetData>")
+        head, tail = xml[:end], xml[end:]
+
+    head = _extend_dimension(head, last_row, ncols)
+    out.write(head.encode("utf-8"))
+    shutil.copyfileobj(rows_file, out, 1 << 20)
+    out.write(tail.encode("utf-8"))
+
+
+# ---------- Écriture de cellules dans le XML d'une feuille ----------
+
+_CELL = re.compile(r"<c\b(?P<attrs>[^>]*?)(?:/>|>(?P<body>.*?)</c>)", re.S)
+_ROW = re.compile(r"<row\b(?P<attrs>[^>]*?)(?:/>|>(?P<body>.*?)</row>)", re.S)
+_ATTR_R = re.compile(r'\br="([A-Z]*)(\d+)"')
+_ATTR_T = re.compile(r'\s+t="[^"]*"')
+_ATTR_SPANS = re.compile(r'\s+spans="[^"]*"')
+_ADDRESS = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+def _cell_xml(attrs: str, value) -> str:
+    """<c> avec les attributs d'origine (style…) et la nouvelle valeur ; formule retirée."""
+    attrs = _ATTR_T.sub("", attrs).rstrip()
+    if value is None:
+        return f"<c{attrs}/>"
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c{attrs} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, np.integer)):
+        return f"<c{attrs}><v>{int(value)}</v></c>"
+    if isinstance(value, (float, np.floating)):
+        if not np.isfinite(value):
+            return f"<c{attrs}/>"
+        return f"<c{attrs}><v>{float(value):.16g}</v></c>"
+    text = xml_escape(str(value))
+    return f'<c{attrs} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _new_row(r: int, cells: dict) -> str:
+    """<row> complète pour {colonne: (adresse, valeur)}."""
+    return f'<row r="{r}">' + "".join(_cell_xml(f' r="{addr}"', v) for _, (addr, v) in sorted(cells.items())) + "</row>"
+
+
+def _merge_row(body: str, cells: dict) -> str:
+    """Contenu d'une <row> existante avec les cellules {colonne: (adresse, valeur)} écrites."""
+    cells = dict(cells)
+    out, pos = [], 0
+    for cm in _CELL.finditer(body):
+        col = column_index_from_string(_ATTR_R.search(cm.group("attrs")).group(1))
+        out.append(body[pos:cm.start()])
+        pos = cm.end()
+        for c in sorted(c for c in cells if c < col):       # insérées avant
+            addr, v = cells.pop(c)
+            out.append(_cell_xml(f' r="{addr}"', v))
+        if col in cells:
+            out.append(_cell_xml(cm.group("attrs"), cells.pop(col)[1]))
+        else:
+            out.append(cm.group(0))
+    out.append(body[pos:])
+    for c in sorted(cells):                                 # après la dernière
+        addr, v = cells[c]
+        out.append(_cell_xml(f' r="{addr}"', v))
+    return "".join(out)
+
+
+def set_cells(xml: str, values: dict) -> str:
+    """
+    Écrit {"I9": valeur, ...} dans le XML d'une feuille sans toucher au reste :
+    une cellule existante garde ses attributs (style), une cellule ou une
+    ligne absente est insérée à sa place. None vide la cellule.
+    """
+    by_row = {}
+    for addr, value in values.items():
+        m = _ADDRESS.match(addr)
+        if not m:
+            raise ValueError(f"Invalid cell address: {addr}")
+        by_row.setdefault(int(m.group(2)), {})[column_index_from_string(m.group(1))] = (addr, value)
+
+    m = _SHEETDATA_EMPTY.search(xml)
+    if m:
+        xml = xml[:m.start()] + "<sheetData></sheetData>" + xml[m.end():]
+    start = xml.index("<sheetData>") + len("<sheetData>")
+    end = xml.index("</sheetData>")
+    data = xml[start:end]
+
+    out, pos = [], 0
+    pending = sorted(by_row)
+    for rm in _ROW.finditer(data):
+        r = int(_ATTR_R.search(rm.group("attrs")).group(2))
+        out.append(data[pos:rm.start()])
+        pos = rm.end()
+        while pending and pending[0] < r:                   # lignes absentes
+            k = pending.pop(0)
+            out.append(_new_row(k, by_row[k]))
+        if pending and pending[0] == r:
+            pending.pop(0)
+            attrs = _ATTR_SPANS.sub("", rm.group("attrs"))     # indice de colonnes, périmé
+            out.append(f"<row{attrs}>" + _merge_row(rm.group("body") or "", by_row[r]) + "</row>")
+        else:
+            out.append(rm.group(0))
+    out.append(data[pos:])
+    for k in pending:
+        out.append(_new_row(k, by_row[k]))
+    xml = xml[:start] + "".join(out) + xml[end:]
+    return _extend_dimension(xml, max(by_row, default=0), max((max(c) for c in by_row.values()), default=0))
+
+
+# ---------- Image, relations, types de contenu ----------
+
+_CT_DRAWING = "application/vnd.openxmlformats-officedocument.drawing+xml"
+_REL_DRAWING = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/drawing"
+_REL_IMAGE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+_REL_CALCCHAIN = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/calcChain"
+_EMU_PER_PX = 9525
+# Éléments qui suivent <drawing> dans une feuille (ordre du schéma CT_Worksheet)
+_AFTER_DRAWING = ("legacyDrawing", "legacyDrawingHF", "drawingHF", "picture", "oleObjects",
+                  "controls", "webPublishItems", "tableParts", "extLst")
+
+
+def _rels_path(part: str) -> str:
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", name + ".rels")
+
+
+def _rels_entries(xml: str | None) -> list:
+    """[(Id, Type, Target)] d'un fichier .rels (vide si absent)."""
+    if not xml:
+        return []
+    root = ElementTree.fromstring(xml)
+    return [(r.get("Id"), r.get("Type"), r.get("Target"))
+            for r in root.iter(f"{{{_NS_PKG_REL}}}Relationship")]
+
+
+def _add_rel(xml: str | None, rel_type: str, target: str) -> tuple[str, str]:
+    """Ajoute une relation ; retour (nouveau XML, Id)."""
+    ids = {rid for rid, _, _ in _rels_entries(xml)}
+    n = 1
+    while f"rId{n}" in ids:
+        n += 1
+    rid = f"rId{n}"
+    entry = f'<Relationship Id="{rid}" Type="{rel_type}" Target="{xml_escape(target)}"/>'
+    if not xml:
+        xml = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+               f'<Relationships xmlns="{_NS_PKG_REL}"></Relationships>')
+    end = xml.rindex("</Relationships>")
+    return xml[:end] + entry + xml[end:], rid
+
+
+def _resolve(part: str, target: str) -> str:
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+
+
+def _relative(from_part: str, to_part: str) -> str:
+    return posixpath.relpath(to_part, posixpath.dirname(from_part))
+
+
+def _unique_part(names, pattern: str) -> str:
+    n = 1
+    while pattern.format(n) in names:
+        n += 1
+    return pattern.format(n)
+
+
+def _picture_anchor(anchor: str, width_px: int, height_px: int, pic_id: int, rid: str,
+                    prefix: str = "xdr") -> str:
+    m = _ADDRESS.match(anchor)
+    col, row = column_index_from_string(m.group(1)) - 1, int(m.group(2)) - 1
+    x = f"{prefix}:" if prefix else ""
+    return (
+        f"<{x}oneCellAnchor><{x}from><{x}col>{col}</{x}col><{x}colOff>0</{x}colOff>"
+        f"<{x}row>{row}</{x}row><{x}rowOff>0</{x}rowOff></{x}from>"
+        f'<{x}ext cx="{width_px * _EMU_PER_PX}" cy="{height_px * _EMU_PER_PX}"/>'
+        f'<{x}pic><{x}nvPicPr><{x}cNvPr id="{pic_id}" name="Image {pic_id}"/>'
+        f'<{x}cNvPicPr><a:picLocks xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" noChangeAspect="1"/></{x}cNvPicPr></{x}nvPicPr>'
+        f'<{x}blipFill><a:blip xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+        f'xmlns:r="{_NS_REL}" r:embed="{rid}"/>'
+        f'<a:stretch xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"><a:fillRect/></a:stretch></{x}blipFill>'
+        f'<{x}spPr><a:xfrm xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"/>'
+        f'<a:prstGeom xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" prst="rect"><a:avLst/></a:prstGeom></{x}spPr>'
+        f"</{x}pic><{x}clientData/></{x}oneCellAnchor>"
+    )
+
+
+def _add_picture(read, names, sheet_part, png_path, anchor, width_px, height_px):
+    """
+    Parties à écrire/remplacer pour ajouter l'image PNG à la feuille : dans son
+    dessin existant s'il y en a un (graphiques du modèle conservés), sinon dans
+    un nouveau. `read(part)` rend le texte d'une partie (ou None).
+    Retour: {partie: contenu (str ou bytes)}.
+    """
+    parts = {}
+    media = _unique_part(names, "xl/media/image{}.png")
+    with open(png_path, "rb") as f:
+        parts[media] = f.read()
+
+    sheet_rels_path = _rels_path(sheet_part)
+    sheet_rels = read(sheet_rels_path)
+    drawing = next((_resolve(sheet_part, t) for _, typ, t in _rels_entries(sheet_rels)
+                    if typ == _REL_DRAWING), None)
+
+    if drawing is not None:
+        xml = read(drawing)
+        rels, rid = _add_rel(read(_rels_path(drawing)), _REL_IMAGE, _relative(drawing, media))
+        ids = [int(i) for i in re.findall(r'<(?:\w+:)?cNvPr\b[^>]*\bid="(\d+)"', xml)]
+        m = re.search(r"</(\w+:)?wsDr>", xml)
+        prefix = (m.group(1) or "").rstrip(":")
+        anchor_xml = _picture_anchor(anchor, width_px, height_px, max(ids, default=1) + 1, rid, prefix)
+        parts[drawing] = xml[:m.start()] + anchor_xml + xml[m.start():]
+        parts[_rels_path(drawing)] = rels
+        return parts, None
+
+    drawing = _unique_part(names, "xl/drawings/drawing{}.xml")
+    rels, rid = _add_rel(None, _REL_IMAGE, _relative(drawing, media))
+    parts[drawing] = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<xdr:wsDr xmlns:xdr="http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing" '
+        'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main">'
+        + _picture_anchor(anchor, width_px, height_px, 2, rid) + "</xdr:wsDr>")
+    parts[_rels_path(drawing)] = rels
+    sheet_rels, sheet_rid = _add_rel(sheet_rels, _REL_DRAWING, _relative(sheet_part, drawing))
+    parts[sheet_rels_path] = sheet_rels
+    return parts, (drawing, sheet_rid)
+
+
+def _insert_drawing_ref(xml: str, rid: str) -> str:
+    """<drawing r:id> à sa place dans la feuille (avant legacyDrawing, tableParts, extLst…)."""
+    element = f'<drawing xmlns:r="{_NS_REL}" r:id="{rid}"/>'
+    positions = [m.start() for name in _AFTER_DRAWING
+                 for m in [re.search(rf"<(?:\w+:)?{name}\b", xml)] if m]
+    at = min(positions) if positions else xml.rindex("</")
+    return xml[:at] + element + xml[at:]
+
+
+def _content_types(xml: str, png: bool, overrides: list, removed: list) -> str:
+    if png and not re.search(r'<Default\b[^>]*Extension="png"', xml, re.I):
+        xml = xml.replace("</Types>", '<Default Extension="png" ContentType="image/png"/></Types>')
+    for part, ctype in overrides:
+        xml = xml.replace("</Types>", f'<Override PartName="/{part}" ContentType="{ctype}"/></Types>')
+    for part in removed:
+        xml = re.sub(rf'<Override\b[^>]*PartName="/{re.escape(part)}"[^>]*/>', "", xml)
+    return xml
+
+
+def _full_calc_on_load(xml: str) -> str:
+    """Recalcul complet à l'ouverture (valeurs en cache du modèle périmées)."""
+    m = re.search(r"<calcPr\b([^>]*?)(/?)>", xml)
+    if m:
+        attrs = re.sub(r'\s+fullCalcOnLoad="[^"]*"', "", m.group(1)).rstrip()
+        return xml[:m.start()] + f'<calcPr{attrs} fullCalcOnLoad="1"{m.group(2)}>' + xml[m.end():]
+    follow = ("oleSize", "customWorkbookViews", "pivotCaches", "smartTagPr", "smartTagTypes",
+              "webPublishing", "fileRecoveryPr", "webPublishObjects", "extLst")
+    positions = [m.start() for name in follow for m in [re.search(rf"<(?:\w+:)?{name}\b", xml)] if m]
+    at = min(positions) if positions else xml.rindex("</")
+    return xml[:at] + '<calcPr calcId="0" fullCalcOnLoad="1"/>' + xml[at:]
+
+
+def fill_package(template_path, out_path, rows: dict | None = None, cells: dict | None = None,
+                 picture: tuple | None = None, first_row: int = 3):
+    """
+    Copie le modèle .xlsx `template_path` vers `out_path` au niveau OOXML (zip),
+    sans charger le classeur : seules les parties concernées sont modifiées,
+    la mise en forme, les formules et les graphiques du modèle restent intacts.
+      rows:    {feuille: tableau 2-D ou itérable de blocs} ajoutés à partir de
+               `first_row` (feuilles sans ligne >= first_row) ;
+      cells:   {feuille: {"I9": valeur, ...}} (voir set_cells) ;
+      picture: (feuille, png, ancre "B7", largeur px, hauteur px).
+    Si des cellules sont écrites, calcChain.xml est retiré et le classeur est
+    marqué pour un recalcul complet à l'ouverture. Mémoire bornée par un
+    paquet de lignes (le XML des lignes passe par un fichier temporaire).
+    """
+    rows, cells = rows or {}, cells or {}
+    folder = os.path.dirname(os.path.abspath(out_path))
+    with zipfile.ZipFile(template_path) as src:
+        names = set(src.namelist())
+
+        def read(part):
+            return src.read(part).decode("utf-8") if part in names else None
+
+        parts = sheet_parts(src)
+        missing = [name for name in (*rows, *cells, *([picture[0]] if picture else []))
+                   if name not in parts]
+        if missing:
+            raise KeyError(f"Worksheet(s) not found: {', '.join(sorted(set(missing)))}")
+
+        replaced = {}       # partie -> nouveau contenu (petites parties)
+        removed = []
+        overrides = []
+        for name, values in cells.items():
+            replaced[parts[name]] = set_cells(read(parts[name]), values)
+        if picture:
+            sheet, png, anchor, width, height = picture
+            new_parts, new_drawing = _add_picture(read, names, parts[sheet], png, anchor, width, height)
+            replaced.update(new_parts)
+            if new_drawing:
+                drawing, rid = new_drawing
+                sheet_xml = replaced.get(parts[sheet]) or read(parts[sheet])
+                replaced[parts[sheet]] = _insert_drawing_ref(sheet_xml, rid)
+                overrides.append((drawing, _CT_DRAWING))
+        if cells:
+            wb_rels = read("xl/_rels/workbook.xml.rels")
+            for rid, typ, target in _rels_entries(wb_rels):
+                if typ == _REL_CALCCHAIN:
+                    removed.append(_resolve("xl/workbook.xml", target))
+                    wb_rels = re.sub(rf'<Relationship\b[^>]*Id="{rid}"[^>]*/>', "", wb_rels)
+                    replaced["xl/_rels/workbook.xml.rels"] = wb_rels
+            replaced["xl/workbook.xml"] = _full_calc_on_load(read("xl/workbook.xml"))
+        replaced["[Content_Types].xml"] = _content_types(
+            read("[Content_Types].xml"), bool(picture), overrides, removed)
+
+        targets = {parts[name]: blocks for name, blocks in rows.items()}
+        for name in rows:
+            used = [int(r) for r in re.findall(r'<row\b[^>]*?\br="(\d+)"', read(parts[name]))]
+            if max(used, default=0) >= first_row:
+                raise ValueError(f"Worksheet '{name}' already has rows from row {first_row}")
+        with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as dst:
+            for info in src.infolist():
+                part = info.filename
+                if part in removed:
+                    continue
+                if part in targets:
+                    rows_xml = NumericRows(targets[part], first_row)
+                    with tempfile.TemporaryFile(dir=folder) as buf:
+                        for chunk in rows_xml:
+                            buf.write(chunk.encode("ascii"))
+                        buf.seek(0)
+                        xml = replaced.pop(part, None) or read(part)
+                        with dst.open(part, "w", force_zip64=True) as fout:
+                            _write_spliced_sheet(fout, xml, buf, rows_xml.last_row, rows_xml.ncols)
+                elif part in replaced:
+                    data = replaced.pop(part)
+                    dst.writestr(info, data.encode("utf-8") if isinstance(data, str) else data)
+                else:
+                    with src.open(info) as fin, dst.open(info, "w") as fout:
+                        shutil.copyfileobj(fin, fout, 1 << 20)
+            for part, data in replaced.items():         # nouvelles parties
+                dst.writestr(part, data.encode("utf-8") if isinstance(data, str) else data,
+                             compress_type=zipfile.ZIP_DEFLATED)
+
+
+def splice_rows(xlsx_path, sheets: dict, first_row: int = 3):
+    """
+    Ajoute des lignes numériques à des feuilles d'un .xlsx déjà enregistré
+    (fill_package sur place, via un fichier temporaire).
+    sheets: {nom de feuille: tableau 2-D ou itérable de blocs 2-D}.
+    """
+    xlsx_path = str(xlsx_path)
+    folder = os.path.dirname(os.path.abspath(xlsx_path))
+    fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=folder)
+    os.close(fd)
+    try:
+        fill_package(xlsx_path, tmp_path, rows=sheets, first_row=first_row)
+        # zip source fermé avant le remplacement (Windows)
+        os.replace(tmp_path, xlsx_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
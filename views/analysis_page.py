@@ -8,18 +8,24 @@ from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 
-import matplotlib.pyplot as plt
 import pandas as pd
 import json
 # Importez vos fonctions
-from utils.data_to_excel_report import export_to_excel_report
 from utils.data_treatement import*
 from utils.data_treatement import _pava
+from utils.cycle_index import CYCLE_COLUMNS
+from utils.data_cache import configure_cache, load_cached_cycles
+from utils.parallel_sweep import sweep_options
+from utils.report_builder import (
+    _safe_load_json, check_compatibility, is_missing, merge_configs_and_results, report_fields,
+)
+from controllers.task_runner import TaskRunner
 from matplotlib.lines import Line2D
-from matplotlib import rcParams
+from matplotlib import rcParams, colormaps
 import subprocess, sys
 
 OPEN_EXCEL = True
+RAW_FILE_FILTER = "Raw data (*.txt *.bin)"
 
 class AnalysisPage(QWidget):
     back_to_control = Signal()
@@ -28,6 +34,9 @@ class AnalysisPage(QWidget):
         super().__init__()
         self.config_data = {}  # Initialise vide
         self.settings = settings
+        configure_cache(settings)
+        self.tasks = TaskRunner(self)   # calculs lourds hors du thread GUI
+        self._task = None
         self._build_ui()
         self.loaded_cycles = []
         self.target_mm = None
@@ -83,8 +92,14 @@ class AnalysisPage(QWidget):
         layout.addWidget(btn_calib)
 
         # 3) Zone pour afficher les résultats (seuil, erreurs…)
+        status_layout = QHBoxLayout()
         self.result_label = QLabel("")
-        layout.addWidget(self.result_label)
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.setVisible(False)
+        self.btn_cancel.clicked.connect(self._on_cancel_task)
+        status_layout.addWidget(self.result_label, 1)
+        status_layout.addWidget(self.btn_cancel)
+        layout.addLayout(status_layout)
 
         # 4) Canvas Matplotlib
         
@@ -172,11 +187,52 @@ class AnalysisPage(QWidget):
             return float(selected)
         return None
 
+    # ---- tâches de fond
+    def _run_task(self, label, fn, on_done, error_title="Error", error_prefix="An error occurred"):
+        """
+        Lance fn(ctx) dans le pool ; on_done(résultat) est appelé dans le
+        thread GUI. Une seule tâche à la fois.
+        """
+        if self._task is not None:
+            QMessageBox.information(self, "Busy", "A computation is already running.")
+            return
+
+        def progress(fraction, message):
+            suffix = f" ({message})" if message else ""
+            self.result_label.setText(f"{label}… {int(round(fraction * 100))}%{suffix}")
+
+        def finished(result):
+            self._end_task()
+            on_done(result)
+
+        def failed(message):
+            self._end_task()
+            self.result_label.setText(f"{label} failed.")
+            QMessageBox.critical(self, error_title, f"{error_prefix}:\n{message}")
+
+        def cancelled():
+            self._end_task()
+            self.result_label.setText(f"{label} cancelled.")
+
+        self.result_label.setText(f"{label}…")
+        self.btn_cancel.setVisible(True)
+        self._task = self.tasks.submit(fn, on_finished=finished, on_failed=failed,
+                                       on_progress=progress, on_cancelled=cancelled)
+
+    def _end_task(self):
+        self._task = None
+        self.btn_cancel.setVisible(False)
+
+    def _on_cancel_task(self):
+        if self._task is not None:
+            self._task.cancel()
+            self.btn_cancel.setVisible(False)
+
     def _browse_file(self):
         # récupérer le dossier "data" depuis settings
         data_dir = self.settings.get("default_paths", {}).get("data_path", "")
 
-        path, _ = QFileDialog.getOpenFileName(self, "Select a file", data_dir, "Text files (*.txt)")
+        path, _ = QFileDialog.getOpenFileName(self, "Select a file", data_dir, RAW_FILE_FILTER)
         if path:
             self.file_path_edit.setText(path)
             self.loaded_cycles = self._load_raw_data(path)
@@ -223,12 +279,18 @@ class AnalysisPage(QWidget):
                 return
 
         Fref = float(self.threshold_input.value())
-        df = compute_abs_plasticity(
-            path,
-            time_reset_threshold=0.05,
-            force_threshold=Fref,
-            min_cycle_length=10
-        )
+
+        def work(ctx):
+            return compute_abs_plasticity(
+                path,
+                time_reset_threshold=0.05,
+                force_threshold=Fref,
+                min_cycle_length=10
+            )
+
+        self._run_task("Plasticity", work, lambda df: self._show_plasticity(df, Fref))
+
+    def _show_plasticity(self, df, Fref):
         if df.empty:
             QMessageBox.warning(self, "No results", "No absolute plasticity could be computed at this threshold.")
             return
@@ -259,19 +321,30 @@ class AnalysisPage(QWidget):
             QMessageBox.warning(self, "Invalid file", "Please select a valid file.")
             return
 
-        try:
+        def work(ctx):
             best_t, diag = calibrate_threshold_match_target_first(
                 path,
                 target_F0=0.05,                 # ← “petit peu plus grand que 0”
                 time_reset_threshold=0.05,
                 min_cycle_length=10,
                 search_range=(0.01,2),
-                step=0.05
+                step=0.05,                      # passe grossière, affinée jusqu'à 0.001 N
+                mode="adaptive",
+                resolution=0.001,
+                progress=ctx.report,
+                **sweep_options(self.settings)
             )
-        except Exception as e:
-            QMessageBox.critical(self, "Calibration failed", f"An error occurred:\n{e}")
-            return
+            df = None
+            if best_t is not None and diag.get("target") is not None:
+                df = compute_abs_plasticity(path, time_reset_threshold=0.05,
+                                            force_threshold=float(best_t), min_cycle_length=10)
+            return best_t, diag, df
 
+        self._run_task("Calibration", work, self._show_calibration,
+                       error_title="Calibration failed")
+
+    def _show_calibration(self, result):
+        best_t, diag, df = result
         target = diag.get("target")
         self.target_mm = float(target) if target is not None else None
 
@@ -285,8 +358,6 @@ class AnalysisPage(QWidget):
             f"Best Fref ≈ {best_t:.3f} N | target≈{target:.3f} mm | ")
 
         # Optional: plot
-        df = compute_abs_plasticity(path, time_reset_threshold=0.05,
-                                    force_threshold=float(best_t), min_cycle_length=10)
         if not df.empty:
             y = pd.to_numeric(df["Abs_plast_mm"], errors="coerce").dropna().values
             x = np.arange(1, len(y)+1)
@@ -332,100 +403,52 @@ class AnalysisPage(QWidget):
 
         self._export_filtered_cycles(df, path, start, end, fmin, fmax)
 
-    def _load_raw_data(self, path: str, time_reset_threshold: float = 0.05) -> list:
+    def _load_raw_data(self, path: str, time_reset_threshold: float = 0.05):
         """
-        Loads raw data from a text file and splits cycles
+        Loads raw data from a text or binary raw file and splits cycles
         based on time zero returns.
 
-        Returns a list of DataFrames [time, distance, force].
+        Returns a CycleIndex (one zero-copy (n, 3) [time, distance, force]
+        view per cycle), or [] on failure.
         """
         if not os.path.isfile(path):
             QMessageBox.warning(self, "Invalid file", "File not found.")
             return []
 
         try:
-            # Read file, automatic separation (spaces or tabs)
-            data = pd.read_csv(path, sep=r"\s+", engine="python", header=None, names=["time", "distance", "force"])
+            # Parsed once per file version (utils.data_cache), shared with the plasticity tools
+            cycles = load_cached_cycles(path, time_reset_threshold)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to read file:\n{e}")
             return []
 
-        if data.empty or len(data.columns) != 3:
+        data = cycles.data
+        if data.size == 0 or data.ndim != 2 or data.shape[1] != 3:
             QMessageBox.warning(self, "Invalid format", "The file does not contain three columns.")
             return []
 
-        t = data["time"].values
-        reset_idx = [0]
-
-        # Detect cycle starts (time strongly decreases = reset)
-        for i in range(1, len(t)):
-            if t[i] < t[i - 1] - time_reset_threshold:
-                reset_idx.append(i)
-        reset_idx.append(len(t))
-
-        # Split into cycles
-        cycles = []
-        for i in range(len(reset_idx) - 1):
-            i0, i1 = reset_idx[i], reset_idx[i + 1]
-            cycle_df = data.iloc[i0:i1].reset_index(drop=True)
-            cycles.append(cycle_df)
-
         return cycles
 
 
-    def _filter_cycles(self, cycles: list, start: int, end: int, fmin=None, fmax=None) -> pd.DataFrame:
+    def _filtered_segments(self, cycles, start: int, end: int, fmin=None, fmax=None) -> list:
+        """[(cycle index, filtered (n, 3) array)] for the non-empty cycles in [start, end]."""
+        return filtered_segments(cycles, start, end, fmin, fmax, self.chk_rising_only.isChecked())
+
+    def _filter_cycles(self, cycles, start: int, end: int, fmin=None, fmax=None) -> pd.DataFrame:
         """
         Filter cycles by index and force range.
         Optionally, keep only the rising phase.
         """
-        filtered = []
-        rising_only = self.chk_rising_only.isChecked()
-
-        for idx in range(start, end + 1):
-            if idx < 0 or idx >= len(cycles):
-                continue
-            df = cycles[idx]
-
-            # Option: filter by force
-            if fmin is not None:
-                df = df[df["force"] >= fmin]
-            if fmax is not None:
-                df = df[df["force"] <= fmax]
-
-            # Option: keep only rising phase
-            if rising_only and not df.empty:
-                df = df.reset_index(drop=True)
-                idx_max = df["force"].idxmax()  # Index of maximum force
-                df = df.iloc[:idx_max + 1]      # Keep everything until the peak
-
-            if not df.empty:
-                filtered.append(df)
-
-        if not filtered:
-            return pd.DataFrame(columns=["time", "distance", "force"])
-        return pd.concat(filtered, ignore_index=True)
+        return filter_cycles(cycles, start, end, fmin, fmax, self.chk_rising_only.isChecked())
 
     def _export_filtered_cycles(self, df: pd.DataFrame, base_path: str, start: int, end: int, fmin=None, fmax=None):
         """
         Export filtered cycles into a file with an adapted name.
         Replaces '_raw' with '_filtered' in the file name, or adds '_filtered' if missing.
         """
-        base_name = os.path.basename(base_path)
-        name, _ = os.path.splitext(base_name)
-
-        if "_raw" in name:
-            name = name.replace("_raw", "_filtered")
-        elif "_filtré" not in name:
-            name += "_filtered"
-
-        parts = [f"{name}-cycle{start}-{end}"]
-
-        filename = "_".join(parts) + ".txt"
-        output_path = os.path.join(os.path.dirname(base_path), filename)
-
-        df.to_csv(output_path, sep="\t", index=False, header=False)
+        output_path = export_filtered_cycles(df, base_path, start, end)
         QMessageBox.information(self, "Export complete", f"File exported:\n{output_path}")
-                                
+
     def _preview_filtered_cycles(self):
         if not self.loaded_cycles:
             return
@@ -435,7 +458,7 @@ class AnalysisPage(QWidget):
         fmin  = self.force_min.value()
         fmax  = self.force_max.value()
 
-        df_all = self._filter_cycles(self.loaded_cycles, start, end, fmin, fmax)
+        segments = self._filtered_segments(self.loaded_cycles, start, end, fmin, fmax)
 
         self.figure.clear()
         ax = self.figure.add_subplot(111)
@@ -444,25 +467,13 @@ class AnalysisPage(QWidget):
         ax.set_ylabel("Force (N)")
         ax.grid(True)
 
-        if df_all.empty:
-            self.canvas.draw()
-            return
-
         # --- Color by cycle, mais légende limitée ---
-        segments = []
-        for idx in range(start, end + 1):
-            if idx < 0 or idx >= len(self.loaded_cycles):
-                continue
-            seg_df = self._filter_cycles([self.loaded_cycles[idx]], 0, 0, fmin, fmax)
-            if not seg_df.empty:
-                segments.append((idx, seg_df))
-
         n = len(segments)
         if n == 0:
             self.canvas.draw()
             return
 
-        cmap = plt.cm.get_cmap("tab20", max(n, 1))
+        cmap = colormaps["tab20"].resampled(max(n, 1))
 
         # indices qui auront une entrée de légende
         label_idxs = set(range(min(4, n))) | set(range(max(0, n - 4), n))
@@ -470,18 +481,18 @@ class AnalysisPage(QWidget):
 
         handles, labels = [], []
 
-        for i, (cycle_idx, seg_df) in enumerate(segments):
+        for i, (cycle_idx, seg) in enumerate(segments):
             color = cmap(i)
             show_label = (i in label_idxs)
             label = f"Cycle {cycle_idx}" if show_label else "_nolegend_"
 
             ax.plot(
-                seg_df["distance"], seg_df["force"],
+                seg[:, 1], seg[:, 2],
                 label=label, color=color,
                 linewidth=1.25, alpha=0.9,
             )
             ax.scatter(
-                seg_df["distance"], seg_df["force"],
+                seg[:, 1], seg[:, 2],
                 s=4, color=color, alpha=0.9,
             )
 
@@ -504,10 +515,10 @@ class AnalysisPage(QWidget):
         data_dir = self.settings.get("default_paths", {}).get("data_path", "")
 
         flexion_path, _ = QFileDialog.getOpenFileName(
-            self, "Flexion file", data_dir, "Text files (*.txt)", options=options
+            self, "Flexion file", data_dir, RAW_FILE_FILTER, options=options
         )
         extension_path, _ = QFileDialog.getOpenFileName(
-            self, "Extension file", data_dir, "Text files (*.txt)", options=options
+            self, "Extension file", data_dir, RAW_FILE_FILTER, options=options
         )
 
         # ❗ allow ONE or TWO files
@@ -528,27 +539,13 @@ class AnalysisPage(QWidget):
                 QMessageBox.warning(self, "Canceled", "No folder selected.")
                 return
 
-        # ---- helpers
-        def _safe_load_json(path):
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    j = json.load(f)
-                return j
-            except Exception as ex:
-                return {}
-
         # ---- load configs
         config_flex = {}
         config_ext  = {}
         if has_flex:
-            flex_dir = os.path.dirname(flexion_path)
-            cfg_path = os.path.join(flex_dir, "config_flexion.json")
-            config_flex = _safe_load_json(cfg_path)
-
+            config_flex = _safe_load_json(os.path.join(os.path.dirname(flexion_path), "config_flexion.json"))
         if has_ext:
-            ext_dir = os.path.dirname(extension_path)
-            cfg_path = os.path.join(ext_dir, "config_extension.json")
-            config_ext = _safe_load_json(cfg_path)
+            config_ext = _safe_load_json(os.path.join(os.path.dirname(extension_path), "config_extension.json"))
 
         # ---- compatibility (both sides only)
         if has_flex and has_ext:
@@ -558,87 +555,75 @@ class AnalysisPage(QWidget):
                 QMessageBox.warning(self, "Incompatibility", str(e))
                 return
 
-        # ---- choose meta/config (NO merge when single file)
-        if has_flex and has_ext:
-            merged_meta   = merge_data(config_flex.get("metadata", {}), config_ext.get("metadata", {}))
-            merged_config = merge_data(config_flex.get("config", {}),    config_ext.get("config", {}))
-        elif has_flex:
-            merged_meta   = config_flex.get("metadata", {}) or {}
-            merged_config = config_flex.get("config",   {}) or {}
-        else:
-            merged_meta   = config_ext.get("metadata", {}) or {}
-            merged_config = config_ext.get("config",   {}) or {}
-
-        # ---- prefill fields
-        title    = get_fused_value(merged_meta.get("name", ""), "Name")
-        date     = get_fused_value(merged_meta.get("date", ""), "Date")
-        brace    = get_fused_value(merged_meta.get("splint", ""), "Brace type")
-        ref      = get_fused_value(merged_meta.get("reference", ""), "Reference")
-        operator = get_fused_value(merged_meta.get("operator",""), "Operator")
-        material = get_fused_value(merged_meta.get("material", ""), "Material")
-        note     = get_fused_value(merged_meta.get("note", ""), "Note")
-
-        speed     = get_fused_value(merged_config.get("speed", ""), "Speed")
-        force_max = get_fused_value(merged_config.get("force_max",""), "Force Max")
-        bench_cfg = merged_config.get("bench", {}) or {}
-        factor    = bench_cfg.get("factor", 0.025)
-        lever     = bench_cfg.get("lever_arm_mm", 85.0)
-        torque_th = bench_cfg.get("torque_threshold", 3.4)
-
-        # ---- dialogs (user may cancel)
-        def _is_missing(val):
-            if val is None:
-                return True
-            if isinstance(val, str):
-                s = val.strip()
-                return s == "" or s.lower() in {"none", "n/a", "na", "nan", "null"}
-            return False
-
+        # ---- prefill fields (NO merge when single file)
+        fields = report_fields(config_flex, config_ext, has_flex, has_ext)
+        title, date, brace = fields["title"], fields["date"], fields["brace"]
+        ref, operator, material, note = fields["reference"], fields["operator"], fields["material"], fields["note"]
+        speed, force_max = fields["speed"], fields["force_max"]
+        factor, lever, torque_th = fields["factor"], fields["lever_arm_mm"], fields["torque_threshold"]
 
         # ---- dialogs (ask ONLY if missing/invalid)
         ok1 = ok2 = ok3 = ok4 = True
 
         # Title
-        if _is_missing(title):
+        if is_missing(title):
             title, ok1 = QInputDialog.getText(self, "Title", "File title:", text=str(title or ""))
         # Reference
-        if _is_missing(ref):
+        if is_missing(ref):
             ref, ok4 = QInputDialog.getText(self, "Reference", "Sample reference:", text=str(ref or ""))
         # Date (must be YYYY-MM-DD)
-        if _is_missing(date):
+        if is_missing(date):
             date, ok2 = QInputDialog.getText(self, "Date", "Test date (YYYYMMDD):", text="")
         # Brace / Brand type
-        if _is_missing(brace):
+        if is_missing(brace):
             brace, ok3 = QInputDialog.getText(self, "Brace type", "Brace type (RHIZ, SCAPH, WRST):", text=str(brace or ""))
 
         if not all([ok1, ok2, ok3, ok4]):
             return
-        # ---- export
+
+        # ---- conflit de nom résolu ici (dialogue GUI), l'export tourne en fond
+        from utils.data_to_excel_report import export_to_excel_report, _resolve_output_paths
         try:
-            results = export_to_excel_report(
+            _, _, final_title = _resolve_output_paths(export_dir, title, conflict_strategy="ask")
+        except KeyboardInterrupt:
+            return
+
+        # ---- export
+        def work(ctx):
+            return export_to_excel_report(
                 flexion_path if has_flex else None,
                 extension_path if has_ext else None,
                 output_folder=export_dir,
-                file_title=title, test_date=date,
+                file_title=final_title, test_date=date,
                 brace_type=brace, sample_reference=ref, speed=speed,
                 force_max=force_max, operator=operator, material=material,
                 torque=torque_th, factor=factor, lever_arm_mm=lever,
-                note=note   # ensure the function signature accepts note=None
+                note=note,
+                conflict_strategy="overwrite",
+                progress=ctx.report
             )
-            merge_configs_and_results(export_dir, results)
-            QMessageBox.information(self, "Success", "Excel export and config_final.json generated successfully.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Export failed:\n{e}")
-        try : 
+
+        def done(results):
+            try:
+                merge_configs_and_results(export_dir, results)
+                QMessageBox.information(self, "Success", "Excel export and config_final.json generated successfully.")
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Export failed:\n{e}")
             if open_excel:
-                excel_path = os.path.join(export_dir, f"{title}.xlsx")
-                if os.path.exists(excel_path):
-                    if sys.platform.startswith("darwin"):      # macOS
-                        subprocess.call(["open", excel_path])
-                    elif os.name == "nt":                      # Windows
-                        os.startfile(excel_path)
-                    elif os.name == "posix":                   # Linux
-                        subprocess.call(["xdg-open", excel_path])
+                self._open_excel(os.path.join(export_dir, f"{final_title}.xlsx"))
+
+        self._run_task("Excel export", work, done, error_title="Error",
+                       error_prefix="Export failed")
+
+    def _open_excel(self, excel_path):
+        try : 
+            if os.path.exists(excel_path):
+                if sys.platform.startswith("darwin"):      # macOS
+                    subprocess.call(["open", excel_path])
+                elif os.name == "nt":                      # Windows
+                    os.startfile(excel_path)
+                elif os.name == "posix":                   # Linux
+                    subprocess.call(["xdg-open", excel_path])
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Open of excel failed:\n{e}")
         
@@ -692,91 +677,3 @@ class AnalysisPage(QWidget):
             QMessageBox.information(self, "Success", f"Plastic deformation saved to:\n{config_path}")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to write config file:\n{e}")
-
-def get_fused_value(value, key=""):
-    if isinstance(value, dict):
-        v_flex = value.get("flexion", "")
-        v_ext  = value.get("extension", "")
-        if v_flex == v_ext:
-            return v_flex
-        return f"{v_flex} (flexion), {v_ext} (extension)"
-    return value
-
-
-def merge_data(meta1, meta2):
-    merged = {}
-    for key in set(meta1.keys()).union(meta2.keys()):
-        v1 = meta1.get(key)
-        v2 = meta2.get(key)
-
-        if isinstance(v1, dict) and isinstance(v2, dict):
-            merged[key] = merge_data(v1, v2)
-            
-        if v1 == v2 or v2 is None:
-            merged[key] = v1
-        elif v1 is None:
-            merged[key] = v2
-        else:
-            merged[key] = {"flexion": v1, "extension": v2}
-    return merged
-
-
-def check_compatibility(config1, config2):
-    keys_to_match = ["speed", "force_max"]
-    for key in keys_to_match:
-        if config1["config"].get(key) != config2["config"].get(key):
-            raise ValueError(f"Parameter '{key}' differs between the two tests.")
-
-def merge_configs_and_results(folder_path: str, results: dict) -> str:
-    """
-    Écrit config_final.json en utilisant:
-      - les 2 configs si présentes (fusion tolérante),
-      - sinon la seule dispo (flexion OU extension).
-    Lève une erreur seulement si AUCUNE des deux n'existe.
-    Retourne le chemin du fichier final.
-    """
-    import os, json
-
-    def _safe_load(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as ex:
-            return {}
-
-    flex_path = os.path.join(folder_path, "config_flexion.json")
-    ext_path  = os.path.join(folder_path, "config_extension.json")
-
-    has_flex = os.path.isfile(flex_path)
-    has_ext  = os.path.isfile(ext_path)
-
-    # ❗ Ancienne condition probablement 'or' → trop stricte.
-    if not has_flex and not has_ext:
-        raise FileNotFoundError("No config_flexion.json nor config_extension.json found.")
-
-    flex_cfg = _safe_load(flex_path) if has_flex else {}
-    ext_cfg  = _safe_load(ext_path)  if has_ext  else {}
-
-    # Choix/merge
-    if has_flex and has_ext:
-        merged_metadata = merge_data(flex_cfg.get("metadata", {}), ext_cfg.get("metadata", {}))
-        merged_config   = merge_data(flex_cfg.get("config",   {}), ext_cfg.get("config",   {}))
-    elif has_flex:
-        merged_metadata = flex_cfg.get("metadata", {}) or {}
-        merged_config   = flex_cfg.get("config",   {}) or {}
-    else:
-        merged_metadata = ext_cfg.get("metadata", {}) or {}
-        merged_config   = ext_cfg.get("config",   {}) or {}
-
-    final = {
-        "metadata": merged_metadata,
-        "config": merged_config,
-        "mechanical_results": results,
-    }
-
-    final_path = os.path.join(folder_path, "config_final.json")
-    with open(final_path, "w", encoding="utf-8") as f:
-        json.dump(final, f, indent=4)
-
-    return final_path
-
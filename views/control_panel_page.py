@@ -15,6 +15,7 @@ from pathlib import Path
 from utils.setting_utils import (
     get_path_from_settings, icons_dir, icon_path, get_app_root
 )
+from utils.raw_io import raw_suffix
 
 
 class ControlPanelPage(QWidget):
@@ -347,7 +348,7 @@ class ControlPanelPage(QWidget):
             return
 
         #créer le fichier text des res
-        filename = filename = make_filename(self.metadata, "_raw.txt")
+        filename = filename = make_filename(self.metadata, raw_suffix(self.settings))
         full_path =  os.path.join(self.save_folder, filename)
 
         #à envoyer a arduino 
@@ -1,12 +1,18 @@
 # views/monitor_page.py
 import os
+import time
+import numpy as np
 from PySide6.QtWidgets import QWidget, QVBoxLayout,QMessageBox, QProgressBar, QHBoxLayout, QSizePolicy, QPushButton, QTextEdit,  QSpinBox, QDoubleSpinBox, QLabel, QFileDialog, QToolButton
 from PySide6.QtCore import Signal,  Qt, QSize, QTimer
 from PySide6.QtGui     import QIcon, QPixmap
 
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
+from matplotlib import colormaps
 from utils.setting_utils import resource_path, icon_path
+from utils.raw_io import RawDataWriter
+from utils.plot_buffers import RingBuffer, HistoryOverview, minmax_decimate
 
 
 def make_button(icon_name, text, slot):
@@ -25,12 +31,21 @@ def make_button(icon_name, text, slot):
 class MonitorPage(QWidget):
     back_to_control = Signal()
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, settings=None):
         super().__init__(parent)
+        self.settings = settings or {}
         self._init_ui()
-        # Buffers pour le graphe
-        self._xs, self._ys = [], []
-        # Fichier de log ouvert pendant le test
+        # Buffers pour le graphe : fenêtre récente (distance, force) + vue d'ensemble
+        mon = self.settings.get("monitor", {})
+        self._ring = RingBuffer(mon.get("ring_capacity", 200000))
+        self._history = HistoryOverview(mon.get("history_points", 20000))
+        # Superposition par cycle : cycles terminés figés dans le fond (LineCollection)
+        self._cycle_start = 0          # self._ring.total au début du cycle en cours
+        self._overlay_max = mon.get("overlay_cycles", 100)
+        self._overlay_points = mon.get("overlay_points_per_cycle", 512)
+        self._frozen_segs, self._frozen_colors = [], []
+        self._cmap = colormaps["tab10"]
+        # Fichier de log ouvert pendant le test (écrit par un thread de fond)
         self._log_file = None
         self._logging_active = True
         self.metadata = {}
@@ -42,6 +57,13 @@ class MonitorPage(QWidget):
         self.prep_overlay = None
         self.waiting_for_t0 = False
 
+        # Rendu par blitting : fond statique (axes, grille, ticks) en cache
+        self._background = None
+        self._frame_ms = 0.0      # temps de rendu moyen (EMA)
+        self._frame_dt = 0.0      # intervalle moyen entre deux rendus (EMA)
+        self._last_frame = None
+        self.canvas.mpl_connect("draw_event", self._on_canvas_draw)
+
         self._dirty = False
         self._plot_timer = QTimer(self)
         self._plot_timer.setInterval(33)  # ~30 FPS
@@ -124,7 +146,12 @@ class MonitorPage(QWidget):
         self.ax.set_xlabel('Distance (mm)')
         self.ax.set_ylabel('Force (N)')
         self.ax.grid(True) 
-        self.line, = self.ax.plot([], [], '-', marker='o', markersize=2, linewidth=0.8)
+        # animated: exclue du rendu complet, dessinée par blitting
+        self.line, = self.ax.plot([], [], '-', marker='o', markersize=2, linewidth=0.8, animated=True)
+        # cycles terminés : rendus avec le fond statique, jamais redessinés par frame
+        self.frozen_cycles = LineCollection([], linewidths=0.8, alpha=0.7)
+        self.ax.add_collection(self.frozen_cycles)
+        self.ax.set_autoscalex_on(False); self.ax.set_autoscaley_on(False)
         layout.addWidget(self.canvas)
 
   
@@ -133,6 +160,11 @@ class MonitorPage(QWidget):
         btn_layout = QHBoxLayout()
         self.btn_back = QPushButton("Back to Control")
         btn_layout.addWidget(self.btn_back)
+        self.btn_history = QPushButton("Full history")
+        self.btn_history.setCheckable(True)
+        self.btn_history.setToolTip("Show the whole test (down-sampled) instead of the recent window")
+        self.btn_history.toggled.connect(self._on_history_toggled)
+        btn_layout.addWidget(self.btn_history)
   
         layout.addLayout(btn_layout)
 
@@ -151,7 +183,7 @@ class MonitorPage(QWidget):
         self.serial = serial
         serial.event_received.connect(self._on_event)
         serial.line_received.connect(self.log_line)
-        serial.data_received.connect(self._on_data)
+        serial.data_block_received.connect(self._on_data_block)
         
 
     def _on_event(self, event: str):
@@ -159,8 +191,15 @@ class MonitorPage(QWidget):
         if event == "START":
             # Choisir où sauvegarder
             path = self.file_path
+            self._close_log_file()
+            acq = self.settings.get("acquisition", {})
             try:
-                self._log_file = open(path, 'w')
+                self._log_file = RawDataWriter(
+                    path,
+                    metadata={"metadata": self.metadata, "config": self.config},
+                    flush_interval_s=acq.get("flush_interval_s", 1.0),
+                    flush_bytes=acq.get("flush_bytes", 1 << 20),
+                )
                 #self.log.append(f"💾 Fichier ouvert : {path}")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Unable to create file :\n{e}")
@@ -174,38 +213,155 @@ class MonitorPage(QWidget):
             # le reste de ta logique START…
         elif event in ("END", "IDLE"):
             if self._log_file:
-                self._log_file.close()
+                self._close_log_file()
                 #self.log.append("✅ Fichier TXT fermé et sauvegardé")
-                self._log_file = None
+                self.info_label.setText("")
                 self.clear()
 
-    def _on_data(self, t, d, f):
+    def _close_log_file(self):
+        """Closes the raw data file; reports it as truncated if a write failed."""
+        log_file, self._log_file = self._log_file, None
+        if log_file is None:
+            return
+        try:
+            log_file.close()
+        except Exception as e:
+            written = log_file.stats()["written_samples"]
+            QMessageBox.warning(self, "Raw data file incomplete",
+                                f"Writing stopped after {written} samples, the file is truncated:\n"
+                                f"{log_file.path}\n\n{e}")
+
+    def _on_data_block(self, block):
+        """
+        Handles a (N, 3) float32 block [t, d, f] from data_block_received:
+        ignored during the preparation cycle, then from the first t == 0
+        sample on, plotted and written to the raw data file.
+        """
         if self.skip_data:
             self.show_prep_overlay()
             return  # On ignore toutes les données jusqu’à fin du cycle 1
-        
+
         if self.waiting_for_t0:
-            if round(t, 2) == 0.0:
-                self.waiting_for_t0 = False  # Start logging after this
-            else:
+            hits = [i for i, t in enumerate(block[:, 0].tolist()) if round(t, 2) == 0.0]
+            if not hits:
                 return
+            self.waiting_for_t0 = False  # Start logging after this
+            block = block[hits[0]:]
 
-        self.info_label.setText("")  # Efface le message une fois actif
+        self._append_points(block[:, 1:3])
+        if self._log_file:
+            self._log_file.write(block)
 
-        self._xs.append(d); self._ys.append(f)
+    def _append_points(self, pts):
+        """pts: (N, 2) [distance, force]."""
+        self._ring.extend(pts)
+        self._history.extend(pts)
         self._dirty = True
-        if self._log_file:
-            self._log_file.write(f"{t:.2f}\t{d:.2f}\t{f:.2f}\n")
+
+    def _on_history_toggled(self, checked: bool):
+        self.frozen_cycles.set_visible(not checked)
+        # les limites peuvent rétrécir : on repart de tout l'essai
+        pts = self._history.view()
+        self.ax.set_xlim(0, 1); self.ax.set_ylim(0, 1)
+        self._grow_limits(pts[:, 0], pts[:, 1], force=True)
+        self._background = None
+        self._dirty = True
+        self._refresh_plot()
+
+    def _active_cycle_points(self):
+        """(N, 2) points of the cycle in progress (as far as the ring buffer reaches)."""
+        n = min(self._ring.total - self._cycle_start, len(self._ring))
+        if n <= 0:
+            return self._ring.view()[:0]
+        return self._ring.view()[-n:]
+
+    def _plot_points(self):
+        """Points to draw: active cycle or full history, min/max decimated to the canvas width."""
+        pts = self._history.view() if self.btn_history.isChecked() else self._active_cycle_points()
+        width_px = max(100, int(self.canvas.width() * self.canvas.devicePixelRatioF()))
+        return minmax_decimate(pts[:, 0], pts[:, 1], width_px)
+
+    def _freeze_cycle(self, cycle: int):
+        """Moves the finished cycle from the animated line into the static LineCollection."""
+        pts = self._active_cycle_points()
+        if len(pts) >= 2:
+            x, y = minmax_decimate(pts[:, 0], pts[:, 1], self._overlay_points // 2)
+            self._frozen_segs.append(np.column_stack((x, y)))
+            self._frozen_colors.append(self.line.get_color())
+            del self._frozen_segs[:-self._overlay_max], self._frozen_colors[:-self._overlay_max]
+            self.frozen_cycles.set_segments(self._frozen_segs)
+            self.frozen_cycles.set_color(self._frozen_colors)
+        self._cycle_start = self._ring.total
+        self.line.set_color(self._cmap(cycle % self._cmap.N))
+        self.line.set_data([], [])
+        # le fond change une fois par cycle : recapture au prochain rendu
+        self._background = None
+        self._dirty = True
+
+    def _on_canvas_draw(self, event):
+        """After every full draw: cache the static background, then draw the data on top."""
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.ax.draw_artist(self.line)
+
+    def _grow_limits(self, x, y, force=False) -> bool:
+        """Extends the axis limits (never shrinks them) so that x, y fit. True if they changed."""
+        if x.size == 0:
+            return False
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        dx0, dx1 = float(np.nanmin(x)), float(np.nanmax(x))
+        dy0, dy1 = float(np.nanmin(y)), float(np.nanmax(y))
+        if not force and x0 <= dx0 and dx1 <= x1 and y0 <= dy0 and dy1 <= y1:
+            return False
+        if force:
+            x0, x1, y0, y1 = dx0, dx1, dy0, dy1
+        # marge de 10 % de l'étendue pour ne pas recalculer à chaque point
+        mx = 0.1 * max(dx1 - dx0, 1e-3); my = 0.1 * max(dy1 - dy0, 1e-3)
+        self.ax.set_xlim(min(x0, dx0 - mx), max(x1, dx1 + mx))
+        self.ax.set_ylim(min(y0, dy0 - my), max(y1, dy1 + my))
+        return True
 
     def _refresh_plot(self):
-        if not self._dirty:
+        self._update_status()
+        if not self._dirty or not self.canvas.isVisible():
             return
-        self.line.set_data(self._xs, self._ys)
-        # autoscale less often:
-        if len(self._xs) % 50 == 0:
-            self.ax.relim(); self.ax.autoscale_view()
-        self.canvas.draw_idle()
-        self._dirty = False       
+        t0 = time.perf_counter()
+        x, y = self._plot_points()
+        self.line.set_data(x, y)
+        if self._grow_limits(x, y) or self._background is None:
+            # limites changées : rendu complet, le fond est recapturé dans _on_canvas_draw
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._background)
+            self.ax.draw_artist(self.line)
+            self.canvas.blit(self.ax.bbox)
+        self._dirty = False
+        self._record_frame(t0)
+
+    def _record_frame(self, t0: float):
+        now = time.perf_counter()
+        ms = (now - t0) * 1000.0
+        self._frame_ms = ms if not self._frame_ms else 0.9 * self._frame_ms + 0.1 * ms
+        if self._last_frame is not None:
+            dt = now - self._last_frame
+            self._frame_dt = dt if not self._frame_dt else 0.9 * self._frame_dt + 0.1 * dt
+        self._last_frame = now
+
+    def _update_status(self):
+        """Frame time and writer backlog / latency in the info line."""
+        parts = []
+        if self._frame_ms:
+            fps = f" ({1.0 / self._frame_dt:.0f} FPS)" if self._frame_dt else ""
+            parts.append(f"Frame {self._frame_ms:.1f} ms{fps}")
+        if self._log_file:
+            if self._log_file.error:
+                parts.append(f"⚠️ Raw file write error: {self._log_file.error}")
+            else:
+                st = self._log_file.stats()
+                parts.append(
+                    f"Raw file: backlog {st['backlog_samples']} samples | "
+                    f"write {st['last_write_ms']:.1f} ms (max {st['max_write_ms']:.1f} ms)"
+                )
+        self.info_label.setText(" | ".join(parts))
 
     def log_line(self, line_: str):
         line = line_.strip()
@@ -214,6 +370,9 @@ class MonitorPage(QWidget):
             try:
                 count = int(line.split(":", 1)[1].strip())
                 self._current_cycle = count
+                # fin de cycle : données sur disque (fsync)
+                if self._log_file:
+                    self._log_file.sync()
 
                 # On arrête d'ignorer les données après le premier cycle
                 if self.skip_data and count >= 1:
@@ -221,6 +380,8 @@ class MonitorPage(QWidget):
                     self.hide_prep_overlay()
                     self.clear() 
                     self.waiting_for_t0 = True
+                else:
+                    self._freeze_cycle(count)
                 self.progress.setValue(count)
 
             except ValueError:
@@ -228,9 +389,14 @@ class MonitorPage(QWidget):
 
     def clear(self):
         """“Graphics buffer, buffers, and text log."""
-        self._xs.clear(); self._ys.clear()
+        self._ring.clear(); self._history.clear()
+        self._cycle_start = 0
+        self._frozen_segs.clear(); self._frozen_colors.clear()
+        self.frozen_cycles.set_segments([])
+        self.line.set_color(self._cmap(0))
         self.line.set_data([], [])
-        self.ax.relim(); self.ax.autoscale_view()
+        self.ax.set_xlim(0, 1); self.ax.set_ylim(0, 1)
+        self._last_frame = None
         self.canvas.draw()
         self._current_cycle = 0
 
@@ -145,12 +145,12 @@ class PortSelectionPage(QWidget):
             self.connected.emit(self.combo.currentText())
 
     def _on_handshake_timeout(self):
-        QMessageBox.warning(self, "Timeout", "No ‘READY’ response received within 4 seconds")
+        # Stops the timer and the reader thread before the port is closed
         try:
-            if self.serial.ser and self.serial.ser.is_open:
-                self.serial.ser.close()
+            self.serial.close()
         except Exception:
             pass
+        QMessageBox.warning(self, "Timeout", "No ‘READY’ response received within 4 seconds")
         # Réactive les boutons
         self.btn_connect.setEnabled(True)
         self.btn_refresh.setEnabled(True)